@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+"""
+button_service.py - Event-driven GPIO buttons with per-pin handlers
+ECE 5725 Lab 1 Week 2
+
+RPi.GPIO reports every edge (no bouncetime) into a queue, and one dispatcher
+thread runs a small state machine per pin. A press is reported on its first
+edge, so there is no settling delay; edges within DEBOUNCE_SEC of the last
+accepted change are bounce, and the pin is read again once that window has
+passed in case the bounce hid a real change. Long-press and auto-repeat are
+timers on the same thread, so a held or bouncing button never delays another.
+
+Edges come from RPi.GPIO callbacks, stamped with time.monotonic() when the
+callback thread gets to them, or with BUTTON_BACKEND=cdev from the GPIO
+character device (gpio_cdev.py), which gives the kernel's interrupt time
+and the level after each edge, read in batches. Only the RPi.GPIO backend
+imports RPi.GPIO, so the cdev backend runs where it is not installed. The
+backend sets its pins up and cleans them up, so a script needs no GPIO
+calls of its own for its buttons.
+
+    service = ButtonService()
+    service.add(17, press=lambda pin: print("pause"))
+    service.add(27, press=lambda pin: service.stop())
+    service.start()
+    service.wait()
+"""
+
+import os
+import queue
+import threading
+import time
+
+import gpio_cdev
+
+BACKEND = os.getenv('BUTTON_BACKEND') or 'rpi'
+DEBOUNCE_SEC = 0.02
+LONG_PRESS_SEC = 0.8
+REPEAT_DELAY_SEC = 0.5
+REPEAT_SEC = 0.1
+# RPi.GPIO's values, so GPIO.PUD_UP and PUD_UP can be passed alike
+PUD_OFF = 20
+PUD_DOWN = 21
+PUD_UP = 22
+LOW = 0
+HIGH = 1
+
+
+class Button:
+    """State of one registered pin; only the dispatcher thread touches it."""
+    def __init__(self, pin, active_low, press, release, long_press, repeat, long_press_sec, repeat_delay, repeat_sec,
+                 debounce=DEBOUNCE_SEC):
+        self.pin = pin
+        self.active_low = active_low
+        self.press = press
+        self.release = release
+        self.long_press = long_press
+        self.repeat = repeat
+        self.long_press_sec = long_press_sec
+        self.repeat_delay = repeat_delay
+        self.repeat_sec = repeat_sec
+        self.pressed = False
+        # one window before time zero, so even an edge stamped 0.0 is not taken for bounce
+        self.changed_at = -debounce
+        # when to read the pin again after a bounce, None if not needed
+        self.check_at = None
+        self.long_at = None
+        self.repeat_at = None
+
+    def next_deadline(self):
+        deadlines = [t for t in (self.check_at, self.long_at, self.repeat_at) if t is not None]
+        return min(deadlines) if deadlines else None
+
+
+class RPiGpioBackend:
+    """Edges from RPi.GPIO callbacks; no timestamp or level, so the service supplies both."""
+    def __init__(self):
+        import RPi.GPIO as GPIO
+        self.gpio = GPIO
+
+    def setup(self, pin, pull_up_down):
+        if self.gpio.getmode() is None:
+            # BCM, unless the script already picked the numbering for its own pins
+            self.gpio.setmode(self.gpio.BCM)
+        self.gpio.setup(pin, self.gpio.IN, pull_up_down=pull_up_down)
+
+    def watch(self, pin, on_edge):
+        self.gpio.add_event_detect(pin, self.gpio.BOTH, callback=on_edge)
+
+    def start(self):
+        pass
+
+    def input(self, pin):
+        return self.gpio.input(pin)
+
+    def cleanup(self, pins):
+        for pin in pins:
+            self.gpio.remove_event_detect(pin)
+        if pins:
+            # only the button pins; a script's own outputs are its to clean up
+            self.gpio.cleanup(pins)
+
+
+class CdevBackend:
+    """Edges from the GPIO character device, with kernel timestamps; chip is a path or a gpio_cdev.FakeChip."""
+    def __init__(self, chip=None):
+        self.chip = gpio_cdev.open_chip(chip)
+        self.bias = {}
+        self.callbacks = {}
+        # pin -> LineRequest, one request per bias setting
+        self.requests = {}
+        self.watchers = []
+
+    def setup(self, pin, pull_up_down):
+        self.bias[pin] = {PUD_UP: 'up', PUD_DOWN: 'down'}.get(pull_up_down, 'disable')
+
+    def watch(self, pin, on_edge):
+        self.callbacks[pin] = on_edge
+
+    def start(self):
+        for bias in set(self.bias[pin] for pin in self.callbacks):
+            pins = [pin for pin in self.callbacks if self.bias[pin] == bias]
+            request = self.chip.request(pins, bias=bias, edges='both')
+            for pin in pins:
+                self.requests[pin] = request
+            watcher = gpio_cdev.EdgeWatcher(request, self.on_event)
+            watcher.start()
+            self.watchers.append(watcher)
+
+    def on_event(self, event):
+        on_edge = self.callbacks.get(event.offset)
+        if on_edge is not None:
+            on_edge(event.offset, event.time, event.level)
+
+    def input(self, pin):
+        return self.requests[pin].values()[pin]
+
+    def cleanup(self, pins):
+        for watcher in self.watchers:
+            watcher.stop()
+            watcher.request.close()
+        self.watchers = []
+        self.requests = {}
+        self.callbacks = {}
+
+
+class ButtonService:
+    def __init__(self, debounce=DEBOUNCE_SEC, backend=None):
+        self.debounce = debounce
+        if backend is None:
+            backend = CdevBackend() if BACKEND == 'cdev' else RPiGpioBackend()
+        self.backend = backend
+        self.buttons = {}
+        self.edges = queue.Queue()
+        self.running = False
+        self.dispatcher = threading.Thread(target=self.dispatch, daemon=True)
+
+    def add(self, pin, press=None, release=None, long_press=None, repeat=None, pull_up_down=PUD_UP,
+            long_press_sec=LONG_PRESS_SEC, repeat_delay=REPEAT_DELAY_SEC, repeat_sec=REPEAT_SEC):
+        """Register a pin; each handler is called as handler(pin) on the dispatcher thread."""
+        self.backend.setup(pin, pull_up_down)
+        button = Button(pin, pull_up_down != PUD_DOWN, press, release, long_press, repeat,
+                        long_press_sec, repeat_delay, repeat_sec, self.debounce)
+        self.buttons[pin] = button
+        self.backend.watch(pin, self.on_edge)
+        return button
+
+    def is_pressed(self, button, level=None):
+        if level is None:
+            level = self.backend.input(button.pin)
+        return level == (LOW if button.active_low else HIGH)
+
+    def on_edge(self, pin, t=None, level=None):
+        # runs on the backend's thread: timestamp and hand off, nothing else
+        self.edges.put((pin, time.monotonic() if t is None else t, level))
+
+    def start(self):
+        self.backend.start()
+        for button in self.buttons.values():
+            button.pressed = self.is_pressed(button)
+        self.running = True
+        self.dispatcher.start()
+
+    def stop(self):
+        """Stop dispatching; safe to call from a handler."""
+        self.running = False
+        self.edges.put(None)
+
+    def wait(self, timeout=None):
+        self.dispatcher.join(timeout)
+
+    def cleanup(self):
+        self.backend.cleanup(list(self.buttons))
+        self.buttons = {}
+
+    def next_deadline(self):
+        deadline = None
+        for button in self.buttons.values():
+            t = button.next_deadline()
+            if t is not None and (deadline is None or t < deadline):
+                deadline = t
+        return deadline
+
+    def dispatch(self):
+        while self.running:
+            deadline = self.next_deadline()
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                item = self.edges.get(timeout=timeout)
+            except queue.Empty:
+                item = False
+            if item is None:
+                break
+            if item:
+                pin, t, level = item
+                button = self.buttons.get(pin)
+                if button is not None:
+                    self.edge(button, t, level)
+            self.run_timers(time.monotonic())
+
+    def run_timers(self, now):
+        for button in list(self.buttons.values()):
+            self.timers(button, now)
+
+    def edge(self, button, t, level=None):
+        pressed = self.is_pressed(button, level)
+        if pressed == button.pressed:
+            return
+        if t - button.changed_at < self.debounce:
+            # bounce: look again when the window closes
+            button.check_at = button.changed_at + self.debounce
+            return
+        self.change(button, pressed, t)
+
+    def timers(self, button, now):
+        if button.check_at is not None and now >= button.check_at:
+            button.check_at = None
+            pressed = self.is_pressed(button)
+            if pressed != button.pressed:
+                self.change(button, pressed, now)
+        if button.long_at is not None and now >= button.long_at:
+            button.long_at = None
+            button.long_press(button.pin)
+        if button.repeat_at is not None and now >= button.repeat_at:
+            # skip repeats the dispatcher was too busy to run instead of bursting
+            button.repeat_at += button.repeat_sec * (int((now - button.repeat_at) / button.repeat_sec) + 1)
+            button.repeat(button.pin)
+
+    def change(self, button, pressed, t):
+        button.pressed = pressed
+        button.changed_at = t
+        if pressed:
+            if button.long_press is not None:
+                button.long_at = t + button.long_press_sec
+            if button.repeat is not None:
+                button.repeat_at = t + button.repeat_delay
+            if button.press is not None:
+                button.press(button.pin)
+        else:
+            button.long_at = None
+            button.repeat_at = None
+            if button.release is not None:
+                button.release(button.pin)
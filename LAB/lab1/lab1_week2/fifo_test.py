@@ -7,6 +7,9 @@ ECE 5725 Lab 1 Week 2
 import os
 import sys
 
+from slave_channel import SlaveChannel
+from video_client import VideoClient
+
 # FIFO file path
 FIFO_PATH = '/home/pi/ECE-5725-Everything/LAB/lab1_files_f25/lab1_week2/video_fifo'
 
@@ -15,11 +18,19 @@ def create_fifo():
     if not os.path.exists(FIFO_PATH):
         os.mkfifo(FIFO_PATH)
 
+# with VIDEO_SOCKET set, go through video_daemon.py so other controllers can share the player
+if os.environ.get('VIDEO_SOCKET'):
+    channel = VideoClient(os.environ['VIDEO_SOCKET'])
+else:
+    channel = SlaveChannel(FIFO_PATH)
+
 def send_command(command):
-    """Send command to FIFO"""
-    with open(FIFO_PATH, 'w') as fifo:
-        fifo.write(command + '\n')
-        fifo.flush()
+    """Send command to FIFO; queued (not blocked on) until mplayer reads it"""
+    if not channel.send(command):
+        if isinstance(channel, VideoClient):
+            print(f"video_daemon replied {channel.reply or 'nothing (is it running?)'}")
+        else:
+            print(f"mplayer is not reading {FIFO_PATH} yet, queued ({channel.queued()} waiting)")
 
 def print_help():
     """Print help information"""
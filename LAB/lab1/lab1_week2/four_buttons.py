@@ -4,8 +4,7 @@ four_buttons.py - Four button GPIO test program
 ECE 5725 Lab 1 Week 2
 """
 
-import RPi.GPIO as GPIO
-import time
+from button_service import ButtonService
 
 # Define button GPIO pins (BCM numbering)
 # Four buttons on piTFT
@@ -16,14 +15,22 @@ BUTTONS = {
     'BUTTON4': 27
 }
 
+service = ButtonService()
+
+def on_press(pin):
+    """Handle one debounced press; runs on the button service thread"""
+    print(f"Button {pin} has been pressed")
+
+    # Exit program if Button4 is pressed
+    if pin == BUTTONS['BUTTON4']:
+        print("Exiting program...")
+        service.stop()
+
 def setup():
-    """Initialize GPIO settings"""
-    # Set GPIO mode to BCM
-    GPIO.setmode(GPIO.BCM)
-    
-    # Set all button pins as inputs with internal pull-up resistors
+    """Register the buttons with the service"""
+    # Register all buttons (inputs with internal pull-up resistors)
     for pin in BUTTONS.values():
-        GPIO.setup(pin, GPIO.IN, pull_up_down=GPIO.PUD_UP)
+        service.add(pin, press=on_press)
 
 def main():
     try:
@@ -33,25 +40,14 @@ def main():
         print("Press Ctrl+C to exit")
         print("Press Button4 (GPIO 27) to quit the program")
         
-        while True:
-            # Check all buttons
-            for button_name, pin in BUTTONS.items():
-                if not GPIO.input(pin):
-                    print(f"Button {pin} has been pressed")
-                    
-                    # Exit program if Button4 is pressed
-                    if pin == BUTTONS['BUTTON4']:
-                        print("Exiting program...")
-                        return
-                    
-                    # Add small delay to prevent button bounce
-                    time.sleep(0.2)
+        service.start()
+        service.wait()
                     
     except KeyboardInterrupt:
         print("\nProgram interrupted by user")
     finally:
-        # Clean up GPIO settings
-        GPIO.cleanup()
+        # Release the buttons' pins
+        service.cleanup()
         print("GPIO cleanup completed")
 
 if __name__ == "__main__":
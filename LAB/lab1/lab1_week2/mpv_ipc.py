@@ -0,0 +1,326 @@
+#!/usr/bin/env python3
+"""
+mpv_ipc.py - Talks to mpv over its JSON IPC socket (mpv --input-ipc-server=PATH)
+ECE 5725 Lab 2
+
+Every command is a JSON line carrying a request_id; mpv answers each with the
+same request_id, so many requests can be in flight at once and every one
+is acknowledged (unlike mplayer's FIFO). Instead of asking for the position
+over and over, MpvIpc observes time-pos, duration and pause once, and mpv
+pushes a property-change event whenever one changes. The events keep an
+mplayer_slave.PlayerState up to date, so reads never wait on mpv.
+
+send() takes the same mplayer slave commands the other backends do
+('pause', 'seek 10', 'seek 25 1', 'quit', ...), translates them and does not
+wait for the reply. command() waits for one:
+
+    mpv = MpvIpc('/tmp/mpvsocket')
+    mpv.send('seek 10')
+    mpv.command('get_property', 'volume')     # -> (error, data)
+
+FakeMpv serves the same protocol on a Unix socket, for tests without mpv.
+"""
+import itertools
+import json
+import os
+import socket
+import threading
+import time
+
+from mplayer_slave import PAUSING_PREFIXES, PlayerState
+
+MPV_SOCKET = '/tmp/mpvsocket'
+TIMEOUT_SEC = 1.0
+# observed property -> (PlayerState key, how to turn mpv's value into an ANS_ value)
+OBSERVED = {
+    'time-pos': ('TIME_POSITION', str),
+    'duration': ('LENGTH', str),
+    'pause':    ('pause', lambda paused: 'yes' if paused else 'no'),
+}
+SEEK_KINDS = {0: 'relative', 1: 'absolute-percent', 2: 'absolute'}
+
+
+def translate(command):
+    """mplayer slave command -> mpv command array."""
+    words = command.split()
+    if words and words[0] in PAUSING_PREFIXES:
+        # mpv never unpauses for a command, so the prefixes mean nothing to it
+        words = words[1:]
+    if not words:
+        return None
+    name, args = words[0], words[1:]
+    if name == 'pause':
+        return ['cycle', 'pause']
+    if name == 'seek' and args:
+        return ['seek', float(args[0]), SEEK_KINDS.get(int(args[1]) if len(args) > 1 else 0, 'relative')]
+    if name == 'osd':
+        return ['cycle-values', 'osd-level', '3', '1']
+    if name == 'mute':
+        return ['cycle', 'mute']
+    if name == 'get_time_pos':
+        return ['get_property', 'time-pos']
+    if name == 'get_time_length':
+        return ['get_property', 'duration']
+    return words
+
+
+class Request(object):
+    """One command in flight; done is set when mpv has answered (or the connection is gone)."""
+    def __init__(self, request_id):
+        self.id = request_id
+        self.done = threading.Event()
+        self.error = None
+        self.data = None
+
+    def finish(self, error, data=None):
+        self.error = error
+        self.data = data
+        self.done.set()
+
+
+class MpvIpc(object):
+    def __init__(self, path=MPV_SOCKET, timeout=TIMEOUT_SEC, observe=tuple(OBSERVED)):
+        self.path = path
+        self.timeout = timeout
+        self.observe = observe
+        self.state = PlayerState()
+        self.ids = itertools.count(1)
+        self.pending = {}
+        self.lock = threading.Lock()
+        self.sock = None
+        self.reader = None
+        self.errors = 0
+
+    def connect(self):
+        """Connect and observe properties; False if mpv is not listening yet."""
+        with self.lock:
+            return self.sock is not None or self.connect_locked()
+
+    def connect_locked(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.connect(self.path)
+        except OSError:
+            sock.close()
+            return False
+        self.sock = sock
+        self.state.running = True
+        self.reader = threading.Thread(target=self.read_loop, args=(sock,), daemon=True)
+        self.reader.start()
+        for i, name in enumerate(self.observe, 1):
+            self.write_locked(('observe_property', i, name))
+        return self.sock is not None
+
+    def request(self, *command):
+        """Send one command without waiting; the Request to wait on, None if mpv is not there."""
+        with self.lock:
+            if self.sock is None and not self.connect_locked():
+                return None
+            return self.write_locked(command)
+
+    def write_locked(self, command):
+        request = Request(next(self.ids))
+        self.pending[request.id] = request
+        line = json.dumps({'command': list(command), 'request_id': request.id}) + '\n'
+        try:
+            self.sock.sendall(line.encode())
+        except OSError:
+            del self.pending[request.id]
+            self.disconnect_locked()
+            return None
+        return request
+
+    def command(self, *command, timeout=None):
+        """Send one command and wait for it: (error, data); error is 'success' when it worked."""
+        request = self.request(*command)
+        if request is None:
+            return 'not connected', None
+        if not request.done.wait(self.timeout if timeout is None else timeout):
+            with self.lock:
+                self.pending.pop(request.id, None)
+            return 'timeout', None
+        return request.error, request.data
+
+    def send(self, command):
+        """Send one mplayer-style slave command; True if it went out (mpv's reply is not waited for)."""
+        try:
+            words = translate(command)
+        except ValueError:
+            return False
+        return words is not None and self.request(*words) is not None
+
+    def read_loop(self, sock):
+        with sock.makefile('rb') as lines:
+            for line in lines:
+                try:
+                    message = json.loads(line)
+                except ValueError:
+                    continue
+                if 'request_id' in message:
+                    with self.lock:
+                        request = self.pending.pop(message['request_id'], None)
+                    if message.get('error') != 'success':
+                        self.errors += 1
+                    if request is not None:
+                        request.finish(message.get('error'), message.get('data'))
+                elif message.get('event') == 'property-change':
+                    self.property_changed(message.get('name'), message.get('data'))
+        with self.lock:
+            if self.sock is sock:
+                self.disconnect_locked()
+
+    def property_changed(self, name, value):
+        if name in OBSERVED and value is not None:
+            key, convert = OBSERVED[name]
+            self.state.answer(key, convert(value), time.monotonic())
+
+    def disconnect_locked(self):
+        if self.sock is not None:
+            try:
+                self.sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            self.sock.close()
+            self.sock = None
+        with self.state.lock:
+            self.state.freeze(time.monotonic())
+            self.state.running = False
+        for request in self.pending.values():
+            request.finish('disconnected')
+        self.pending.clear()
+
+    def close(self):
+        with self.lock:
+            self.disconnect_locked()
+        if self.reader is not None and self.reader is not threading.current_thread():
+            self.reader.join(self.timeout)
+
+
+class FakeMpv(object):
+    """Serves mpv's JSON IPC on path for one or more clients; the video is `length` seconds long."""
+    def __init__(self, path, length=120.0):
+        self.path = path
+        self.length = length
+        self.lock = threading.Lock()
+        self.start_at = time.monotonic()
+        self.position = 0.0
+        self.paused = False
+        self.osd_level = 1
+        self.commands = []
+        self.quit = False
+        # connection -> [(observer id, property name)]
+        self.observers = {}
+        if os.path.exists(path):
+            os.unlink(path)
+        self.server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.server.bind(path)
+        self.server.listen(16)
+        self.thread = threading.Thread(target=self.accept_loop, daemon=True)
+        self.thread.start()
+
+    def time_pos(self):
+        # caller holds the lock
+        if self.paused:
+            return self.position
+        return min(self.length, self.position + time.monotonic() - self.start_at)
+
+    def get(self, name):
+        if name == 'time-pos':
+            return self.time_pos()
+        if name == 'duration':
+            return self.length
+        if name == 'pause':
+            return self.paused
+        if name == 'percent-pos':
+            return 100.0 * self.time_pos() / self.length
+        if name == 'osd-level':
+            return self.osd_level
+        raise KeyError(name)
+
+    def accept_loop(self):
+        while True:
+            try:
+                conn, _ = self.server.accept()
+            except OSError:
+                return
+            with self.lock:
+                self.observers[conn] = []
+            threading.Thread(target=self.serve, args=(conn,), daemon=True).start()
+
+    def serve(self, conn):
+        with conn.makefile('rb') as lines:
+            for line in lines:
+                message = json.loads(line)
+                with self.lock:
+                    reply, changed = self.run(conn, message.get('command', []))
+                    reply['request_id'] = message.get('request_id', 0)
+                    self.write(conn, reply)
+                    for name in changed:
+                        self.notify(name)
+                    if self.quit:
+                        break
+        with self.lock:
+            self.observers.pop(conn, None)
+        conn.close()
+
+    def run(self, conn, command):
+        """One command -> (reply without request_id, properties it changed)."""
+        self.commands.append(command)
+        name, args = (command[0], command[1:]) if command else ('', [])
+        try:
+            if name == 'get_property':
+                return {'error': 'success', 'data': self.get(args[0])}, ()
+            if name == 'observe_property':
+                self.observers[conn].append((args[0], args[1]))
+                self.write(conn, self.change(args[0], args[1]))
+                return {'error': 'success'}, ()
+            if name in ('cycle', 'set_property') and args[0] == 'pause':
+                position = self.time_pos()
+                self.paused = not self.paused if name == 'cycle' else bool(args[1])
+                self.position, self.start_at = position, time.monotonic()
+                return {'error': 'success'}, ('pause', 'time-pos')
+            if name == 'cycle-values' and args[0] == 'osd-level':
+                values = [int(v) for v in args[1:]]
+                self.osd_level = values[(values.index(self.osd_level) + 1) % len(values)] \
+                    if self.osd_level in values else values[0]
+                return {'error': 'success'}, ()
+            if name == 'seek':
+                value, kind = float(args[0]), args[1] if len(args) > 1 else 'relative'
+                target = {'relative': self.time_pos() + value, 'absolute': value,
+                          'absolute-percent': self.length * value / 100.0}[kind]
+                self.position, self.start_at = max(0.0, min(self.length, target)), time.monotonic()
+                return {'error': 'success'}, ('time-pos',)
+            if name == 'quit':
+                self.quit = True
+                return {'error': 'success'}, ()
+            if name == 'client_name':
+                return {'error': 'success', 'data': 'fake'}, ()
+        except (IndexError, KeyError, ValueError):
+            return {'error': 'invalid parameter'}, ()
+        return {'error': 'invalid parameter'}, ()
+
+    def change(self, observer, name):
+        return {'event': 'property-change', 'id': observer, 'name': name, 'data': self.get(name)}
+
+    def notify(self, name):
+        for conn, observed in list(self.observers.items()):
+            for observer, observed_name in observed:
+                if observed_name == name:
+                    self.write(conn, self.change(observer, name))
+
+    def write(self, conn, message):
+        try:
+            conn.sendall((json.dumps(message) + '\n').encode())
+        except OSError:
+            pass
+
+    def close(self):
+        self.server.close()
+        with self.lock:
+            for conn in self.observers:
+                try:
+                    conn.shutdown(socket.SHUT_RDWR)
+                except OSError:
+                    pass
+        if os.path.exists(self.path):
+            os.unlink(self.path)
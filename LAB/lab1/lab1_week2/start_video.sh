@@ -2,17 +2,10 @@
 # start_video.sh - Launch video playback and control program
 # ECE 5725 Lab 1 Week 2
 
-# Ensure FIFO exists
 FIFO_PATH="/home/pi/ECE-5725-Everything/LAB/lab1/lab1_week2/video_fifo"
-[ -p "$FIFO_PATH" ] || mkfifo "$FIFO_PATH"
 
-# Start video control program (run in background)
-echo "Starting video control program..."
-python3 video_control.py &
-
-# Wait a moment to ensure control program is started
-sleep 1
-
-# Start mplayer to play video
-echo "Starting video playback..."
-mplayer -slave -input file=./video_fifo -vo fbdev:/dev/fb1 bigbuckbunny320p.mp4
\ No newline at end of file
+# Start the control program and mplayer at once; video_launcher.py waits until
+# mplayer has the FIFO open and the controller says it is ready (no fixed sleep).
+# Add --wait-controller to hold mplayer back until the controller is ready.
+exec python3 video_launcher.py --fifo "$FIFO_PATH" --controller "python3 video_control.py" -- \
+    mplayer -slave -input file=./video_fifo -vo fbdev:/dev/fb1 bigbuckbunny320p.mp4
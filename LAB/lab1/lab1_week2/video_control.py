@@ -4,9 +4,11 @@ video_control.py - Control video playback using piTFT buttons
 ECE 5725 Lab 1 Week 2
 """
 
-import RPi.GPIO as GPIO
 import os
-import time
+
+from button_service import ButtonService
+from player_backend import open_backend
+from video_launcher import notify_ready
 
 # FIFO file path
 FIFO_PATH = "/home/pi/ECE-5725-Everything/LAB/lab1/lab1_week2/video_fifo"
@@ -19,63 +21,58 @@ BUTTONS = {
     'QUIT': {'pin': 27, 'command': 'quit'}         # Exit
 }
 
-def setup():
-    """Initialize GPIO and FIFO"""
-    # Set GPIO mode to BCM
-    GPIO.setmode(GPIO.BCM)
-    
-    # Set all button pins as inputs with internal pull-up resistors
-    for button in BUTTONS.values():
-        GPIO.setup(button['pin'], GPIO.IN, pull_up_down=GPIO.PUD_UP)
+service = ButtonService()
+
+def on_press(name, button, channel):
+    """Handle one debounced press; runs on the button service thread"""
+    print(f"Button {name} (GPIO {button['pin']}) pressed")
+    send_command(channel, button['command'])
+
+    # Exit program if quit command
+    if button['command'] == 'quit':
+        print("Exiting program...")
+        service.stop()
+
+def setup(channel):
+    """Register the buttons and create the FIFO"""
+    # Register every button (input with internal pull-up) with the service
+    for name, button in BUTTONS.items():
+        service.add(button['pin'], press=lambda pin, name=name, button=button: on_press(name, button, channel))
     
     # Create FIFO if it doesn't exist
     if not os.path.exists(FIFO_PATH):
         os.mkfifo(FIFO_PATH)
 
-def send_command(command):
-    """Send command to FIFO"""
-    try:
-        with open(FIFO_PATH, 'w') as fifo:
-            fifo.write(command + '\n')
-            fifo.flush()
-    except Exception as e:
-        print(f"Error sending command: {e}")
+def send_command(channel, command):
+    """Send command to the player backend"""
+    if not channel.send(command):
+        print(f"Player not reachable yet, {command} not delivered")
 
 def main():
+    # one non-blocking channel for the whole run, picked by PLAYER_BACKEND (player_backend.py);
+    # opened here rather than at import, since the slave backend starts mplayer
+    channel = open_backend(FIFO_PATH)
     try:
         # Initialize setup
-        setup()
+        setup(channel)
         print("Video control program started")
         print("Button functions:")
         for name, button in BUTTONS.items():
             print(f"{name} (GPIO {button['pin']}): {button['command']}")
         
-        # Main loop
-        while True:
-            # Check all buttons
-            for name, button in BUTTONS.items():
-                if not GPIO.input(button['pin']):
-                    print(f"Button {name} (GPIO {button['pin']}) pressed")
-                    send_command(button['command'])
-                    
-                    # Exit program if quit command
-                    if button['command'] == 'quit':
-                        print("Exiting program...")
-                        return
-                    
-                    # Prevent button bounce
-                    time.sleep(0.5)
-            
-            # Short sleep to reduce CPU usage
-            time.sleep(0.1)
+        # Button edges are handled on the service thread until quit
+        service.start()
+        notify_ready()
+        service.wait()
             
     except KeyboardInterrupt:
         print("\nProgram interrupted by user")
     except Exception as e:
         print(f"Error occurred: {e}")
     finally:
-        # Clean up GPIO settings
-        GPIO.cleanup()
+        # Release the buttons' pins
+        service.cleanup()
+        channel.close()
         print("GPIO cleanup completed")
 
 if __name__ == "__main__":
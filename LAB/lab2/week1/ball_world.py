@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""
+ball_world.py - Bouncing balls as NumPy arrays, for two_collide and its controllers
+ECE 5725 Lab 2
+
+Positions, velocities, radii and masses live in contiguous arrays, one row
+per ball, so a step is a handful of array operations whatever the number of
+balls. Moving and bouncing off the walls is done for all balls at once.
+Contacts are found by sweep and prune: sort by horizontal band, then x,
+and compare each ball only with the balls just after it in its own band
+and the run of balls at about the same x in the band below. The few balls
+much bigger than the rest are tested against every ball instead. Each contact is resolved with an elastic
+impulse along the line between the centres, weighted by inverse mass, and
+overlapping balls are pushed apart the same way so they cannot stick.
+Contacts are resolved in batches in which no ball appears twice, so a ball
+caught between several others takes one bounce after another, as it would
+in a loop over pairs, and every bounce keeps momentum and energy.
+Balls may differ in radius and mass; by default a ball's mass is its area.
+
+    world = BallWorld(320, 240)
+    world.add(112, 120, 2.5, 1.8, radius=25)
+    world.add(208, 120, -1.8, -2.2, radius=25)
+    world.add_random(1000, radius=(2, 4))
+    world.step()                    # one frame; step(dt) scales the move
+    for (x, y), r in zip(world.positions, world.radii): ...
+"""
+import numpy as np
+
+CAPACITY = 16
+RESTITUTION = 1.0
+
+
+class BallWorld(object):
+    def __init__(self, width, height, capacity=CAPACITY, restitution=RESTITUTION, seed=0):
+        self.size = np.array([width, height], dtype=float)
+        self.restitution = restitution
+        self.count = 0
+        self.pos = np.zeros((capacity, 2))
+        self.vel = np.zeros((capacity, 2))
+        self.radius = np.zeros(capacity)
+        self.mass = np.zeros(capacity)
+        # picks the order contacts are resolved in when balls touch several at once
+        self.rng = np.random.default_rng(seed)
+        # contacts resolved by the last step()
+        self.contacts = 0
+
+    def add(self, x, y, vx, vy, radius, mass=None):
+        """Add one ball; returns its index."""
+        if self.count == len(self.radius):
+            self.grow(self.count + 1)
+        i = self.count
+        self.pos[i] = x, y
+        self.vel[i] = vx, vy
+        self.radius[i] = radius
+        self.mass[i] = np.pi * radius * radius if mass is None else mass
+        self.count += 1
+        return i
+
+    def add_random(self, count, radius=(3.0, 6.0), speed=2.0, seed=None):
+        """Add count balls at random places with random velocities and radii, mass by area."""
+        rng = np.random.default_rng(seed)
+        self.grow(self.count + count)
+        new = slice(self.count, self.count + count)
+        radii = rng.uniform(radius[0], radius[1], count)
+        self.pos[new] = rng.uniform(radii[:, None], self.size - radii[:, None])
+        self.vel[new] = rng.uniform(-speed, speed, (count, 2))
+        self.radius[new] = radii
+        self.mass[new] = np.pi * radii * radii
+        self.count += count
+
+    def grow(self, needed):
+        """Make room for at least needed balls, doubling so adding one at a time stays cheap."""
+        capacity = max(len(self.radius), 1)
+        while capacity < needed:
+            capacity *= 2
+        if capacity == len(self.radius):
+            return
+        for name in ('pos', 'vel', 'radius', 'mass'):
+            old = getattr(self, name)
+            new = np.zeros((capacity,) + old.shape[1:])
+            new[:self.count] = old[:self.count]
+            setattr(self, name, new)
+
+    @property
+    def positions(self):
+        return self.pos[:self.count]
+
+    @property
+    def velocities(self):
+        return self.vel[:self.count]
+
+    @property
+    def radii(self):
+        return self.radius[:self.count]
+
+    def step(self, dt=1.0):
+        n = self.count
+        self.pos[:n] += self.vel[:n] * dt
+        self.collide()
+        self.walls()
+
+    def walls(self):
+        """Clamp every ball inside and point its velocity back in; last, so pushes cannot leave a ball outside."""
+        n = self.count
+        pos, vel, r = self.pos[:n], self.vel[:n], self.radius[:n, None]
+        low = pos < r
+        high = pos > self.size - r
+        np.copyto(pos, np.broadcast_to(r, pos.shape), where=low)
+        np.copyto(pos, self.size - r, where=high)
+        np.abs(vel, out=vel, where=low)
+        np.negative(np.abs(vel), out=vel, where=high)
+
+    def pairs(self):
+        """(i, j) index arrays of every pair of touching balls, i != j."""
+        n = self.count
+        empty = np.empty(0, dtype=np.intp)
+        if n < 2:
+            return empty, empty
+        # a few big balls among many small ones (two_collide with BALLS set)
+        # would widen every band; test them against every ball instead
+        r = self.radius[:n]
+        big = r > 2.0 * np.median(r)
+        i, j = self.sweep(np.flatnonzero(~big))
+        if not big.any():
+            return i, j
+        bi, bj = self.against(np.flatnonzero(big))
+        return np.concatenate((i, bi)), np.concatenate((j, bj))
+
+    def sweep(self, index):
+        """Touching pairs among balls index, by sweep and prune over bands."""
+        empty = np.empty(0, dtype=np.intp)
+        n = len(index)
+        if n < 2:
+            return empty, empty
+        pos, r = self.pos[index], self.radius[index]
+        reach = 2.0 * r.max()
+        # sort by band of height reach, then x: a ball can only touch balls in
+        # its own band a little further along, or in the next band at about its x
+        span = self.size[0] + 2.0 * reach
+        key = np.floor(pos[:, 1] / reach) * span + pos[:, 0]
+        order = np.argsort(key)
+        key, pos, r, order = key[order], pos[order], r[order], index[order]
+        found_i, found_j = [empty], [empty]
+
+        def test(a, b):
+            d = pos[b] - pos[a]
+            rr = r[a] + r[b]
+            hit = np.einsum('ij,ij->i', d, d) <= rr * rr
+            found_i.append(order[a[hit]])
+            found_j.append(order[b[hit]])
+
+        # same band: the k-th next ball in the sort, while any is within reach;
+        # key only grows, so a ball out of reach at k is out of reach after k
+        near = np.arange(n - 1)
+        k = 1
+        while near.size:
+            near = near[near + k < n]
+            near = near[key[near + k] - key[near] <= reach]
+            test(near, near + k)
+            k += 1
+        # next band: the balls with x within reach form one run of the sort
+        lo = np.searchsorted(key, key + span - reach)
+        hi = np.searchsorted(key, key + span + reach, side='right')
+        near = np.arange(n)
+        m = 0
+        while near.size:
+            near = near[lo[near] + m < hi[near]]
+            test(near, lo[near] + m)
+            m += 1
+        return np.concatenate(found_i), np.concatenate(found_j)
+
+    def against(self, big):
+        """Touching pairs between balls big and every ball, each pair once."""
+        n = self.count
+        d = self.pos[None, :n] - self.pos[big, None]
+        rr = self.radius[big, None] + self.radius[None, :n]
+        hit = np.einsum('ijk,ijk->ij', d, d) <= rr * rr
+        # drop a ball against itself, and a big pair seen from its other end
+        others = np.arange(n)
+        is_big = np.zeros(n, dtype=bool)
+        is_big[big] = True
+        hit &= ~is_big[None, :] | (others[None, :] > big[:, None])
+        a, b = np.nonzero(hit)
+        return big[a], b
+
+    def collide(self):
+        """Bounce every touching pair, a batch of pairs with no ball in common at a time."""
+        i, j = self.pairs()
+        self.contacts = len(i)
+        best = np.empty(self.count)
+        while len(i):
+            # each pair draws a number and goes in this batch if it drew the
+            # lowest among the pairs at both its balls; the rest wait
+            draw = self.rng.random(len(i))
+            best.fill(np.inf)
+            np.minimum.at(best, i, draw)
+            np.minimum.at(best, j, draw)
+            batch = (best[i] == draw) & (best[j] == draw)
+            self.bounce(i[batch], j[batch])
+            i, j = i[~batch], j[~batch]
+
+    def bounce(self, i, j):
+        """Separate and bounce pairs (i, j); no ball may appear twice."""
+        d = self.pos[j] - self.pos[i]
+        dist = np.sqrt(np.einsum('ij,ij->i', d, d))
+        # balls exactly on top of each other: separate them along x
+        same = dist == 0
+        d[same] = (1.0, 0.0)
+        dist[same] = 1.0
+        normal = d / dist[:, None]
+        inv_i, inv_j = 1.0 / self.mass[i], 1.0 / self.mass[j]
+        inv_sum = inv_i + inv_j
+        # push overlapping balls apart, the lighter one further
+        overlap = np.maximum(self.radius[i] + self.radius[j] - dist, 0.0)
+        push = normal * (overlap / inv_sum)[:, None]
+        self.pos[i] -= push * inv_i[:, None]
+        self.pos[j] += push * inv_j[:, None]
+        # closing speed along the normal; only balls moving together bounce
+        closing = np.einsum('ij,ij->i', self.vel[i] - self.vel[j], normal)
+        impulse = np.where(closing > 0, (1.0 + self.restitution) * closing / inv_sum, 0.0)
+        kick = normal * impulse[:, None]
+        self.vel[i] -= kick * inv_i[:, None]
+        self.vel[j] += kick * inv_j[:, None]
+
+    def energy(self):
+        """Total kinetic energy, for checking that bounces keep it."""
+        n = self.count
+        return 0.5 * float(np.sum(self.mass[:n] * np.einsum('ij,ij->i', self.vel[:n], self.vel[:n])))
+
+    def momentum(self):
+        n = self.count
+        return (self.mass[:n, None] * self.vel[:n]).sum(axis=0)
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+ball_world_perf.py - Step time against ball count: BallWorld against two_collide's dict-per-ball loop
+ECE 5725 Lab 2
+
+Fills the 320x240 piTFT with N balls covering PACKING of the screen (radius
+25 at most, as in two_collide) and times step(). The dict loop is the way
+two_collide.py and control_two_collide.py moved their balls before
+ball_world.py, with the pair check run over every pair; it is only timed
+up to --dict-max balls, as it grows with the square of the count. A frame
+at 60 Hz has 16.7 ms for the physics and the drawing together.
+
+    python3 ball_world_perf.py [--counts 2,10,100,200,1000,2000,5000,10000] [--steps 120]
+"""
+import argparse
+import math
+import time
+
+from ball_world import BallWorld
+
+WIDTH, HEIGHT = 320, 240
+PACKING = 0.2
+MAX_RADIUS = 25.0
+FRAME_MS = 1000.0 / 60
+COUNTS = '2,10,100,200,1000,2000,5000,10000'
+STEPS = 120
+DICT_MAX = 200
+
+
+def radius_for(count):
+    return min(MAX_RADIUS, math.sqrt(PACKING * WIDTH * HEIGHT / (count * math.pi)))
+
+
+def make_world(count):
+    world = BallWorld(WIDTH, HEIGHT)
+    r = radius_for(count)
+    world.add_random(count, radius=(0.7 * r, r), seed=count)
+    return world
+
+
+def dict_step(balls):
+    """One frame the way two_collide did it: a dict per ball, every pair checked."""
+    for b in balls:
+        r = b['r']
+        b['x'] += b['vx']
+        b['y'] += b['vy']
+        if b['x'] - r < 0:
+            b['x'] = r
+            b['vx'] = -b['vx']
+        elif b['x'] + r > WIDTH:
+            b['x'] = WIDTH - r
+            b['vx'] = -b['vx']
+        if b['y'] - r < 0:
+            b['y'] = r
+            b['vy'] = -b['vy']
+        elif b['y'] + r > HEIGHT:
+            b['y'] = HEIGHT - r
+            b['vy'] = -b['vy']
+    for k, b1 in enumerate(balls):
+        for b2 in balls[k + 1:]:
+            dx = b2['x'] - b1['x']
+            dy = b2['y'] - b1['y']
+            rr = b1['r'] + b2['r']
+            if dx * dx + dy * dy <= rr * rr:
+                dist = math.hypot(dx, dy) or 1.0
+                nx, ny = dx / dist, dy / dist
+                overlap = rr - dist
+                b1['x'] -= nx * overlap / 2
+                b1['y'] -= ny * overlap / 2
+                b2['x'] += nx * overlap / 2
+                b2['y'] += ny * overlap / 2
+                closing = (b1['vx'] - b2['vx']) * nx + (b1['vy'] - b2['vy']) * ny
+                if closing > 0:
+                    b1['vx'] -= closing * nx
+                    b1['vy'] -= closing * ny
+                    b2['vx'] += closing * nx
+                    b2['vy'] += closing * ny
+
+
+def median_ms(step, steps):
+    times = []
+    for _ in range(steps):
+        t0 = time.perf_counter()
+        step()
+        times.append(time.perf_counter() - t0)
+    times.sort()
+    return times[len(times) // 2] * 1e3
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--counts', default=COUNTS, help="comma-separated ball counts")
+    parser.add_argument('--steps', type=int, default=STEPS, help="steps timed per count")
+    parser.add_argument('--dict-max', type=int, default=DICT_MAX, help="largest count to time the dict loop at")
+    args = parser.parse_args()
+
+    print(f"{'balls':>6} {'radius':>7} {'contacts':>9} {'world ms':>9} {'dict ms':>9} {'speedup':>8}  fits 60 Hz")
+    for count in (int(c) for c in args.counts.split(',')):
+        world = make_world(count)
+        # let the random start settle before timing
+        for _ in range(30):
+            world.step()
+        contacts = []
+        world_ms = median_ms(lambda: (world.step(), contacts.append(world.contacts)), args.steps)
+        dict_ms = None
+        if count <= args.dict_max:
+            balls = [{'x': x, 'y': y, 'vx': vx, 'vy': vy, 'r': r}
+                     for (x, y), (vx, vy), r in zip(world.positions.tolist(), world.velocities.tolist(),
+                                                    world.radii.tolist())]
+            dict_ms = median_ms(lambda: dict_step(balls), args.steps)
+        dict_col = f"{dict_ms:>9.3f} {dict_ms / world_ms:>7.1f}x" if dict_ms is not None else f"{'-':>9} {'-':>8}"
+        print(f"{count:>6} {radius_for(count):>7.1f} {sorted(contacts)[len(contacts) // 2]:>9} {world_ms:>9.3f} "
+              f"{dict_col}  {'yes' if world_ms < FRAME_MS else 'NO'}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+ball_world_test.py - Checks ball_world.BallWorld: head-on and unequal-mass
+bounces against the textbook answer, contacts found by sweep and prune
+against testing every pair, balls kept inside the walls, and the two_collide
+balls parting after every contact instead of sticking.
+"""
+import sys
+
+import numpy as np
+
+from ball_world import BallWorld
+
+
+def check_head_on():
+    # equal masses meeting head on swap velocities
+    world = BallWorld(400, 100)
+    world.add(100, 50, 3.0, 0.0, radius=20)
+    world.add(200, 50, -1.0, 0.0, radius=20)
+    for _ in range(40):
+        world.step()
+    v = world.velocities
+    ok = np.allclose(v, [[-1.0, 0.0], [3.0, 0.0]])
+    return ok, f"velocities after {v[:, 0].tolist()}"
+
+
+def check_unequal():
+    m1, m2, u1, u2 = 1.0, 3.0, 4.0, -2.0
+    world = BallWorld(1000, 200)
+    world.add(300, 100, u1, 0.0, radius=10, mass=m1)
+    world.add(400, 100, u2, 0.0, radius=30, mass=m2)
+    p0, e0 = world.momentum(), world.energy()
+    for _ in range(30):
+        world.step()
+    v1 = ((m1 - m2) * u1 + 2 * m2 * u2) / (m1 + m2)
+    v2 = ((m2 - m1) * u2 + 2 * m1 * u1) / (m1 + m2)
+    v = world.velocities[:, 0]
+    ok = (np.allclose(v, [v1, v2]) and np.allclose(world.momentum(), p0)
+          and abs(world.energy() - e0) < 1e-9 * e0)
+    return ok, f"velocities {v.tolist()}, expected {[v1, v2]}"
+
+
+def every_pair(world):
+    pos, r = world.positions, world.radii
+    d = np.hypot(*(pos[:, None, :] - pos[None, :, :]).transpose(2, 0, 1))
+    a, b = np.nonzero(np.triu(d <= r[:, None] + r[None, :], 1))
+    return set(zip(a.tolist(), b.tolist()))
+
+
+def check_pairs():
+    details = []
+    ok = True
+    for name, big in (('similar sizes', 0), ('with big balls', 6)):
+        world = BallWorld(320, 240)
+        world.add_random(800, radius=(2.0, 8.0), seed=5)
+        world.add_random(big, radius=(20.0, 30.0), seed=6)
+        i, j = world.pairs()
+        found = {(min(a, b), max(a, b)) for a, b in zip(i.tolist(), j.tolist())}
+        expected = every_pair(world)
+        ok = ok and found == expected and len(i) == len(found)
+        details.append(f"{name} {len(found)} of {len(expected)}")
+    return ok, f"contacts found, {', '.join(details)}"
+
+
+def check_walls():
+    world = BallWorld(320, 240)
+    world.add_random(2000, radius=(1.5, 3.0), speed=4.0, seed=7)
+    p0, e0 = world.momentum(), world.energy()
+    inside = True
+    for _ in range(600):
+        world.step(1.5)
+        pos, r = world.positions, world.radii[:, None]
+        inside = inside and bool(np.all(pos >= r - 1e-9) and np.all(pos <= world.size - r + 1e-9))
+    drift = abs(world.energy() - e0) / e0
+    return inside and drift < 0.02, f"inside walls {inside}, energy drift {drift:.2%} after 600 steps"
+
+
+def check_no_sticking():
+    # the two_collide start: every contact must be over within a couple of frames
+    world = BallWorld(320, 240)
+    world.add(320 * 0.35, 120, 2.5, 1.8, radius=25)
+    world.add(320 * 0.65, 120, -1.8, -2.2, radius=25)
+    frames = contacts = longest = run = 0
+    for _ in range(3600):
+        world.step()
+        if world.contacts:
+            frames += 1
+            run += 1
+            contacts += run == 1
+            longest = max(longest, run)
+        else:
+            run = 0
+    return contacts > 0 and longest <= 2, f"{contacts} contacts in 3600 frames, longest {longest} frames"
+
+
+def main():
+    failed = 0
+    for name, check in (('head on', check_head_on), ('unequal masses', check_unequal),
+                        ('pairs', check_pairs), ('walls', check_walls), ('no sticking', check_no_sticking)):
+        ok, detail = check()
+        print(f"{'PASS' if ok else 'FAIL'} {name}: {detail}")
+        failed += not ok
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
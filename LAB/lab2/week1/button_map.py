@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+button_map.py - Table-driven chords, long presses and auto-repeat for a button bank
+ECE 5725 Lab 2
+
+Bindings are rows of (kind, buttons, command[, options]); buttons is a pin
+or a tuple of pins pressed together (a chord):
+
+    BINDINGS = (
+        ('press',  17,       'pause'),
+        ('repeat', 22,       'seek 10', {'delay': 0.4, 'every': 0.2}),
+        ('long',   27,       'quit',    {'sec': 1.0}),
+        ('press',  (22, 23), 'seek 0 2'),
+    )
+    buttons = ButtonMap(BINDINGS, handler=send_command)
+
+    press   command when the buttons go down; if the same buttons also have a
+            long binding it waits for the release instead, and is skipped
+            once the long press has fired
+    long    command once the buttons have been held for options['sec']
+    repeat  command on the press, then every options['every'] seconds after
+            options['delay'] while held
+
+Every set of held buttons that is, or is part of, a bound chord becomes a
+node in a table built once up front, with its commands, timers and
+transitions (node, pin) -> node. A node that is part of a larger chord waits
+CHORD_SEC for the rest of the chord before acting as itself. ChordEngine
+runs the table on (pin, pressed, t) edges and timer deadlines and returns
+the commands with the times they fired. It never reads a clock, so the same
+edges always give the same commands at the same times. ButtonMap feeds it
+debounced edges from ButtonService, with kernel timestamps on the
+character-device backend, and runs the handler on the dispatcher thread.
+"""
+
+from button_service import ButtonService, DEBOUNCE_SEC, LONG_PRESS_SEC, REPEAT_DELAY_SEC, REPEAT_SEC
+
+CHORD_SEC = 0.05
+LATE_SEC = 0.05
+KINDS = ('press', 'long', 'repeat')
+
+
+class Node:
+    """One set of held buttons: what it does and where each further press leads."""
+    def __init__(self, mask):
+        self.mask = mask
+        self.press = None
+        self.long = None      # (sec, command)
+        self.repeat = None    # (delay, every, command)
+        # seconds to wait for the rest of a larger chord, 0 if there is none
+        self.wait = 0.0
+        # pin -> Node, only where the new set is still a node
+        self.next = {}
+
+
+def pins_of(buttons):
+    return tuple(buttons) if isinstance(buttons, (tuple, list, set, frozenset)) else (buttons,)
+
+
+class BindingTable:
+    def __init__(self, bindings, chord_sec=CHORD_SEC, long_press_sec=LONG_PRESS_SEC,
+                 repeat_delay=REPEAT_DELAY_SEC, repeat_sec=REPEAT_SEC):
+        rows = []
+        pins = set()
+        for row in bindings:
+            kind, buttons, command = row[:3]
+            options = row[3] if len(row) > 3 else {}
+            if kind not in KINDS:
+                raise ValueError(f"unknown binding kind {kind!r}, expected one of {KINDS}")
+            chord = frozenset(pins_of(buttons))
+            pins |= chord
+            rows.append((kind, chord, command, options))
+        self.pins = sorted(pins)
+        self.bit = {pin: 1 << i for i, pin in enumerate(self.pins)}
+        bound = {}
+        for kind, chord, command, options in rows:
+            mask = 0
+            for pin in chord:
+                mask |= self.bit[pin]
+            node = bound.setdefault(mask, Node(mask))
+            if kind == 'press':
+                node.press = command
+            elif kind == 'long':
+                node.long = (options.get('sec', long_press_sec), command)
+            else:
+                node.repeat = (options.get('delay', repeat_delay), options.get('every', repeat_sec), command)
+        # every subset of a bound chord is a node, so a chord can be pressed in any order
+        self.nodes = {}
+        for mask in bound:
+            sub = mask
+            while sub:
+                self.nodes.setdefault(sub, bound.get(sub) or Node(sub))
+                sub = (sub - 1) & mask
+        for mask, node in self.nodes.items():
+            node.wait = chord_sec if any(other != mask and other & mask == mask for other in bound) else 0.0
+            for pin, bit in self.bit.items():
+                if not mask & bit and mask | bit in self.nodes:
+                    node.next[pin] = self.nodes[mask | bit]
+
+    def single(self, pin):
+        return self.nodes.get(self.bit[pin])
+
+
+class ChordEngine:
+    """Runs a BindingTable on edges; feed() and advance() return [(command, t), ...] in firing order.
+
+    With late_sec set, repeats that fall due more than late_sec before the time
+    passed to advance() are skipped rather than fired in a burst.
+    """
+    def __init__(self, table, late_sec=None):
+        self.table = table
+        self.late_sec = late_sec
+        self.node = None
+        self.since = None
+        self.pending_until = None
+        self.long_at = None
+        self.repeat_at = None
+        self.long_fired = False
+
+    def next_deadline(self):
+        deadlines = [t for t in (self.pending_until, self.long_at, self.repeat_at) if t is not None]
+        return min(deadlines) if deadlines else None
+
+    def advance(self, now):
+        """Fire every timer due by now."""
+        fired = []
+        while True:
+            t = self.next_deadline()
+            if t is None or t > now:
+                return fired
+            if t == self.pending_until:
+                self.settle(t, fired)
+            elif t == self.long_at:
+                self.long_at = None
+                self.long_fired = True
+                fired.append((self.node.long[1], t))
+            else:
+                delay, every, command = self.node.repeat
+                if self.late_sec is None or now - t <= self.late_sec:
+                    fired.append((command, t))
+                self.repeat_at = t + every
+
+    def feed(self, pin, pressed, t):
+        """One debounced edge: pin went down (pressed) or up at time t."""
+        fired = self.advance(t)
+        if pin not in self.table.bit:
+            return fired
+        if pressed:
+            node = self.node.next.get(pin) if self.node is not None and self.pending_until is not None else None
+            if node is not None:
+                # the rest of a chord arrived in time: the smaller set never acts
+                self.enter(node, t, fired)
+            else:
+                if self.node is not None and self.pending_until is not None:
+                    # another button interrupted the wait: the first acts alone
+                    self.settle(t, fired)
+                self.leave()
+                node = self.table.single(pin)
+                if node is not None:
+                    self.enter(node, t, fired)
+        elif self.node is not None and self.node.mask & self.table.bit[pin]:
+            if self.pending_until is not None:
+                self.settle(t, fired)
+            node = self.node
+            if node.press is not None and node.long is not None and not self.long_fired:
+                fired.append((node.press, t))
+            self.leave()
+        return fired
+
+    def enter(self, node, t, fired):
+        self.node = node
+        self.since = t
+        self.long_fired = False
+        self.long_at = None
+        self.repeat_at = None
+        if node.wait:
+            self.pending_until = t + node.wait
+        else:
+            self.settle(t, fired)
+
+    def settle(self, t, fired):
+        node = self.node
+        self.pending_until = None
+        if node.press is not None and node.long is None:
+            fired.append((node.press, t))
+        if node.repeat is not None:
+            fired.append((node.repeat[2], t))
+            self.repeat_at = self.since + node.repeat[0]
+        if node.long is not None:
+            self.long_at = self.since + node.long[0]
+
+    def leave(self):
+        self.node = None
+        self.pending_until = None
+        self.long_at = None
+        self.repeat_at = None
+
+
+class ButtonMap(ButtonService):
+    """ButtonService whose pins drive a ChordEngine; handler(command) runs on the dispatcher thread."""
+    def __init__(self, bindings, handler, debounce=DEBOUNCE_SEC, backend=None, **timing):
+        super().__init__(debounce, backend)
+        self.table = BindingTable(bindings, **timing)
+        # a dispatcher held up by a slow handler skips repeats instead of bursting them
+        self.engine = ChordEngine(self.table, late_sec=LATE_SEC)
+        self.handler = handler
+
+    def start(self):
+        # pins are set up here rather than in __init__, so building a map at import touches no GPIO
+        for pin in self.table.pins:
+            if pin not in self.buttons:
+                self.add(pin)
+        super().start()
+
+    def change(self, button, pressed, t):
+        super().change(button, pressed, t)
+        self.run(self.engine.feed(button.pin, pressed, t))
+
+    def next_deadline(self):
+        deadlines = [t for t in (super().next_deadline(), self.engine.next_deadline()) if t is not None]
+        return min(deadlines) if deadlines else None
+
+    def run_timers(self, now):
+        super().run_timers(now)
+        self.run(self.engine.advance(now))
+
+    def run(self, fired):
+        for command, _ in fired:
+            self.handler(command)
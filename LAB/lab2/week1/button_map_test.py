@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+button_map_test.py - Checks button_map.ChordEngine on scripted edge
+sequences (exact commands and firing times), then ButtonMap end to end on a
+gpio_cdev.FakeChip.
+"""
+import sys
+import time
+
+import gpio_cdev
+from button_map import BindingTable, ButtonMap, ChordEngine
+from button_service import CdevBackend
+
+BINDINGS = (
+    ('press',  17,       'pause'),
+    ('repeat', 22,       'fwd',  {'delay': 0.4, 'every': 0.2}),
+    ('press',  23,       'rew'),
+    ('press',  27,       'menu'),
+    ('long',   27,       'quit', {'sec': 1.0}),
+    ('press',  (22, 23), 'restart'),
+)
+
+
+def play(edges, until):
+    """edges: [(t, pin, pressed)]; returns [(command, t)] with times rounded to ms."""
+    engine = ChordEngine(BindingTable(BINDINGS, chord_sec=0.05))
+    fired = []
+    for t, pin, pressed in edges:
+        fired += engine.feed(pin, pressed, t)
+    fired += engine.advance(until)
+    return [(command, round(t, 3)) for command, t in fired]
+
+
+def check_table():
+    table = BindingTable(BINDINGS, chord_sec=0.05)
+    single22 = table.single(22)
+    ok = (table.pins == [17, 22, 23, 27] and len(table.nodes) == 5 and single22.wait == 0.05
+          and table.single(17).wait == 0.0 and set(single22.next) == {23}
+          and single22.next[23].press == 'restart' and not table.single(17).next)
+    return ok, f"{len(table.nodes)} nodes for {len(BINDINGS)} bindings, 22 waits {single22.wait * 1000:.0f} ms"
+
+
+def check_sequences():
+    cases = [
+        # plain press: immediate
+        ([(1.0, 17, True), (1.1, 17, False)], [('pause', 1.0)]),
+        # chord in either order, within the window: only the chord fires
+        ([(1.0, 23, True), (1.03, 22, True), (1.2, 22, False), (1.2, 23, False)], [('restart', 1.03)]),
+        # too slow for a chord: each acts alone once its window has passed
+        ([(1.0, 22, True), (1.2, 22, False), (1.5, 23, True), (1.6, 23, False)], [('fwd', 1.05), ('rew', 1.55)]),
+        # hold 22: press, then every 0.2 s from 0.4 s after the press
+        ([(1.0, 22, True), (2.0, 22, False)], [('fwd', 1.05), ('fwd', 1.4), ('fwd', 1.6), ('fwd', 1.8), ('fwd', 2.0)]),
+        # 27 tapped: menu on release; held: quit at 1 s and no menu
+        ([(1.0, 27, True), (1.3, 27, False)], [('menu', 1.3)]),
+        ([(1.0, 27, True), (2.5, 27, False)], [('quit', 2.0)]),
+        # another button interrupts 22's chord wait: 22 acts alone first
+        ([(1.0, 22, True), (1.01, 17, True), (1.1, 17, False), (1.1, 22, False)], [('fwd', 1.01), ('pause', 1.01)]),
+    ]
+    failed = []
+    for edges, expected in cases:
+        got = play(edges, until=3.0)
+        if got != expected:
+            failed.append((edges, got, expected))
+    for edges, got, expected in failed:
+        print(f"  {edges}: got {got}, expected {expected}")
+    return not failed, f"{len(cases) - len(failed)}/{len(cases)} edge sequences"
+
+
+def check_button_map():
+    chip = gpio_cdev.FakeChip()
+    commands = []
+    buttons = ButtonMap(BINDINGS, handler=commands.append, backend=CdevBackend(chip), chord_sec=0.05)
+    buttons.start()
+    try:
+        t = time.monotonic()
+        # chord with a bouncing first contact
+        chip.set(23, 0, t)
+        chip.set(23, 1, t + 0.001)
+        chip.set(23, 0, t + 0.002)
+        chip.set(22, 0, t + 0.02)
+        time.sleep(0.1)
+        chip.set(22, 1)
+        chip.set(23, 1)
+        chip.set(17, 0)
+        time.sleep(0.05)
+        chip.set(17, 1)
+        time.sleep(0.05)
+    finally:
+        buttons.stop()
+        buttons.wait(1.0)
+        buttons.cleanup()
+    return commands == ['restart', 'pause'], f"commands {commands}"
+
+
+def main():
+    failed = 0
+    for name, check in (('table', check_table), ('sequences', check_sequences), ('button map', check_button_map)):
+        ok, detail = check()
+        print(f"{'PASS' if ok else 'FAIL'} {name}: {detail}")
+        failed += not ok
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+gpio_bank.py - All 32 bank-0 GPIO levels from one register read
+ECE 5725 Lab 2
+
+/dev/gpiomem maps the BCM283x/BCM2711 GPIO block into user space without
+root. GPLEV0 holds the level of GPIO 0-31, one bit each, so a scan of every
+button is a single 32-bit load from the mapping: no syscall and no
+per-pin C call. Pins still have to be set up (direction, pull-ups) through
+RPi.GPIO first; this only reads. Not for the Pi 5, whose GPIO sits behind
+the RP1 with a different layout.
+
+    bank = GpioBank(watch=[17, 22, 23, 27])
+    while True:
+        levels, fell, rose = bank.diff()
+        for pin in pins(fell):
+            print(pin, "pressed")
+
+FakeGpioMem is a file laid out like the GPIO block, for running without a
+Pi: GpioBank(fake.path) maps it the same way, and fake.set() changes levels.
+"""
+import mmap
+import os
+import tempfile
+
+GPIOMEM = '/dev/gpiomem'
+BLOCK_SIZE = 4096
+# byte offset of the pin level register for GPIO 0-31
+GPLEV0 = 0x34
+BANK_PINS = 32
+
+
+def mask(pins):
+    """Bitmask with a bit set for each bank-0 pin in pins."""
+    bits = 0
+    for pin in pins:
+        if not 0 <= pin < BANK_PINS:
+            raise ValueError(f"GPIO {pin} is not in bank 0")
+        bits |= 1 << pin
+    return bits
+
+
+def pins(bits):
+    """Pin numbers of the set bits, lowest first."""
+    out = []
+    while bits:
+        low = bits & -bits
+        out.append(low.bit_length() - 1)
+        bits ^= low
+    return out
+
+
+class GpioBank(object):
+    def __init__(self, path=GPIOMEM, watch=None):
+        fd = os.open(path, os.O_RDONLY | os.O_SYNC)
+        try:
+            self.mem = mmap.mmap(fd, BLOCK_SIZE, mmap.MAP_SHARED, mmap.PROT_READ)
+        finally:
+            os.close(fd)
+        # element reads of an 'I' view are whole, aligned 32-bit loads, which the
+        # peripheral needs; slicing the mmap would read it a byte at a time
+        self.words = memoryview(self.mem).cast('I')
+        self.index = GPLEV0 // 4
+        self.watch = mask(watch) if watch is not None else (1 << BANK_PINS) - 1
+        self.last = self.read()
+
+    def read(self):
+        """Levels of GPIO 0-31 as a bitmask, bit n set when GPIO n is high."""
+        return self.words[self.index]
+
+    def level(self, pin):
+        return (self.words[self.index] >> pin) & 1
+
+    def diff(self):
+        """(levels, fell, rose): the new sample, and the watched pins that went low / high since the last diff()."""
+        levels = self.words[self.index]
+        changed = (levels ^ self.last) & self.watch
+        self.last = levels
+        return levels, changed & ~levels, changed & levels
+
+    def close(self):
+        if self.words is not None:
+            self.words.release()
+            self.words = None
+            self.mem.close()
+
+
+class FakeGpioMem(object):
+    """A temporary file standing in for /dev/gpiomem; every pin starts high (pulled up)."""
+    def __init__(self, levels=(1 << BANK_PINS) - 1):
+        fd, self.path = tempfile.mkstemp(prefix='gpiomem')
+        try:
+            os.ftruncate(fd, BLOCK_SIZE)
+            self.mem = mmap.mmap(fd, BLOCK_SIZE)
+        finally:
+            os.close(fd)
+        self.words = memoryview(self.mem).cast('I')
+        self.write(levels)
+
+    def write(self, levels):
+        self.words[GPLEV0 // 4] = levels & ((1 << BANK_PINS) - 1)
+
+    def set(self, pin, level):
+        levels = self.words[GPLEV0 // 4]
+        self.write(levels | (1 << pin) if level else levels & ~(1 << pin))
+
+    def close(self):
+        self.words.release()
+        self.mem.close()
+        os.unlink(self.path)
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+gpio_bank_test.py - Checks gpio_bank.GpioBank against a FakeGpioMem: mask
+helpers, levels, the fell/rose diff limited to watched pins, and how many
+scans per second a diff() loop manages.
+"""
+import sys
+import time
+
+from gpio_bank import GpioBank, FakeGpioMem, mask, pins
+
+BUTTONS = (17, 22, 23, 27, 26, 12)
+SCANS = 200000
+
+
+def check_masks():
+    bits = mask(BUTTONS)
+    ok = bits == (1 << 12 | 1 << 17 | 1 << 22 | 1 << 23 | 1 << 26 | 1 << 27) and pins(bits) == sorted(BUTTONS)
+    try:
+        mask([32])
+        ok = False
+    except ValueError:
+        pass
+    return ok, f"mask {bits:#010x} -> pins {pins(bits)}"
+
+
+def check_diff():
+    fake = FakeGpioMem()
+    bank = GpioBank(fake.path, watch=BUTTONS)
+    try:
+        steps = []
+        fake.set(17, 0)
+        fake.set(5, 0)  # not watched
+        steps.append(bank.diff()[1:])
+        steps.append(bank.diff()[1:])
+        fake.set(22, 0)
+        fake.set(27, 0)
+        fake.set(17, 1)
+        steps.append(bank.diff()[1:])
+        levels = bank.read()
+        expected = [(mask([17]), 0), (0, 0), (mask([22, 27]), mask([17]))]
+        ok = (steps == expected and bank.level(17) == 1 and bank.level(22) == 0 and bank.level(5) == 0
+              and levels == (1 << 32) - 1 & ~mask([5, 22, 27]))
+        return ok, "fell/rose " + ", ".join(f"{pins(f)}/{pins(r)}" for f, r in steps)
+    finally:
+        bank.close()
+        fake.close()
+
+
+def check_rate():
+    fake = FakeGpioMem()
+    bank = GpioBank(fake.path, watch=BUTTONS)
+    try:
+        t0 = time.perf_counter()
+        for _ in range(SCANS):
+            bank.diff()
+        elapsed = time.perf_counter() - t0
+    finally:
+        bank.close()
+        fake.close()
+    rate = SCANS / elapsed
+    return rate > 10000, f"{rate / 1000:.0f}k scans/s, {elapsed / SCANS * 1e6:.2f} us per six-button scan"
+
+
+def main():
+    failed = 0
+    for name, check in (('masks', check_masks), ('diff', check_diff), ('scan rate', check_rate)):
+        ok, detail = check()
+        print(f"{'PASS' if ok else 'FAIL'} {name}: {detail}")
+        failed += not ok
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+gpio_cdev_test.py - Checks gpio_cdev against a FakeChip: event records and
+batched reads, EdgeWatcher, and ButtonService on the character-device
+backend debouncing a chattering press by kernel timestamp, with a first
+edge near time zero taken as a press. When the kernel's gpio-sim module and
+configfs are available (root), the same edge check runs against a real
+simulated chip too; otherwise it is skipped.
+"""
+import os
+import sys
+import threading
+import time
+
+import gpio_cdev
+from button_service import ButtonService, CdevBackend
+
+GPIO_SIM_CONFIG = '/sys/kernel/config/gpio-sim'
+
+
+def check_events():
+    chip = gpio_cdev.FakeChip()
+    lines = chip.request([17, 22, 27], bias='up', edges='both')
+    try:
+        t0 = 1000.0
+        chip.set(17, 0, t0)
+        chip.set(22, 0, t0 + 0.001)
+        chip.set(17, 1, t0 + 0.002)
+        chip.set(5, 0, t0 + 0.003)  # not requested
+        chip.set(27, 1, t0 + 0.004)  # already high: no edge
+        ready = lines.wait(0.1)
+        events = lines.read_events()
+        got = [(e.offset, e.level, e.timestamp_ns, e.seqno, e.line_seqno) for e in events]
+        expected = [(17, 0, 1000000000000, 1, 1), (22, 0, 1000001000000, 2, 1), (17, 1, 1000002000000, 3, 2)]
+        ok = ready and got == expected and lines.values() == {17: 1, 22: 0, 27: 1} and not lines.wait(0)
+        return ok, f"{len(events)} events in one read: {[(e.offset, e.level) for e in events]}"
+    finally:
+        lines.close()
+
+
+def check_watcher():
+    chip = gpio_cdev.FakeChip()
+    lines = chip.request([23], bias='up', edges='falling')
+    seen = []
+    done = threading.Event()
+
+    def handler(event):
+        seen.append(event.level)
+        if len(seen) == 50:
+            done.set()
+
+    watcher = gpio_cdev.EdgeWatcher(lines, handler)
+    # queue the edges before the watcher runs, so they arrive as one batch
+    for _ in range(50):
+        chip.set(23, 0)
+        chip.set(23, 1)
+    watcher.start()
+    done.wait(1.0)
+    watcher.stop()
+    lines.close()
+    ok = seen == [0] * 50 and watcher.reads == 1
+    return ok, f"{watcher.events} falling edges in {watcher.reads} read(s), rising edges not requested"
+
+
+def check_button_service():
+    chip = gpio_cdev.FakeChip()
+    service = ButtonService(debounce=0.02, backend=CdevBackend(chip))
+    presses = []
+    releases = []
+    service.add(17, press=lambda pin: presses.append(time.monotonic()), release=lambda pin: releases.append(pin))
+    service.start()
+    try:
+        t = time.monotonic()
+        # a press with three bounces 1 ms apart, held, then a clean release
+        for i in range(3):
+            chip.set(17, 0, t + i * 0.002)
+            chip.set(17, 1, t + i * 0.002 + 0.001)
+        chip.set(17, 0, t + 0.006)
+        time.sleep(0.1)
+        chip.set(17, 1)
+        time.sleep(0.05)
+    finally:
+        service.stop()
+        service.wait(1.0)
+        service.cleanup()
+    ok = len(presses) == 1 and releases == [17]
+    return ok, f"{len(presses)} press, {len(releases)} release from 8 edges"
+
+
+def check_first_edge():
+    # a first edge stamped inside the debounce window after time zero is a press, not bounce
+    service = ButtonService(debounce=0.2, backend=CdevBackend(gpio_cdev.FakeChip()))
+    presses = []
+    button = service.add(17, press=presses.append)
+    service.edge(button, 0.1, 0)
+    return presses == [17], f"debounce 0.2 s, edge at 0.1 s: {len(presses)} press"
+
+
+class GpioSim:
+    """A gpio-sim chip made through configfs; pulls on its lines act as external drivers."""
+    def __init__(self, name='ece5725_test', lines=32):
+        self.dir = os.path.join(GPIO_SIM_CONFIG, name)
+        os.mkdir(self.dir)
+        os.mkdir(os.path.join(self.dir, 'bank0'))
+        self.write('bank0/num_lines', lines)
+        self.write('live', 1)
+        self.chip_name = self.read('bank0/chip_name')
+        self.dev_name = self.read('dev_name')
+        self.path = '/dev/' + self.chip_name
+
+    def read(self, name):
+        with open(os.path.join(self.dir, name)) as f:
+            return f.read().strip()
+
+    def write(self, name, value):
+        with open(os.path.join(self.dir, name), 'w') as f:
+            f.write(str(value))
+
+    def pull(self, offset, level):
+        with open(f'/sys/devices/platform/{self.dev_name}/{self.chip_name}/sim_gpio{offset}/pull', 'w') as f:
+            f.write('pull-up' if level else 'pull-down')
+
+    def close(self):
+        self.write('live', 0)
+        os.rmdir(os.path.join(self.dir, 'bank0'))
+        os.rmdir(self.dir)
+
+
+def check_gpio_sim():
+    if not os.path.isdir(GPIO_SIM_CONFIG):
+        return None, "gpio-sim configfs not available"
+    sim = GpioSim()
+    try:
+        chip = gpio_cdev.Chip(sim.path)
+        lines = chip.request([3, 4], bias='up', edges='both')
+        try:
+            before = time.monotonic()
+            sim.pull(3, 0)
+            sim.pull(3, 1)
+            lines.wait(1.0)
+            events = lines.read_events()
+            after = time.monotonic()
+            ok = ([(e.offset, e.level) for e in events] == [(3, 0), (3, 1)]
+                  and all(before <= e.time <= after for e in events) and lines.values() == {3: 1, 4: 1})
+            return ok, f"{chip.info()[1]}: {[(e.offset, e.level) for e in events]}"
+        finally:
+            lines.close()
+    finally:
+        sim.close()
+
+
+def main():
+    failed = 0
+    for name, check in (('events', check_events), ('watcher', check_watcher),
+                        ('button service', check_button_service),
+                        ('first edge', check_first_edge), ('gpio-sim', check_gpio_sim)):
+        ok, detail = check()
+        print(f"{'SKIP' if ok is None else 'PASS' if ok else 'FAIL'} {name}: {detail}")
+        failed += ok is False
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+"""
+gpio_cost_perf.py - What watching six buttons costs, polled at each interval
+more_video_control_perf.py is meant for and with RPi.GPIO callbacks
+(more_video_control_cb_perf.py). Each configuration runs in its own process
+for a fixed time while an injector thread presses GPIO 17 every half second
+or so. Reported per configuration:
+
+    user / sys ms    CPU time, from resource.getrusage(RUSAGE_CHILDREN),
+                     interpreter start-up included
+    ctx switches/s   voluntary + involuntary, also from getrusage
+    wakeups/s        voluntary context switches of the process's threads,
+                     summed over /proc/<pid>/task/*/status; the injector
+                     thread is left out
+    p50 / p99 ms     press to handler latency; missed presses never arrived
+
+On a Pi, wire an output pin to GPIO 17 and pass it with --loopback so the
+presses are real edges; without it latency is not measured. Where RPi.GPIO
+is not installed the fake one in LAB/sim is used: the CPU columns still
+show what polling costs, but its callbacks run on the injecting thread, so
+callback latency is ~0. --bank adds the same sweep reading all six buttons
+from /dev/gpiomem at once (gpio_bank.py); under the fake GPIO it reads a
+gpio_bank.FakeGpioMem that the injector writes instead.
+
+    python3 gpio_cost_perf.py --seconds 10 --loopback 5 --out gpio_cost
+"""
+import argparse
+import csv
+import importlib.util
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SIM_DIR = os.path.join(HERE, '..', '..', 'sim')
+SLEEPS = (0.2, 0.02, 0.002, 0.0002, 0.00002, 0)
+# the callback process's main thread has nothing to do but wait
+CALLBACK_SLEEP_SEC = 1.0
+RUN_SECONDS = 10.0
+PRESS_PIN = 17
+# held longer than the slowest poll interval, so no mode can miss a press
+PRESS_SEC = 0.25
+PRESS_GAP_SEC = 0.25
+COLUMNS = ('mode', 'sleep_s', 'seconds', 'user_ms', 'sys_ms', 'cpu_pct', 'ctx_per_s', 'wakeups_per_s',
+           'presses', 'missed', 'p50_ms', 'p99_ms', 'max_ms')
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+
+def thread_switches(exclude=()):
+    """Voluntary context switches summed over this process's threads."""
+    total = 0
+    task_dir = '/proc/self/task'
+    for tid in os.listdir(task_dir):
+        if int(tid) in exclude:
+            continue
+        try:
+            with open(os.path.join(task_dir, tid, 'status')) as f:
+                for line in f:
+                    if line.startswith('voluntary_ctxt_switches:'):
+                        total += int(line.split()[1])
+        except FileNotFoundError:
+            # the thread ended while we were looking
+            pass
+    return total
+
+
+class Injector(threading.Thread):
+    """Presses PRESS_PIN at jittered intervals and times how long the handler takes to see it."""
+    def __init__(self, GPIO, loopback=None, fake_mem=None):
+        super().__init__(daemon=True)
+        self.GPIO = GPIO
+        self.loopback = loopback
+        self.fake_mem = fake_mem
+        self.simulated = GPIO.VERSION.endswith('-sim')
+        self.running = True
+        self.pressed_at = None
+        self.presses = 0
+        self.latencies = []
+        if loopback is not None:
+            GPIO.setup(loopback, GPIO.OUT, initial=GPIO.HIGH)
+
+    def enabled(self):
+        return self.simulated or self.loopback is not None
+
+    def drive(self, level):
+        if self.loopback is not None:
+            self.GPIO.output(self.loopback, level)
+        elif self.fake_mem is not None:
+            self.fake_mem.set(PRESS_PIN, level)
+        else:
+            import gpio_sim
+            gpio_sim.drive(PRESS_PIN, None if level else 0)
+
+    def on_press(self, pin):
+        pressed_at = self.pressed_at
+        if pin == PRESS_PIN and pressed_at is not None:
+            self.latencies.append(time.perf_counter() - pressed_at)
+            self.pressed_at = None
+
+    def run(self):
+        while self.running:
+            # jitter keeps the presses from locking onto the poll phase
+            time.sleep(PRESS_GAP_SEC + random.uniform(0.0, 0.1))
+            if not self.running:
+                break
+            self.presses += 1
+            self.pressed_at = time.perf_counter()
+            self.drive(0)
+            time.sleep(PRESS_SEC)
+            self.drive(1)
+
+    def stop(self):
+        self.running = False
+        self.join()
+
+
+def worker(mode, sleep_sec, seconds, loopback):
+    """Runs in the child: one configuration, then a JSON line of results on stdout."""
+    import RPi.GPIO as GPIO
+    import gpio_bank
+    if mode == 'callback':
+        import more_video_control_cb_perf as script
+    else:
+        import more_video_control_perf as script
+    GPIO.setwarnings(False)
+    fake_mem = None
+    if mode == 'bank' and GPIO.VERSION.endswith('-sim') and loopback is None:
+        fake_mem = gpio_bank.FakeGpioMem()
+    injector = None
+    try:
+        GPIO.setmode(GPIO.BCM)
+        injector = Injector(GPIO, loopback, fake_mem)
+        if mode == 'poll':
+            script.setup()
+            injector.start()
+            script.poll(seconds, sleep_sec, injector.on_press)
+        elif mode == 'bank':
+            script.setup()
+            injector.start()
+            script.poll_bank(seconds, sleep_sec, injector.on_press,
+                             fake_mem.path if fake_mem is not None else gpio_bank.GPIOMEM)
+        else:
+            script.setup(injector.on_press)
+            injector.start()
+            script.idle(seconds, sleep_sec)
+        wakeups = thread_switches(exclude=(injector.native_id,))
+        injector.stop()
+    finally:
+        GPIO.cleanup()
+        if fake_mem is not None:
+            fake_mem.close()
+    # a press still in flight when the run ended counts for neither side
+    presses = injector.presses - (injector.pressed_at is not None)
+    print(json.dumps({'wakeups': wakeups, 'presses': presses if injector.enabled() else 0,
+                      'latencies': injector.latencies}))
+    return 0
+
+
+def measure(mode, sleep_sec, seconds, loopback, env):
+    args = [sys.executable, os.path.abspath(__file__), '--worker', mode, '--sleep', repr(sleep_sec),
+            '--seconds', repr(seconds)]
+    if loopback is not None:
+        args += ['--loopback', str(loopback)]
+    before = resource.getrusage(resource.RUSAGE_CHILDREN)
+    with tempfile.TemporaryDirectory() as tmp:
+        # setup() makes a video_fifo in the current directory
+        proc = subprocess.run(args, cwd=tmp, env=env, stdout=subprocess.PIPE, text=True)
+    after = resource.getrusage(resource.RUSAGE_CHILDREN)
+    if proc.returncode != 0:
+        raise RuntimeError(f"{mode} {sleep_sec} exited with {proc.returncode}")
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+    user = after.ru_utime - before.ru_utime
+    system = after.ru_stime - before.ru_stime
+    latencies = [t * 1e3 for t in result['latencies']]
+    return {
+        'mode': mode, 'sleep_s': sleep_sec, 'seconds': seconds,
+        'user_ms': round(user * 1e3, 1), 'sys_ms': round(system * 1e3, 1),
+        'cpu_pct': round(100.0 * (user + system) / seconds, 2),
+        'ctx_per_s': round((after.ru_nvcsw - before.ru_nvcsw + after.ru_nivcsw - before.ru_nivcsw) / seconds, 1),
+        'wakeups_per_s': round(result['wakeups'] / seconds, 1),
+        'presses': result['presses'], 'missed': max(0, result['presses'] - len(latencies)),
+        'p50_ms': round(percentile(latencies, 50), 3) if latencies else '',
+        'p99_ms': round(percentile(latencies, 99), 3) if latencies else '',
+        'max_ms': round(max(latencies), 3) if latencies else '',
+    }
+
+
+def markdown(rows):
+    lines = ['| ' + ' | '.join(COLUMNS) + ' |', '|' + '---|' * len(COLUMNS)]
+    for row in rows:
+        lines.append('| ' + ' | '.join(str(row[c]) for c in COLUMNS) + ' |')
+    return '\n'.join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--seconds', type=float, default=RUN_SECONDS, help='run time of each configuration')
+    parser.add_argument('--loopback', type=int, help=f'output pin wired to GPIO {PRESS_PIN}')
+    parser.add_argument('--sleeps', type=float, nargs='+', default=SLEEPS, help='poll intervals to sweep')
+    parser.add_argument('--bank', action='store_true', help='also sweep the /dev/gpiomem bank reader')
+    parser.add_argument('--out', default='gpio_cost', help='writes OUT.csv and OUT.md')
+    parser.add_argument('--worker', choices=('poll', 'bank', 'callback'), help=argparse.SUPPRESS)
+    parser.add_argument('--sleep', type=float, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.worker:
+        return worker(args.worker, args.sleep, args.seconds, args.loopback)
+
+    env = dict(os.environ)
+    if importlib.util.find_spec('RPi') is None:
+        print("RPi.GPIO not installed, using the simulated one in LAB/sim")
+        env['PYTHONPATH'] = os.pathsep.join(filter(None, [os.path.abspath(SIM_DIR), env.get('PYTHONPATH')]))
+    configs = [('poll', s) for s in args.sleeps]
+    if args.bank:
+        configs += [('bank', s) for s in args.sleeps]
+    configs.append(('callback', CALLBACK_SLEEP_SEC))
+    rows = []
+    for mode, sleep_sec in configs:
+        print(f"{mode} sleep {sleep_sec:g} s for {args.seconds:g} s ...", flush=True)
+        rows.append(measure(mode, sleep_sec, args.seconds, args.loopback, env))
+    with open(args.out + '.csv', 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=COLUMNS)
+        writer.writeheader()
+        writer.writerows(rows)
+    table = markdown(rows)
+    with open(args.out + '.md', 'w') as f:
+        f.write(f"{len(rows)} configurations, {args.seconds:g} s each, "
+                f"press on GPIO {PRESS_PIN} every {PRESS_SEC + PRESS_GAP_SEC:g}-{PRESS_SEC + PRESS_GAP_SEC + 0.1:g} s\n\n")
+        f.write(table + '\n')
+    print(table)
+    print(f"wrote {args.out}.csv and {args.out}.md")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -9,6 +9,9 @@ import RPi.GPIO as GPIO
 import os
 import time
 
+from slave_channel import SlaveChannel
+from video_launcher import notify_ready
+
 FIFO_PATH = "video_fifo"
 # Map buttons to mplayer slave commands
 BUTTONS = {
@@ -28,17 +31,17 @@ def setup():
     if not os.path.exists(FIFO_PATH):
         os.mkfifo(FIFO_PATH)
 
+channel = SlaveChannel(FIFO_PATH)
+
 def send_command(command: str):
-    try:
-        with open(FIFO_PATH, 'w') as fifo:
-            fifo.write(command + '\n')
-            fifo.flush()
-    except Exception as e:
-        print(f"Error sending command: {e}")
+    """Sends a command to the video player via a named pipe; never blocks."""
+    if not channel.send(command):
+        print(f"Player not reading {FIFO_PATH} yet, queued: {command}")
 
 def main():
     try:
         setup()
+        notify_ready()
         print("more_video_control running. Press QUIT to exit.")
         while True:
             for name, button in BUTTONS.items():
@@ -54,6 +57,7 @@ def main():
         print("\nInterrupted")
     finally:
         GPIO.cleanup()
+        channel.close()
         print("GPIO cleanup completed")
 
 if __name__ == '__main__':
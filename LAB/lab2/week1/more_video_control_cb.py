@@ -2,14 +2,25 @@
 """
 more_video_control_cb.py - Simplified Interrupt (callback) version of video controller
 ECE 5725 Lab 2
+
+The buttons are a table (button_map.py): hold a 10 s button to keep seeking,
+press both 10 s buttons together to restart, both 30 s buttons for the OSD.
+Seeks and pauses pass through seek_coalescer.py, so a burst of presses
+reaches the player as one net seek. PLAYER_BACKEND picks the player
+(player_backend.py): the FIFO, mplayer over pipes on VIDEO_FILE,
+video_daemon.py on VIDEO_SOCKET, or mpv on MPV_SOCKET. Backends that know
+where the video is get it printed after each command.
 """
 
-import RPi.GPIO as GPIO
 import os
-import time
-import sys
+
+from button_map import ButtonMap
+from player_backend import open_backend, player_state
+from video_launcher import notify_ready
 
 FIFO_PATH = 'video_fifo'
+# seconds a seek waits for more seeks to merge with; 0 sends every seek as pressed
+COALESCE_SEC = float(os.environ.get('COALESCE_SEC', '0.15'))
 
 PAUSE_PIN = 17
 FORWARD10_PIN = 22
@@ -18,76 +29,57 @@ QUIT_PIN = 27
 FORWARD30_PIN = 26
 REWIND30_PIN = 12
 
-def send_command(command: str):
-    """Sends a command to the video player via a named pipe."""
-    try:
-        with open(FIFO_PATH, 'w') as fifo:
-            fifo.write(command + '\n')
-            fifo.flush()
-    except Exception as e:
-        print(f"Error sending command: {e}")
-
-def pause_callback(channel):
-    print("send pause To Fifo")
-    send_command('pause')
-
-def forward10_callback(channel):
-    print("send seek 10 to Fifo")
-    send_command('seek 10')
-
-def rewind10_callback(channel):
-    print("send seek -10 to Fifo")
-    send_command('seek -10')
-
-def quit_callback(channel):
-    print("send quit to Fifo")
-    send_command('quit')
-    sys.exit(0)
-
-def forward30_callback(channel):
-    print("send seek 30 to Fifo")
-    send_command('seek 30')
-
-def rewind30_callback(channel):
-    print("send seek -30 to Fifo")
-    send_command('seek -30')
+def send_command(channel, command: str):
+    """Sends a command to the configured player backend; never blocks."""
+    if not channel.send(command):
+        print(f"Player not reachable yet, {command} not delivered")
+
+# kind, buttons, command; a tuple of buttons is a chord pressed together
+BINDINGS = (
+    ('press',  PAUSE_PIN,                      'pause'),
+    ('repeat', FORWARD10_PIN,                  'seek 10',  {'delay': 0.5, 'every': 0.25}),
+    ('repeat', REWIND10_PIN,                   'seek -10', {'delay': 0.5, 'every': 0.25}),
+    ('press',  FORWARD30_PIN,                  'seek 30'),
+    ('press',  REWIND30_PIN,                   'seek -30'),
+    ('press',  QUIT_PIN,                       'quit'),
+    # both 10 s buttons: back to the start; both 30 s buttons: toggle the on-screen display
+    ('press',  (FORWARD10_PIN, REWIND10_PIN),  'seek 0 2'),
+    ('press',  (FORWARD30_PIN, REWIND30_PIN),  'osd'),
+)
+
+def run_command(command, channel, state, buttons):
+    print(f"send {command} to Fifo")
+    send_command(channel, command)
+    if state is not None:
+        # cached: no round trip to the player
+        position, length, paused = state.snapshot()
+        if position is not None and length:
+            print(f"at {position:.1f} of {length:.1f} s{' (paused)' if paused else ''}")
+    if command == 'quit':
+        buttons.stop()
 
 def setup():
-    """Sets up GPIO pins and event detection."""
-    GPIO.setmode(GPIO.BCM)
-    
-    GPIO.setup(PAUSE_PIN, GPIO.IN, pull_up_down=GPIO.PUD_UP)
-    GPIO.add_event_detect(PAUSE_PIN, GPIO.FALLING, callback=pause_callback, bouncetime=200)
-
-    GPIO.setup(FORWARD10_PIN, GPIO.IN, pull_up_down=GPIO.PUD_UP)
-    GPIO.add_event_detect(FORWARD10_PIN, GPIO.FALLING, callback=forward10_callback, bouncetime=200)
-
-    GPIO.setup(REWIND10_PIN, GPIO.IN, pull_up_down=GPIO.PUD_UP)
-    GPIO.add_event_detect(REWIND10_PIN, GPIO.FALLING, callback=rewind10_callback, bouncetime=200)
-
-    GPIO.setup(QUIT_PIN, GPIO.IN, pull_up_down=GPIO.PUD_UP)
-    GPIO.add_event_detect(QUIT_PIN, GPIO.FALLING, callback=quit_callback, bouncetime=200)
-
-    GPIO.setup(FORWARD30_PIN, GPIO.IN, pull_up_down=GPIO.PUD_UP)
-    GPIO.add_event_detect(FORWARD30_PIN, GPIO.FALLING, callback=forward30_callback, bouncetime=200)
-
-    GPIO.setup(REWIND30_PIN, GPIO.IN, pull_up_down=GPIO.PUD_UP)
-    GPIO.add_event_detect(REWIND30_PIN, GPIO.FALLING, callback=rewind30_callback, bouncetime=200)
-    
+    """Creates the FIFO; the buttons set their pins up on start()."""
     if not os.path.exists(FIFO_PATH):
         os.mkfifo(FIFO_PATH)
 
 def main():
     """Main execution loop."""
+    # opened here rather than at import: the slave backend starts mplayer
+    channel = open_backend(FIFO_PATH, coalesce=COALESCE_SEC)
+    state = player_state(channel)
+    buttons = ButtonMap(BINDINGS, handler=lambda command: run_command(command, channel, state, buttons))
     try:
         setup()
         print("more_video_control_cb running. Press QUIT button to stop.")
-        while True:
-            time.sleep(1) 
+        buttons.start()
+        notify_ready()
+        buttons.wait()
     except KeyboardInterrupt:
         print("\nInterrupted")
     finally:
-        GPIO.cleanup()
+        buttons.cleanup()
+        channel.close()
         print("GPIO cleanup completed")
 
 if __name__ == '__main__':
@@ -2,14 +2,15 @@
 """
 Fixed-duration interrupt (callback) version to pair with perf measurements.
 Runs for RUN_SECONDS with callbacks armed, then exits.
+PERF_RUN_SECONDS and PERF_SLEEP_SEC override the defaults.
 """
 import RPi.GPIO as GPIO
 import os
 import time
 
 FIFO_PATH = 'video_fifo'
-RUN_SECONDS = 10.0
-SLEEP_SEC = 0.02
+RUN_SECONDS = float(os.getenv('PERF_RUN_SECONDS', 10.0))
+SLEEP_SEC = float(os.getenv('PERF_SLEEP_SEC', 0.02))
 
 BUTTONS = {
     'PAUSE': 17,
@@ -20,20 +21,23 @@ BUTTONS = {
     'REW30': 12,
 }
 
-def setup():
+def setup(callback=None):
     GPIO.setmode(GPIO.BCM)
     for pin in BUTTONS.values():
         GPIO.setup(pin, GPIO.IN, pull_up_down=GPIO.PUD_UP)
-        GPIO.add_event_detect(pin, GPIO.FALLING, bouncetime=200)
+        GPIO.add_event_detect(pin, GPIO.FALLING, callback=callback, bouncetime=200)
     if not os.path.exists(FIFO_PATH):
         os.mkfifo(FIFO_PATH)
 
+def idle(run_seconds=RUN_SECONDS, sleep_sec=SLEEP_SEC):
+    t0 = time.time()
+    while (time.time() - t0) < run_seconds:
+        time.sleep(sleep_sec)
+
 def main():
     try:
         setup()
-        t0 = time.time()
-        while (time.time() - t0) < RUN_SECONDS:
-            time.sleep(SLEEP_SEC)
+        idle()
     finally:
         GPIO.cleanup()
 
@@ -2,14 +2,20 @@
 """
 Fixed-duration polling version to pair with perf measurements.
 Runs for RUN_SECONDS then exits without requiring button presses.
+PERF_RUN_SECONDS and PERF_SLEEP_SEC override the defaults; gpio_cost_perf.py
+sweeps every interval this way. PERF_BANK=on scans all six buttons with one
+/dev/gpiomem read per loop (gpio_bank.py) instead of six GPIO.input() calls.
 """
 import RPi.GPIO as GPIO
 import os
 import time
 
+import gpio_bank
+
 FIFO_PATH = 'video_fifo'
-RUN_SECONDS = 10.0
-SLEEP_SEC = 0.02  # change between runs: 0.2, 0.02, 0.002, 0.0002, 0.00002, or 0
+BANK = os.getenv('PERF_BANK', 'off') == 'on'
+RUN_SECONDS = float(os.getenv('PERF_RUN_SECONDS', 10.0))
+SLEEP_SEC = float(os.getenv('PERF_SLEEP_SEC', 0.02))  # 0.2, 0.02, 0.002, 0.0002, 0.00002, or 0
 
 BUTTONS = {
     'PAUSE': 17,
@@ -27,15 +33,42 @@ def setup():
     if not os.path.exists(FIFO_PATH):
         os.mkfifo(FIFO_PATH)
 
+def poll(run_seconds=RUN_SECONDS, sleep_sec=SLEEP_SEC, on_press=None):
+    # on_press(pin) is called when a button reads low after reading high
+    levels = dict.fromkeys(BUTTONS.values(), GPIO.HIGH)
+    t0 = time.time()
+    while (time.time() - t0) < run_seconds:
+        for pin in BUTTONS.values():
+            level = GPIO.input(pin)
+            if on_press is not None and level != levels[pin]:
+                levels[pin] = level
+                if level == GPIO.LOW:
+                    on_press(pin)
+        if sleep_sec > 0:
+            time.sleep(sleep_sec)
+
+def poll_bank(run_seconds=RUN_SECONDS, sleep_sec=SLEEP_SEC, on_press=None, path=gpio_bank.GPIOMEM):
+    # same loop, one register read covering every button
+    bank = gpio_bank.GpioBank(path, watch=BUTTONS.values())
+    try:
+        t0 = time.time()
+        while (time.time() - t0) < run_seconds:
+            _, fell, _ = bank.diff()
+            if on_press is not None and fell:
+                for pin in gpio_bank.pins(fell):
+                    on_press(pin)
+            if sleep_sec > 0:
+                time.sleep(sleep_sec)
+    finally:
+        bank.close()
+
 def main():
     try:
         setup()
-        t0 = time.time()
-        while (time.time() - t0) < RUN_SECONDS:
-            for pin in BUTTONS.values():
-                _ = GPIO.input(pin)
-            if SLEEP_SEC > 0:
-                time.sleep(SLEEP_SEC)
+        if BANK:
+            poll_bank()
+        else:
+            poll()
         # exit cleanly
     finally:
         GPIO.cleanup()
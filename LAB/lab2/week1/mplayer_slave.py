@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+"""
+mplayer_slave.py - Runs mplayer in slave mode over pipes and keeps track of its state
+ECE 5725 Lab 2
+
+Writing to video_fifo is one-way, so the controllers never know where the
+video is. MplayerSlave starts mplayer itself with -slave, writes commands
+to its stdin and reads its stdout on a thread. Every ANS_* reply updates a
+PlayerState (position, length, paused). A query thread asks for the
+position and pause state every QUERY_SEC, and sooner after a seek, so
+reading the state is a lock and an attribute with no round trip. Between
+replies the position is carried forward on the monotonic clock. Queries are
+prefixed with pausing_keep_force so they never unpause the video.
+
+    player = MplayerSlave(mplayer_argv('bigbuckbunny320p.mp4'))
+    player.send('seek 25 1')            # 25 %
+    print(player.state.progress())      # 0.25 once mplayer confirms
+    player.close()
+
+MplayerSlave has send() and close() like SlaveChannel, so it can stand in
+for the FIFO, SeekCoalescer included.
+"""
+import subprocess
+import threading
+import time
+
+QUERY_SEC = 0.5
+MPLAYER_ARGS = ('-slave', '-quiet', '-vo', 'fbdev:/dev/fb1')
+# query sent, ANS_ key it is answered with
+QUERIES = (('get_time_pos', 'TIME_POSITION'), ('get_property pause', 'pause'))
+LENGTH_QUERY = ('get_time_length', 'LENGTH')
+PAUSING_PREFIXES = ('pausing', 'pausing_keep', 'pausing_toggle', 'pausing_keep_force')
+
+
+def mplayer_argv(path, player='mplayer', args=MPLAYER_ARGS):
+    return [player, *args, path]
+
+
+def parse_answer(line):
+    """('TIME_POSITION', '12.3') for 'ANS_TIME_POSITION=12.3', None for any other line."""
+    if not line.startswith('ANS_'):
+        return None
+    key, sep, value = line[4:].partition('=')
+    if not sep:
+        return None
+    value = value.strip()
+    if len(value) >= 2 and value[0] == value[-1] == "'":
+        value = value[1:-1]
+    return key, value
+
+
+class PlayerState(object):
+    """What mplayer last said about itself, with the monotonic time it said it."""
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.position = None
+        self.position_at = None
+        self.length = None
+        self.paused = False
+        self.filename = None
+        self.running = True
+        # every ANS_ key seen: (value, time) and how many times it has been answered
+        self.answers = {}
+        self.counts = {}
+
+    def answer(self, key, value, now):
+        with self.lock:
+            self.answers[key] = (value, now)
+            self.counts[key] = self.counts.get(key, 0) + 1
+            try:
+                if key == 'TIME_POSITION':
+                    self.position, self.position_at = float(value), now
+                elif key == 'LENGTH':
+                    self.length = float(value)
+                elif key == 'pause':
+                    self.freeze(now)
+                    self.paused = value == 'yes'
+                elif key == 'FILENAME':
+                    self.filename = value
+            except ValueError:
+                pass
+
+    def freeze(self, now):
+        # caller holds the lock: carry the position up to now before paused changes
+        if self.position is not None:
+            self.position, self.position_at = self.position_now(now), now
+
+    def position_now(self, now=None):
+        if self.position is None:
+            return None
+        if self.paused or not self.running:
+            return self.position
+        now = time.monotonic() if now is None else now
+        position = self.position + now - self.position_at
+        return min(position, self.length) if self.length else position
+
+    def seeked(self, seconds, kind, now):
+        """What a seek we just sent should do, until mplayer answers."""
+        with self.lock:
+            position = self.position_now(now)
+            if kind == 0 and position is not None:
+                position = max(0.0, position + seconds)
+            elif kind == 1 and self.length:
+                position = self.length * seconds / 100.0
+            elif kind == 2:
+                position = seconds
+            else:
+                return
+            if self.length:
+                position = min(position, self.length)
+            self.position, self.position_at = position, now
+
+    def toggled(self, pause, now):
+        with self.lock:
+            self.freeze(now)
+            self.paused = not self.paused if pause else False
+
+    def snapshot(self):
+        """(position, length, paused) without asking mplayer."""
+        with self.lock:
+            return self.position_now(), self.length, self.paused
+
+    def progress(self):
+        """Fraction of the video played, None until the position and length are known."""
+        position, length, _ = self.snapshot()
+        return position / length if position is not None and length else None
+
+
+class MplayerSlave(object):
+    def __init__(self, argv, query_sec=QUERY_SEC):
+        self.state = PlayerState()
+        self.query_sec = query_sec
+        self.write_lock = threading.Lock()
+        self.answered = threading.Condition(self.state.lock)
+        self.wake = threading.Event()
+        self.closing = False
+        self.process = subprocess.Popen(argv, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                        stderr=subprocess.DEVNULL, text=True, bufsize=1)
+        self.reader = threading.Thread(target=self.read_answers, daemon=True)
+        self.reader.start()
+        self.scheduler = threading.Thread(target=self.query_loop, daemon=True)
+        self.scheduler.start()
+
+    def write(self, line):
+        with self.write_lock:
+            try:
+                self.process.stdin.write(line + '\n')
+                self.process.stdin.flush()
+            except (BrokenPipeError, ValueError):
+                # mplayer has exited (ValueError: we closed stdin)
+                return False
+        return True
+
+    def send(self, command):
+        """Send one slave command; False once mplayer is gone."""
+        command = command.strip()
+        if not self.write(command):
+            return False
+        words = command.split()
+        now = time.monotonic()
+        if words and words[0] in PAUSING_PREFIXES:
+            words = words[1:]
+        elif words and words[0] != 'pause':
+            # mplayer unpauses for any command that has no pausing prefix
+            self.state.toggled(False, now)
+        if words and words[0] == 'pause':
+            self.state.toggled(True, now)
+        elif words and words[0] == 'seek' and len(words) > 1:
+            try:
+                self.state.seeked(float(words[1]), int(words[2]) if len(words) > 2 else 0, now)
+            except ValueError:
+                pass
+            self.wake.set()
+        elif words and words[0] == 'loadfile':
+            with self.state.lock:
+                self.state.length = None
+            self.wake.set()
+        return True
+
+    def ask(self, query, key, timeout=1.0):
+        """Round trip: send query, wait for its ANS_key and return the value (None on timeout)."""
+        with self.answered:
+            count = self.state.counts.get(key, 0)
+        if not self.write('pausing_keep_force ' + query):
+            return None
+        with self.answered:
+            if not self.answered.wait_for(lambda: self.state.counts.get(key, 0) > count or not self.state.running,
+                                          timeout):
+                return None
+            return self.state.answers.get(key, (None, None))[0]
+
+    def read_answers(self):
+        for line in self.process.stdout:
+            answer = parse_answer(line.strip())
+            if answer is not None:
+                self.state.answer(*answer, time.monotonic())
+                with self.answered:
+                    self.answered.notify_all()
+        with self.answered:
+            self.state.freeze(time.monotonic())
+            self.state.running = False
+            self.answered.notify_all()
+        self.wake.set()
+
+    def query_loop(self):
+        while self.state.running and not self.closing:
+            queries = QUERIES if self.state.length is not None else QUERIES + (LENGTH_QUERY,)
+            for query, _ in queries:
+                if not self.write('pausing_keep_force ' + query):
+                    return
+            self.wake.wait(self.query_sec)
+            self.wake.clear()
+
+    def wait(self, timeout=None):
+        """Wait for mplayer to exit; its exit code, None on timeout."""
+        try:
+            return self.process.wait(timeout)
+        except subprocess.TimeoutExpired:
+            return None
+
+    def close(self, timeout=1.0):
+        """Ask mplayer to quit, and kill it if it has not after timeout."""
+        self.closing = True
+        self.wake.set()
+        if self.process.poll() is None:
+            self.write('quit')
+            if self.wait(timeout) is None:
+                self.process.kill()
+                self.process.wait()
+        with self.write_lock:
+            try:
+                self.process.stdin.close()
+            except BrokenPipeError:
+                pass
+        self.reader.join(timeout)
+        self.scheduler.join(timeout)
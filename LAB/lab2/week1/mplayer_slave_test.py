@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+mplayer_slave_test.py - Checks mplayer_slave.MplayerSlave against a scripted
+stand-in for mplayer -slave (this script run with --player): state learned
+from ANS_ replies, pause and seeks reflected at once and confirmed, queries
+that do not unpause, cached reads against round trips, and exit.
+"""
+import argparse
+import sys
+import time
+
+from mplayer_slave import MplayerSlave
+
+LENGTH = 120.0
+QUERY_SEC = 0.1
+READS = 10000
+ROUND_TRIPS = 50
+
+
+def player(length):
+    """Answers the slave commands MplayerSlave uses, the way mplayer prints them."""
+    start = time.monotonic()
+    position = 0.0
+    paused = False
+
+    def now_position():
+        return position if paused else min(length, time.monotonic() - start)
+
+    print("MPlayer stand-in\nPlaying stand-in.mp4.\nStarting playback...", flush=True)
+    for line in sys.stdin:
+        words = line.split()
+        if not words:
+            continue
+        keep = words[0].startswith('pausing')
+        if keep:
+            words = words[1:]
+        if paused and not keep and words[0] != 'pause':
+            # real mplayer resumes playback for an unprefixed command
+            start, paused = time.monotonic() - position, False
+        answer = None
+        if words[0] == 'get_time_pos':
+            answer = f"ANS_TIME_POSITION={now_position():.1f}"
+        elif words[0] == 'get_time_length':
+            answer = f"ANS_LENGTH={length:.2f}"
+        elif words[0] == 'get_property' and words[1] == 'pause':
+            answer = f"ANS_pause={'yes' if paused else 'no'}"
+        elif words[0] == 'get_file_name':
+            answer = "ANS_FILENAME='stand-in.mp4'"
+        elif words[0] == 'pause':
+            position = now_position()
+            if paused:
+                start = time.monotonic() - position
+            paused = not paused
+        elif words[0] == 'seek':
+            value = float(words[1])
+            kind = int(words[2]) if len(words) > 2 else 0
+            target = {0: now_position() + value, 1: length * value / 100.0, 2: value}[kind]
+            position = max(0.0, min(length, target))
+            start = time.monotonic() - position
+        elif words[0] == 'quit':
+            print("\nExiting... (Quit)", flush=True)
+            return 0
+        else:
+            print(f"Command {words[0]} unknown", flush=True)
+        if answer is not None:
+            print(answer, flush=True)
+    return 0
+
+
+def near(a, b, tolerance=0.3):
+    return a is not None and b is not None and abs(a - b) <= tolerance
+
+
+def settle(slave):
+    """Long enough for a couple of query rounds."""
+    time.sleep(QUERY_SEC * 3)
+    return slave.state.snapshot()
+
+
+def check_state(slave):
+    position, length, paused = settle(slave)
+    ok = length == LENGTH and not paused and near(position, 0.3, 0.2)
+    return ok, f"position {position:.2f} s of {length} s, paused {paused}"
+
+
+def check_pause(slave):
+    slave.send('pause')
+    at_once = slave.state.paused
+    first, _, confirmed = settle(slave)
+    # the position queries must not have unpaused it
+    second, _, still = settle(slave)
+    slave.send('pause')
+    ok = at_once and confirmed and still and first == second
+    return ok, f"paused at once {at_once}, confirmed {confirmed}, held at {first:.2f} s through queries"
+
+
+def check_seek(slave):
+    before = slave.state.position_now()
+    slave.send('seek 30')
+    at_once = slave.state.position_now()
+    confirmed = settle(slave)[0]
+    slave.send('seek 25 1')
+    quarter = settle(slave)
+    progress = slave.state.progress()
+    ok = (near(at_once, before + 30, 0.05) and near(confirmed, before + 30 + QUERY_SEC * 3)
+          and near(progress, 0.25 + QUERY_SEC * 3 / LENGTH, 0.01))
+    return ok, (f"seek 30 from {before:.2f}: {at_once:.2f} at once, {confirmed:.2f} confirmed; "
+                f"seek 25%: {quarter[0]:.2f} s, progress {progress:.3f}")
+
+
+def check_cached(slave):
+    t0 = time.perf_counter()
+    for _ in range(READS):
+        slave.state.snapshot()
+    cached = (time.perf_counter() - t0) / READS
+    t0 = time.perf_counter()
+    answers = [slave.ask('get_time_pos', 'TIME_POSITION') for _ in range(ROUND_TRIPS)]
+    asked = (time.perf_counter() - t0) / ROUND_TRIPS
+    ok = None not in answers and cached * 10 < asked
+    return ok, f"cached read {cached * 1e6:.2f} us, round trip {asked * 1e6:.0f} us"
+
+
+def check_exit(slave):
+    slave.send('quit')
+    code = slave.wait(2.0)
+    slave.reader.join(1.0)
+    ok = code == 0 and not slave.state.running and not slave.send('pause')
+    return ok, f"exit code {code}, running {slave.state.running}"
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--player', action='store_true', help="act as the stand-in player")
+    args = parser.parse_args()
+    if args.player:
+        return player(LENGTH)
+
+    slave = MplayerSlave([sys.executable, __file__, '--player'], query_sec=QUERY_SEC)
+    failed = 0
+    try:
+        for name, check in (('state', check_state), ('pause', check_pause), ('seek', check_seek),
+                            ('cached', check_cached), ('exit', check_exit)):
+            ok, detail = check(slave)
+            print(f"{'PASS' if ok else 'FAIL'} {name}: {detail}")
+            failed += not ok
+    finally:
+        slave.close()
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+mpv_ipc_test.py - Checks mpv_ipc.MpvIpc against mpv_ipc.FakeMpv: slave
+commands translated, pipelined requests matched by request_id, state kept
+by property-change events with no polling, a player that goes away, and
+player_backend choosing a backend from the environment.
+"""
+import os
+import sys
+import tempfile
+import time
+
+from mpv_ipc import FakeMpv, MpvIpc, translate
+from player_backend import backend_kind, open_backend, player_state
+from seek_coalescer import SeekCoalescer
+from slave_channel import SlaveChannel
+from video_client import VideoClient
+
+PIPELINED = 200
+
+
+def check_translate(path):
+    cases = [
+        ('pause', ['cycle', 'pause']),
+        ('seek 10', ['seek', 10.0, 'relative']),
+        ('seek 25 1', ['seek', 25.0, 'absolute-percent']),
+        ('seek 0 2', ['seek', 0.0, 'absolute']),
+        ('pausing_keep_force get_time_pos', ['get_property', 'time-pos']),
+        ('quit', ['quit']),
+    ]
+    failed = []
+    for command, expected in cases:
+        got = translate(command)
+        if got != expected:
+            failed.append((command, got, expected))
+    for command, got, expected in failed:
+        print(f"  {command!r}: got {got}, expected {expected}")
+    return not failed, f"{len(cases) - len(failed)}/{len(cases)} slave commands"
+
+
+def check_pipelined(path):
+    fake = FakeMpv(path)
+    mpv = MpvIpc(path)
+    try:
+        names = ['duration', 'pause', 'osd-level', 'no-such-property']
+        requests = [mpv.request('get_property', names[i % len(names)]) for i in range(PIPELINED)]
+        answered = all(request.done.wait(1.0) for request in requests)
+        matched = all((request.data, request.error) == ((120.0, False, 1, None)[i % len(names)],
+                                                        'invalid parameter' if i % len(names) == 3 else 'success')
+                      for i, request in enumerate(requests))
+    finally:
+        mpv.close()
+        fake.close()
+    ok = answered and matched and not mpv.pending and mpv.errors == PIPELINED // len(names)
+    return ok, f"{PIPELINED} requests in flight, every reply matched to its request_id"
+
+
+def check_observed(path):
+    fake = FakeMpv(path)
+    mpv = MpvIpc(path)
+    try:
+        mpv.send('seek 30')
+        mpv.send('pause')
+        mpv.command('client_name')
+        position, length, paused = mpv.state.snapshot()
+        polled = [c for c in fake.commands if c[0] == 'get_property']
+    finally:
+        mpv.close()
+        fake.close()
+    ok = abs(position - 30.0) < 0.1 and length == 120.0 and paused and not polled
+    return ok, f"at {position:.2f} of {length} s, paused {paused}, from events with {len(polled)} polls"
+
+
+def check_disconnect(path):
+    fake = FakeMpv(path)
+    mpv = MpvIpc(path)
+    error, _ = mpv.command('quit')
+    # the fake hangs up after quit, like mpv exiting
+    deadline = time.monotonic() + 1.0
+    while mpv.state.running and time.monotonic() < deadline:
+        time.sleep(0.01)
+    running = mpv.state.running
+    # mpv is gone for good: no reconnecting
+    fake.close()
+    after = mpv.send('pause')
+    mpv.close()
+    ok = error == 'success' and not running and not after
+    return ok, f"quit: {error}, running {running}, send afterwards {after}"
+
+
+def check_backends(path):
+    cases = [
+        ({}, 'fifo'),
+        ({'VIDEO_FILE': 'x.mp4'}, 'slave'),
+        ({'VIDEO_SOCKET': 'video.sock'}, 'daemon'),
+        ({'PLAYER_BACKEND': 'mpv', 'VIDEO_SOCKET': 'video.sock'}, 'mpv'),
+    ]
+    kinds = [backend_kind(env) == expected for env, expected in cases]
+    fifo = open_backend(os.path.join(os.path.dirname(path), 'video_fifo'), coalesce=0.1, env={})
+    daemon = open_backend('unused', coalesce=0.1, env={'VIDEO_SOCKET': path})
+    mpv = open_backend('unused', env={'PLAYER_BACKEND': 'mpv', 'MPV_SOCKET': path})
+    shapes = (isinstance(fifo, SeekCoalescer) and isinstance(fifo.channel, SlaveChannel)
+              and isinstance(daemon, VideoClient) and player_state(fifo) is None
+              and player_state(mpv) is mpv.state)
+    for channel in (fifo, daemon, mpv):
+        channel.close()
+    try:
+        backend_kind({'PLAYER_BACKEND': 'vlc'})
+        rejected = False
+    except ValueError:
+        rejected = True
+    ok = all(kinds) and shapes and rejected
+    return ok, f"{sum(kinds)}/{len(cases)} environments, wrapping and state lookup {shapes}, unknown rejected {rejected}"
+
+
+def main():
+    failed = 0
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, check in (('translate', check_translate), ('pipelined', check_pipelined),
+                            ('observed', check_observed), ('disconnect', check_disconnect),
+                            ('backends', check_backends)):
+            ok, detail = check(os.path.join(tmp, name + '.sock'))
+            print(f"{'PASS' if ok else 'FAIL'} {name}: {detail}")
+            failed += not ok
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
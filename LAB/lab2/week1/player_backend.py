@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+player_backend.py - Picks what send_command() talks to, from configuration
+ECE 5725
+
+Every backend has send(command) taking mplayer slave commands ('pause',
+'seek 10', 'quit', ...) and close(). The ones that know where the video is
+also have a PlayerState as .state.
+
+    fifo     SlaveChannel writing mplayer's -input file=FIFO (the default)
+    slave    MplayerSlave running mplayer on VIDEO_FILE over pipes
+    daemon   VideoClient to video_daemon.py on VIDEO_SOCKET
+    mpv      MpvIpc to mpv --input-ipc-server=MPV_SOCKET
+
+PLAYER_BACKEND picks one. Without it, VIDEO_FILE means slave and
+VIDEO_SOCKET means daemon, as before. With coalesce > 0, seeks go through
+a SeekCoalescer, except for daemon, which coalesces for all its clients.
+
+    channel = open_backend(FIFO_PATH, coalesce=0.15)
+    channel.send('seek 10')
+"""
+import os
+
+from mpv_ipc import MPV_SOCKET, MpvIpc
+from mplayer_slave import MplayerSlave, mplayer_argv
+from seek_coalescer import SeekCoalescer
+from slave_channel import SlaveChannel
+from video_client import SOCKET_PATH, VideoClient
+
+BACKENDS = ('fifo', 'slave', 'daemon', 'mpv')
+
+
+def backend_kind(env=os.environ):
+    kind = env.get('PLAYER_BACKEND')
+    if kind is None:
+        kind = 'slave' if env.get('VIDEO_FILE') else 'daemon' if env.get('VIDEO_SOCKET') else 'fifo'
+    if kind not in BACKENDS:
+        raise ValueError(f"PLAYER_BACKEND={kind!r}, expected one of {BACKENDS}")
+    return kind
+
+
+def open_backend(fifo_path, coalesce=0.0, env=os.environ):
+    kind = backend_kind(env)
+    if kind == 'slave':
+        if not env.get('VIDEO_FILE'):
+            raise ValueError("PLAYER_BACKEND=slave needs VIDEO_FILE")
+        channel = MplayerSlave(mplayer_argv(env['VIDEO_FILE']))
+    elif kind == 'daemon':
+        return VideoClient(env.get('VIDEO_SOCKET', SOCKET_PATH))
+    elif kind == 'mpv':
+        channel = MpvIpc(env.get('MPV_SOCKET', MPV_SOCKET))
+    else:
+        channel = SlaveChannel(fifo_path)
+    return SeekCoalescer(channel, window=coalesce) if coalesce > 0 else channel
+
+
+def player_state(channel):
+    """The channel's PlayerState, None for backends that cannot know it."""
+    while channel is not None and not hasattr(channel, 'state'):
+        channel = getattr(channel, 'channel', None)
+    return channel.state if channel is not None else None
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+player_backend_perf.py - Command round-trip latency: mplayer FIFO, mplayer slave pipes, mpv JSON IPC
+ECE 5725 Lab 2
+
+    fifo         SlaveChannel.send() until a reader thread has the line.
+                 mplayer never answers the FIFO, so this is delivery only.
+    slave        MplayerSlave.ask('get_time_pos'): command out, ANS_ back,
+                 against mplayer_slave_test.py's stand-in player
+    mpv          MpvIpc.command(): one request, wait for its reply
+    mpv x N      N requests in flight, then wait for all (pipelined), per request
+
+The mpv side talks to mpv_ipc.FakeMpv run in its own process, as mpv would be.
+
+    python3 player_backend_perf.py [--commands 2000] [--pipeline 32]
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from mplayer_slave import MplayerSlave
+from mpv_ipc import FakeMpv, MpvIpc
+from slave_channel import SlaveChannel
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+COMMANDS = 2000
+PIPELINE = 32
+
+
+def summary(latencies):
+    latencies = sorted(latencies)
+    return (latencies[len(latencies) // 2] * 1e6, latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1e6)
+
+
+def bench_fifo(tmp, commands):
+    path = os.path.join(tmp, 'video_fifo')
+    os.mkfifo(path)
+    fd = os.open(path, os.O_RDONLY | os.O_NONBLOCK)
+    got = threading.Semaphore(0)
+    stop = threading.Event()
+
+    def reader():
+        # blocking reads, like mplayer; b'' until the channel opens its end, and after it closes
+        os.set_blocking(fd, True)
+        while not stop.is_set():
+            data = os.read(fd, 65536)
+            for _ in range(data.count(b'\n')):
+                got.release()
+
+    thread = threading.Thread(target=reader, daemon=True)
+    thread.start()
+    channel = SlaveChannel(path)
+    latencies = []
+    for _ in range(commands):
+        t0 = time.perf_counter()
+        channel.send('pausing_keep_force get_time_pos')
+        got.acquire()
+        latencies.append(time.perf_counter() - t0)
+    stop.set()
+    # closing the write end gives the blocked read its end-of-file
+    channel.close()
+    thread.join()
+    os.close(fd)
+    return latencies
+
+
+def bench_slave(tmp, commands):
+    slave = MplayerSlave([sys.executable, os.path.join(HERE, 'mplayer_slave_test.py'), '--player'], query_sec=60)
+    slave.ask('get_time_pos', 'TIME_POSITION')
+    latencies = []
+    for _ in range(commands):
+        t0 = time.perf_counter()
+        slave.ask('get_time_pos', 'TIME_POSITION')
+        latencies.append(time.perf_counter() - t0)
+    slave.close()
+    return latencies
+
+
+def start_fake_mpv(tmp):
+    path = os.path.join(tmp, 'mpv.sock')
+    server = subprocess.Popen([sys.executable, __file__, '--serve-mpv', path], stdout=subprocess.PIPE, text=True)
+    server.stdout.readline()
+    return server, path
+
+
+def bench_mpv(tmp, commands, pipeline=1):
+    server, path = start_fake_mpv(tmp)
+    mpv = MpvIpc(path)
+    mpv.command('client_name')
+    latencies = []
+    for _ in range(commands // pipeline):
+        t0 = time.perf_counter()
+        requests = [mpv.request('get_property', 'time-pos') for _ in range(pipeline)]
+        for request in requests:
+            request.done.wait(1.0)
+        latencies.append((time.perf_counter() - t0) / pipeline)
+    mpv.command('quit')
+    mpv.close()
+    server.wait()
+    return latencies
+
+
+def serve_mpv(path):
+    fake = FakeMpv(path)
+    print('ready', flush=True)
+    while not fake.quit:
+        time.sleep(0.05)
+    fake.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--commands', type=int, default=COMMANDS, help="commands per backend")
+    parser.add_argument('--pipeline', type=int, default=PIPELINE, help="mpv requests in flight at once")
+    parser.add_argument('--serve-mpv', metavar='PATH', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.serve_mpv:
+        return serve_mpv(args.serve_mpv)
+
+    print(f"{'backend':>10} {'p50 us':>8} {'p99 us':>8}  measures")
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, bench, measures in (
+                ('fifo', lambda: bench_fifo(tmp, args.commands), "delivery only, no acknowledgement"),
+                ('slave', lambda: bench_slave(tmp, args.commands), "query and ANS_ reply"),
+                ('mpv', lambda: bench_mpv(tmp, args.commands), "request and reply"),
+                (f'mpv x {args.pipeline}', lambda: bench_mpv(tmp, args.commands, args.pipeline),
+                 "per request, pipelined")):
+            p50, p99 = summary(bench())
+            print(f"{name:>10} {p50:>8.1f} {p99:>8.1f}  {measures}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+seek_coalescer.py - Merges rapid mplayer seeks and pause toggles before the FIFO
+ECE 5725
+
+Every relative seek makes mplayer find a keyframe and refill its buffers, so
+mashing FORWARD queues up one slow seek per press. SeekCoalescer sits in
+front of anything with send(command) (a SlaveChannel) and holds relative
+seeks for `window` seconds from the first one, then sends their sum:
+'seek 30', 'seek -10' inside a window go out as 'seek 20', and a sum of 0
+sends nothing. Pause toggles in the same window cancel in pairs. An
+absolute seek ('seek 50 1', 'seek 0 2') replaces any held relative seeks.
+Any other command, 'quit' included, first sends what is held and then goes
+straight through, so the order is kept.
+
+    channel = SeekCoalescer(SlaveChannel('video_fifo'), window=0.15)
+    channel.send('seek 10')
+"""
+import threading
+import time
+
+COALESCE_SEC = 0.15
+
+
+def parse_seek(command):
+    """(value, type) for a 'seek value [type]' command, None for anything else."""
+    parts = command.split()
+    if len(parts) not in (2, 3) or parts[0] != 'seek':
+        return None
+    try:
+        return float(parts[1]), int(parts[2]) if len(parts) == 3 else 0
+    except ValueError:
+        return None
+
+
+def format_seek(value):
+    return f"seek {value:g}"
+
+
+class SeekCoalescer(object):
+    def __init__(self, channel, window=COALESCE_SEC):
+        self.channel = channel
+        self.window = window
+        self.lock = threading.Lock()
+        self.timer = None
+        self.opened = None
+        # counts windows, so a timer that fires after its window was flushed leaves the next one alone
+        self.generation = 0
+        self.seek = 0.0
+        self.has_seek = False
+        self.pauses = 0
+        # whether the held pause toggle came before the held seek
+        self.pause_first = False
+        # commands in and out, for seeing what coalescing saved
+        self.received = 0
+        self.sent = 0
+
+    def send(self, command):
+        """True unless a command that went straight through could not be written."""
+        command = command.strip()
+        with self.lock:
+            self.received += 1
+            if self.timer is not None and time.monotonic() - self.opened >= self.window:
+                # the window is over even if its timer thread has not run yet
+                self.flush_locked()
+            seek = parse_seek(command)
+            if seek is not None and seek[1] == 0:
+                if not self.has_seek and not self.pauses:
+                    self.pause_first = False
+                self.seek += seek[0]
+                self.has_seek = True
+                self.start_window()
+                return True
+            if command == 'pause':
+                if not self.has_seek and not self.pauses:
+                    self.pause_first = True
+                self.pauses += 1
+                self.start_window()
+                return True
+            if seek is not None:
+                # absolute: wherever the relative seeks were going no longer matters
+                self.seek = 0.0
+                self.has_seek = False
+            self.flush_locked()
+            return self.emit(command)
+
+    def flush(self, generation=None):
+        """Send what is held; from a window's timer, only if that window is still open."""
+        with self.lock:
+            if generation is not None and (self.timer is None or generation != self.generation):
+                # send() flushed this window while the timer waited for the lock
+                return
+            self.flush_locked()
+
+    def start_window(self):
+        if self.timer is None:
+            self.opened = time.monotonic()
+            self.generation += 1
+            self.timer = threading.Timer(self.window, self.flush, args=(self.generation,))
+            self.timer.daemon = True
+            self.timer.start()
+
+    def flush_locked(self):
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+        commands = []
+        if self.has_seek and self.seek:
+            commands.append(format_seek(self.seek))
+        if self.pauses % 2:
+            commands.insert(0 if self.pause_first else len(commands), 'pause')
+        self.seek = 0.0
+        self.has_seek = False
+        self.pauses = 0
+        for command in commands:
+            self.emit(command)
+
+    def emit(self, command):
+        self.sent += 1
+        return self.channel.send(command)
+
+    def close(self):
+        """Send anything held, then close the channel underneath."""
+        self.flush()
+        self.channel.close()
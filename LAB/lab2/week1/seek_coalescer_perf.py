@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+seek_coalescer_perf.py - What seek coalescing saves a player that seeks slowly
+ECE 5725 Lab 2
+
+Plays a scripted burst of button presses (mashed FORWARD, a few REWINDs, a
+double-tapped PAUSE) through SlaveChannel, with and without a SeekCoalescer
+in front of it, into a fake player on a real FIFO. The fake player runs
+commands one at a time and spends SEEK_COST_SEC on every seek, like mplayer
+finding a keyframe. It reports how many seeks the player ran and the
+settle time: from the last press until the player has run its last command.
+The final position has to be the same either way.
+
+    python3 seek_coalescer_perf.py [--windows 0,0.1,0.15,0.25] [--seek-cost 0.1]
+"""
+import argparse
+import os
+import tempfile
+import threading
+import time
+
+from seek_coalescer import SeekCoalescer
+from slave_channel import SlaveChannel
+
+SEEK_COST_SEC = 0.1
+PAUSE_COST_SEC = 0.005
+START_POSITION = 100.0
+IDLE_SEC = 0.5
+# (seconds after the start, command)
+PRESSES = ([(0.06 * i, 'seek 10') for i in range(8)]
+           + [(0.6 + 0.08 * i, 'seek -10') for i in range(3)]
+           + [(1.0, 'pause'), (1.12, 'pause')]
+           + [(1.4 + 0.05 * i, 'seek 30') for i in range(4)])
+
+
+class FakePlayer(threading.Thread):
+    """Reads slave commands from a FIFO and runs them one at a time."""
+    def __init__(self, path, seek_cost=SEEK_COST_SEC):
+        super().__init__(daemon=True)
+        self.fd = os.open(path, os.O_RDONLY | os.O_NONBLOCK)
+        self.seek_cost = seek_cost
+        self.position = START_POSITION
+        self.paused = False
+        self.seeks = 0
+        self.commands = 0
+        self.last_done = None
+        self.running = True
+
+    def run(self):
+        buffered = b''
+        while self.running:
+            try:
+                data = os.read(self.fd, 4096)
+            except BlockingIOError:
+                data = b''
+            if not data:
+                time.sleep(0.001)
+                continue
+            buffered += data
+            *lines, buffered = buffered.split(b'\n')
+            for line in lines:
+                self.execute(line.decode().split())
+
+    def execute(self, words):
+        if words[0] == 'seek':
+            time.sleep(self.seek_cost)
+            value = float(words[1])
+            kind = int(words[2]) if len(words) > 2 else 0
+            self.position = value if kind else self.position + value
+            self.seeks += 1
+        elif words[0] == 'pause':
+            time.sleep(PAUSE_COST_SEC)
+            self.paused = not self.paused
+        self.commands += 1
+        self.last_done = time.perf_counter()
+
+    def stop(self):
+        self.running = False
+        self.join()
+        os.close(self.fd)
+
+
+def run(path, window, seek_cost):
+    player = FakePlayer(path, seek_cost)
+    player.start()
+    channel = SlaveChannel(path)
+    if window > 0:
+        channel = SeekCoalescer(channel, window=window)
+    start = time.perf_counter()
+    for at, command in PRESSES:
+        delay = start + at - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        channel.send(command)
+    last_press = time.perf_counter()
+    # done once the player has been idle for a while
+    while player.last_done is None or time.perf_counter() - max(player.last_done, last_press) < IDLE_SEC:
+        time.sleep(0.01)
+    channel.close()
+    player.stop()
+    return {
+        'window': window,
+        'sent': player.commands,
+        'seeks': player.seeks,
+        'settle_ms': max(0.0, player.last_done - last_press) * 1e3,
+        'position': player.position,
+        'paused': player.paused,
+    }
+
+
+def expected_position():
+    position = START_POSITION
+    for _, command in PRESSES:
+        if command.startswith('seek'):
+            position += float(command.split()[1])
+    return position
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--windows', default='0,0.1,0.15,0.25',
+                        help="comma-separated coalescing windows in seconds; 0 is SlaveChannel alone")
+    parser.add_argument('--seek-cost', type=float, default=SEEK_COST_SEC, help="seconds the fake player spends per seek")
+    args = parser.parse_args()
+
+    print(f"{len(PRESSES)} presses over {PRESSES[-1][0]:.2f} s, {args.seek_cost * 1e3:.0f} ms per seek")
+    print(f"{'window ms':>9} {'sent':>5} {'seeks':>6} {'settle ms':>10} {'position':>9}  ok")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'video_fifo')
+        os.mkfifo(path)
+        for window in (float(w) for w in args.windows.split(',')):
+            r = run(path, window, args.seek_cost)
+            ok = r['position'] == expected_position() and not r['paused']
+            print(f"{r['window'] * 1e3:>9.0f} {r['sent']:>5} {r['seeks']:>6} {r['settle_ms']:>10.1f} "
+                  f"{r['position']:>9g}  {'yes' if ok else 'NO'}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+seek_coalescer_test.py - Checks seek_coalescer.SeekCoalescer against a
+channel that records what it is sent: seeks merging inside a window, pause
+toggles cancelling, absolute seeks and quit flushing at once and in order,
+and a late timer from a flushed window leaving the next window alone.
+"""
+import sys
+import time
+
+from seek_coalescer import SeekCoalescer
+
+WINDOW = 0.05
+
+
+class Recorder(object):
+    def __init__(self):
+        self.commands = []
+        self.closed = False
+
+    def send(self, command):
+        self.commands.append(command)
+        return True
+
+    def close(self):
+        self.closed = True
+
+
+def play(commands, wait=True):
+    """Send commands back to back; what reached the channel once the window has passed."""
+    recorder = Recorder()
+    coalescer = SeekCoalescer(recorder, window=WINDOW)
+    for command in commands:
+        coalescer.send(command)
+    if wait:
+        time.sleep(WINDOW * 3)
+    return recorder.commands
+
+
+def check_merge():
+    cases = [
+        (['seek 10', 'seek 10', 'seek 10'], ['seek 30']),
+        (['seek 30', 'seek -10'], ['seek 20']),
+        (['seek 10', 'seek -10'], []),
+        (['pause', 'pause'], []),
+        (['pause', 'pause', 'pause'], ['pause']),
+        (['pause', 'seek 10', 'seek 10'], ['pause', 'seek 20']),
+        (['seek 10', 'pause', 'seek 10'], ['seek 20', 'pause']),
+    ]
+    failed = []
+    for commands, expected in cases:
+        got = play(commands)
+        if got != expected:
+            failed.append((commands, got, expected))
+    for commands, got, expected in failed:
+        print(f"  {commands}: got {got}, expected {expected}")
+    return not failed, f"{len(cases) - len(failed)}/{len(cases)} bursts"
+
+
+def check_pass_through():
+    cases = [
+        # absolute seeks replace the relative ones held before them
+        (['seek 10', 'seek 10', 'seek 0 2'], ['seek 0 2']),
+        (['seek 10', 'seek 50 1', 'seek -5'], ['seek 50 1']),
+        # anything else sends what is held first, without waiting for the window
+        (['seek 10', 'seek 10', 'quit'], ['seek 20', 'quit']),
+        (['pause', 'osd', 'pause'], ['pause', 'osd']),
+    ]
+    failed = []
+    for commands, expected in cases:
+        got = play(commands, wait=False)
+        if got != expected:
+            failed.append((commands, got, expected))
+    for commands, got, expected in failed:
+        print(f"  {commands}: got {got}, expected {expected}")
+    return not failed, f"{len(cases) - len(failed)}/{len(cases)} sent before the window closed"
+
+
+def check_window():
+    recorder = Recorder()
+    coalescer = SeekCoalescer(recorder, window=WINDOW)
+    coalescer.send('seek 10')
+    time.sleep(WINDOW * 3)
+    coalescer.send('seek 10')
+    coalescer.close()
+    ok = recorder.commands == ['seek 10', 'seek 10'] and recorder.closed and coalescer.sent == 2
+    return ok, f"two windows apart: {recorder.commands}, close() flushed and closed the channel"
+
+
+def check_late_timer():
+    recorder = Recorder()
+    coalescer = SeekCoalescer(recorder, window=10.0)
+    coalescer.send('seek 10')
+    first = coalescer.timer
+    # the window is over but its timer has not got the lock yet: send() flushes it and opens the next
+    coalescer.opened -= coalescer.window
+    coalescer.send('seek 5')
+    # the first timer gets the lock now
+    first.function(*first.args, **first.kwargs)
+    held = list(recorder.commands)
+    coalescer.close()
+    ok = held == ['seek 10'] and recorder.commands == ['seek 10', 'seek 5']
+    return ok, f"after the late timer: {held}, after close(): {recorder.commands}"
+
+
+def main():
+    failed = 0
+    for name, check in (('merge', check_merge), ('pass through', check_pass_through), ('window', check_window),
+                        ('late timer', check_late_timer)):
+        ok, detail = check()
+        print(f"{'PASS' if ok else 'FAIL'} {name}: {detail}")
+        failed += not ok
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
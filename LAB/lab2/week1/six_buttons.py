@@ -4,8 +4,7 @@ six_buttons.py - GPIO test for four piTFT buttons plus two external buttons
 ECE 5725 Lab 2
 """
 
-import RPi.GPIO as GPIO
-import time
+from button_service import ButtonService
 
 # BCM pin map: reuse piTFT 4 buttons + 2 external buttons (example GPIO26, GPIO5)
 BUTTONS = {
@@ -17,28 +16,29 @@ BUTTONS = {
     'EXT_BTN2': 12     # external button on cobbler
 }
 
+NAMES = {pin: name for name, pin in BUTTONS.items()}
+service = ButtonService()
+
+def on_press(pin):
+    print(f"Button {NAMES[pin]} (GPIO {pin}) pressed")
+    if pin == BUTTONS['TFT_BTN4']:
+        print("Exiting...")
+        service.stop()
+
 def setup():
-    GPIO.setmode(GPIO.BCM)
     for pin in BUTTONS.values():
-        GPIO.setup(pin, GPIO.IN, pull_up_down=GPIO.PUD_UP)
+        service.add(pin, press=on_press)
 
 def main():
     try:
         setup()
         print("Monitoring 6 buttons. Press TFT_BTN4 (GPIO 27) to quit.")
-        while True:
-            for name, pin in BUTTONS.items():
-                if not GPIO.input(pin):
-                    print(f"Button {name} (GPIO {pin}) pressed")
-                    if pin == BUTTONS['TFT_BTN4']:
-                        print("Exiting...")
-                        return
-                    time.sleep(0.5)
-            time.sleep(0.05)
+        service.start()
+        service.wait()
     except KeyboardInterrupt:
         print("\nInterrupted")
     finally:
-        GPIO.cleanup()
+        service.cleanup()
         print("GPIO cleanup completed")
 
 if __name__ == '__main__':
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+slave_channel.py - Persistent, non-blocking writer for mplayer's slave FIFO
+ECE 5725
+
+Opening a FIFO for writing blocks until something opens it for reading, so
+a send_command() that does open(FIFO_PATH, 'w') per press hangs its button
+thread for as long as mplayer is not running. SlaveChannel opens the FIFO
+once with O_NONBLOCK and keeps the fd. With no reader, the open fails at
+once (ENXIO). Commands then wait in a bounded queue, oldest dropped first,
+and a timer retries every RETRY_SEC until the player attaches. Everything
+queued goes out in one os.write(). If the player goes away the next write
+fails with EPIPE, and the channel reopens and resends.
+
+    channel = SlaveChannel('video_fifo')
+    channel.send('seek 10')     # never blocks; False if only queued
+"""
+import collections
+import errno
+import os
+import threading
+
+QUEUE_COMMANDS = 32
+RETRY_SEC = 0.1
+
+
+class SlaveChannel(object):
+    def __init__(self, path, max_queued=QUEUE_COMMANDS, retry_sec=RETRY_SEC):
+        self.path = path
+        self.retry_sec = retry_sec
+        self.fd = None
+        # encoded lines not yet written; the first may be the tail of a partial write
+        self.pending = collections.deque()
+        self.max_queued = max_queued
+        self.dropped = 0
+        self.lock = threading.Lock()
+        self.timer = None
+        self.closed = False
+
+    def connect(self):
+        """Open the FIFO if a reader is there; False if not."""
+        if not os.path.exists(self.path):
+            os.mkfifo(self.path)
+        try:
+            self.fd = os.open(self.path, os.O_WRONLY | os.O_NONBLOCK)
+        except OSError as e:
+            if e.errno == errno.ENXIO:
+                # nobody has the FIFO open for reading yet
+                return False
+            raise
+        return True
+
+    def send(self, command):
+        """Queue one command and write out everything queued; True if it all reached the pipe."""
+        with self.lock:
+            if len(self.pending) >= self.max_queued:
+                self.pending.popleft()
+                self.dropped += 1
+            self.pending.append((command.rstrip('\n') + '\n').encode())
+            return self.flush_locked()
+
+    def flush(self):
+        with self.lock:
+            return self.flush_locked()
+
+    def flush_locked(self):
+        if not self.pending:
+            return True
+        for attempt in range(2):
+            if self.fd is None and not self.connect():
+                break
+            data = b''.join(self.pending)
+            try:
+                written = os.write(self.fd, data)
+            except BlockingIOError:
+                # the player is not keeping up and the pipe is full
+                break
+            except BrokenPipeError:
+                # the reader went away: reopen once, a restarted player may be there
+                self.disconnect()
+                continue
+            self.consume(written)
+            if not self.pending:
+                return True
+            break
+        self.schedule_retry()
+        return False
+
+    def consume(self, written):
+        while written and self.pending:
+            line = self.pending[0]
+            if written >= len(line):
+                written -= len(line)
+                self.pending.popleft()
+            else:
+                self.pending[0] = line[written:]
+                written = 0
+
+    def schedule_retry(self):
+        if self.timer is None and not self.closed:
+            self.timer = threading.Timer(self.retry_sec, self.retry)
+            self.timer.daemon = True
+            self.timer.start()
+
+    def retry(self):
+        with self.lock:
+            self.timer = None
+            if not self.closed:
+                self.flush_locked()
+
+    def queued(self):
+        with self.lock:
+            return len(self.pending)
+
+    def disconnect(self):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+    def close(self):
+        """Stop retrying and close the fd; anything still queued is dropped."""
+        with self.lock:
+            self.closed = True
+            if self.timer is not None:
+                self.timer.cancel()
+                self.timer = None
+            self.disconnect()
+            self.pending.clear()
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+slave_channel_test.py - Checks slave_channel.SlaveChannel on a real FIFO: no
+reader (no hang, bounded queue), a reader attaching late (one batched
+write), a reader restarting (EPIPE, reconnect), and how long a send takes
+compared with opening the FIFO for every command.
+"""
+import os
+import sys
+import tempfile
+import threading
+import time
+
+from slave_channel import SlaveChannel
+
+SENDS = 2000
+
+
+def read_all(fd, timeout=1.0):
+    """Whatever one read() returns once data arrives."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            data = os.read(fd, 65536)
+        except BlockingIOError:
+            data = b''
+        if data:
+            return data
+        # b'' is end-of-file while no writer has the FIFO open yet
+        time.sleep(0.005)
+    return b''
+
+
+def check_no_reader(path):
+    channel = SlaveChannel(path, max_queued=4)
+    t0 = time.perf_counter()
+    results = [channel.send(f'seek {i}') for i in range(6)]
+    elapsed = time.perf_counter() - t0
+    queued = channel.queued()
+    channel.close()
+    ok = results == [False] * 6 and queued == 4 and channel.dropped == 2 and elapsed < 0.1
+    return ok, f"6 sends in {elapsed * 1e3:.2f} ms with no player, {queued} queued, {channel.dropped} dropped"
+
+
+def check_late_reader(path):
+    channel = SlaveChannel(path, retry_sec=0.02)
+    for command in ('pause', 'seek 10', 'seek -10'):
+        channel.send(command)
+    # the player starts later and finds everything queued in one write
+    fd = os.open(path, os.O_RDONLY | os.O_NONBLOCK)
+    try:
+        data = read_all(fd)
+    finally:
+        channel.close()
+        os.close(fd)
+    ok = data == b'pause\nseek 10\nseek -10\n'
+    return ok, f"first read after attaching: {data!r}"
+
+
+def check_reconnect(path):
+    fd = os.open(path, os.O_RDONLY | os.O_NONBLOCK)
+    channel = SlaveChannel(path, retry_sec=0.02)
+    first = channel.send('pause')
+    got = read_all(fd)
+    os.close(fd)
+    # the player quits; the next send finds out with EPIPE and queues
+    second = channel.send('seek 10')
+    fd = os.open(path, os.O_RDONLY | os.O_NONBLOCK)
+    try:
+        got += read_all(fd)
+    finally:
+        channel.close()
+        os.close(fd)
+    ok = first and not second and got == b'pause\nseek 10\n'
+    return ok, f"read {got!r} across a player restart"
+
+
+def check_latency(path):
+    fd = os.open(path, os.O_RDONLY | os.O_NONBLOCK)
+    stop = threading.Event()
+
+    def drain():
+        while not stop.is_set():
+            try:
+                os.read(fd, 65536)
+            except BlockingIOError:
+                time.sleep(0.001)
+
+    reader = threading.Thread(target=drain, daemon=True)
+    reader.start()
+    try:
+        t0 = time.perf_counter()
+        for _ in range(SENDS):
+            with open(path, 'w') as fifo:
+                fifo.write('pause\n')
+                fifo.flush()
+        reopen = (time.perf_counter() - t0) / SENDS
+        channel = SlaveChannel(path)
+        t0 = time.perf_counter()
+        for _ in range(SENDS):
+            channel.send('pause')
+        kept = (time.perf_counter() - t0) / SENDS
+        channel.close()
+    finally:
+        stop.set()
+        reader.join()
+        os.close(fd)
+    return kept < reopen, f"open per command {reopen * 1e6:.1f} us, SlaveChannel {kept * 1e6:.1f} us per send"
+
+
+def main():
+    failed = 0
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, check in (('no reader', check_no_reader), ('late reader', check_late_reader),
+                            ('reconnect', check_reconnect), ('latency', check_latency)):
+            path = os.path.join(tmp, name.replace(' ', '_'))
+            os.mkfifo(path)
+            ok, detail = check(path)
+            print(f"{'PASS' if ok else 'FAIL'} {name}: {detail}")
+            failed += not ok
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
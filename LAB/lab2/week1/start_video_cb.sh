@@ -1,13 +1,9 @@
 #!/bin/bash
 # Launch mplayer and more_video_control_cb.py (interrupt version)
+# video_launcher.py starts both at once and waits for each to be ready instead of sleeping;
+# add --wait-controller to hold mplayer back until the controller is ready
 
 FIFO_PATH="video_fifo"
-[ -p "$FIFO_PATH" ] || mkfifo "$FIFO_PATH"
 
-echo "Starting more_video_control_cb.py..."
-python3 more_video_control_cb.py &
-
-sleep 1
-
-echo "Starting mplayer..."
-mplayer -slave -input file=video_fifo -vo fbdev:/dev/fb1 /home/pi/ECE-5725-Everything/LAB/lab1/lab1_week2/bigbuckbunny320p.mp4
\ No newline at end of file
+exec python3 video_launcher.py --fifo "$FIFO_PATH" --controller "python3 more_video_control_cb.py" -- \
+    mplayer -slave -input file=$FIFO_PATH -vo fbdev:/dev/fb1 /home/pi/ECE-5725-Everything/LAB/lab1/lab1_week2/bigbuckbunny320p.mp4
@@ -1,12 +1,8 @@
 #!/bin/bash
 # Launch mplayer and more_video_control.py
+# video_launcher.py starts both at once and waits for each to be ready instead of sleeping;
+# add --wait-controller to hold mplayer back until the controller is ready
 FIFO_PATH="video_fifo"
-[ -p "$FIFO_PATH" ] || mkfifo "$FIFO_PATH"
 
-echo "Starting more_video_control.py..."
-python3 more_video_control.py &
-
-sleep 1
-
-echo "Starting mplayer..."
-mplayer -slave -input file=video_fifo -vo fbdev:/dev/fb1 /home/pi/ECE-5725-Everything/LAB/lab1/lab1_week2/bigbuckbunny320p.mp4
\ No newline at end of file
+exec python3 video_launcher.py --fifo "$FIFO_PATH" --controller "python3 more_video_control.py" -- \
+    mplayer -slave -input file=$FIFO_PATH -vo fbdev:/dev/fb1 /home/pi/ECE-5725-Everything/LAB/lab1/lab1_week2/bigbuckbunny320p.mp4
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+video_client.py - Sends player commands to video_daemon.py over its Unix socket
+ECE 5725
+
+Any number of scripts can hold a VideoClient at once; the daemon is the only
+writer of the player's FIFO. Each command is one line and gets one reply
+line: ok, queued (the player is not reading yet), limited (this client is
+over its rate) or error ... . VideoClient has send() and close() like
+SlaveChannel. It connects on first use and again after the daemon restarts,
+and a daemon that is not running makes send() return False, not raise. A
+command is only sent again when it could not be sent at all; one that got
+no reply within the timeout is not, as the player may already have run it.
+
+    channel = VideoClient('video.sock')
+    channel.send('seek 10')
+"""
+import socket
+
+SOCKET_PATH = 'video.sock'
+TIMEOUT_SEC = 1.0
+
+
+class VideoClient(object):
+    def __init__(self, path=SOCKET_PATH, timeout=TIMEOUT_SEC):
+        self.path = path
+        self.timeout = timeout
+        self.sock = None
+        self.replies = None
+        # the last reply, None if the daemon could not be reached
+        self.reply = None
+
+    def connect(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        try:
+            sock.connect(self.path)
+        except OSError:
+            sock.close()
+            return False
+        self.sock = sock
+        self.replies = sock.makefile('rb')
+        return True
+
+    def request(self, command):
+        """Send one command and return the daemon's reply, None if it could not be reached or did not answer."""
+        line = (command.strip() + '\n').encode()
+        for attempt in range(2):
+            if self.sock is None and not self.connect():
+                return None
+            try:
+                self.sock.sendall(line)
+            except OSError:
+                # the daemon closed this connection, so it never got the line: try once more on a new one
+                self.disconnect()
+                continue
+            try:
+                reply = self.replies.readline()
+            except OSError:
+                reply = b''
+            if reply:
+                return reply.decode().strip()
+            # the line may have reached the player, so sending it again could run it twice;
+            # a late reply would answer the next command, so start that on a new connection
+            self.disconnect()
+            return None
+        return None
+
+    def send(self, command):
+        """True if the command reached the player; self.reply says why not."""
+        self.reply = self.request(command)
+        return self.reply == 'ok'
+
+    def disconnect(self):
+        if self.sock is not None:
+            self.replies.close()
+            self.sock.close()
+            self.sock = None
+            self.replies = None
+
+    def close(self):
+        self.disconnect()
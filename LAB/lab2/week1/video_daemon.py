@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""
+video_daemon.py - Owns mplayer's FIFO and takes commands from many clients over a Unix socket
+ECE 5725 Lab 2
+
+Two controllers writing video_fifo at once can interleave their lines, so
+only one process should write it. This daemon is that process: it is the
+only writer of the FIFO (a SlaveChannel behind a SeekCoalescer), and the
+buttons, the touchscreen and fifo_test.py connect to SOCKET_PATH with
+video_client.VideoClient. All clients are served by one selectors loop. A
+client sends one command per line and gets one reply per line (see
+video_client.py). Each client has a token bucket of RATE_PER_SEC commands,
+BURST at most at once, so one stuck button cannot flood the player. 'quit'
+is never limited. Seeks from all clients merge in the coalescer.
+
+    python3 video_daemon.py [--fifo video_fifo] [--socket video.sock] [--rate 20] [--burst 10]
+"""
+import argparse
+import errno
+import os
+import selectors
+import signal
+import socket
+import sys
+import threading
+import time
+
+from seek_coalescer import COALESCE_SEC, SeekCoalescer
+from slave_channel import SlaveChannel
+from video_client import SOCKET_PATH
+from video_launcher import notify_ready, socket_bound
+
+FIFO_PATH = 'video_fifo'
+RATE_PER_SEC = 20.0
+BURST = 10
+MAX_LINE = 256
+BACKLOG = 128
+
+
+class Client(object):
+    """One connection: unparsed input, unsent replies and its token bucket."""
+    def __init__(self, sock, rate, burst, now):
+        self.sock = sock
+        self.inbox = b''
+        self.outbox = b''
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.refilled = now
+        self.commands = 0
+        self.limited = 0
+
+    def allow(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.refilled) * self.rate)
+        self.refilled = now
+        if self.tokens >= 1.0:
+            self.tokens -= 1.0
+            return True
+        return False
+
+
+class VideoDaemon(object):
+    def __init__(self, path, channel, rate=RATE_PER_SEC, burst=BURST):
+        self.path = path
+        self.channel = channel
+        self.rate = rate
+        self.burst = burst
+        self.selector = selectors.DefaultSelector()
+        self.listener = None
+        self.clients = {}
+        self.stopping = False
+        # stop() writes here to wake the loop from another thread or a signal handler
+        self.wake_r, self.wake_w = os.pipe()
+        os.set_blocking(self.wake_r, False)
+        os.set_blocking(self.wake_w, False)
+        self.ready = threading.Event()
+        self.commands = 0
+        self.limited = 0
+        self.connections = 0
+
+    def listen(self):
+        """Bind the socket; OSError(EADDRINUSE) if another daemon is answering on it."""
+        if os.path.exists(self.path):
+            if socket_bound(self.path):
+                raise OSError(errno.EADDRINUSE, f"a daemon is already serving {self.path}")
+            # left over from a daemon that did not exit cleanly
+            os.unlink(self.path)
+        self.listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.listener.bind(self.path)
+        self.listener.listen(BACKLOG)
+        self.listener.setblocking(False)
+        self.selector.register(self.listener, selectors.EVENT_READ, None)
+        self.selector.register(self.wake_r, selectors.EVENT_READ, 'wake')
+
+    def serve(self):
+        """Run the loop until stop(); listens first if listen() has not been called."""
+        if self.listener is None:
+            self.listen()
+        self.ready.set()
+        try:
+            while not self.stopping:
+                for key, events in self.selector.select():
+                    if key.data is None:
+                        self.accept()
+                    elif key.data == 'wake':
+                        os.read(self.wake_r, 512)
+                    else:
+                        if events & selectors.EVENT_READ:
+                            self.read(key.data)
+                        if events & selectors.EVENT_WRITE and key.data.sock.fileno() >= 0:
+                            self.write(key.data)
+        finally:
+            self.close()
+
+    def accept(self):
+        while True:
+            try:
+                sock, _ = self.listener.accept()
+            except BlockingIOError:
+                return
+            sock.setblocking(False)
+            client = Client(sock, self.rate, self.burst, time.monotonic())
+            self.clients[sock] = client
+            self.connections += 1
+            self.selector.register(sock, selectors.EVENT_READ, client)
+
+    def read(self, client):
+        try:
+            data = client.sock.recv(4096)
+        except (BlockingIOError, InterruptedError):
+            return
+        except OSError:
+            data = b''
+        if not data:
+            self.drop(client)
+            return
+        client.inbox += data
+        *lines, client.inbox = client.inbox.split(b'\n')
+        now = time.monotonic()
+        replies = [self.handle(client, line.decode(errors='replace').strip(), now) for line in lines]
+        if len(client.inbox) > MAX_LINE:
+            replies.append('error line too long')
+            client.inbox = b''
+        if replies:
+            client.outbox += ''.join(reply + '\n' for reply in replies).encode()
+            self.write(client)
+
+    def handle(self, client, command, now):
+        if not command:
+            return 'error empty command'
+        if len(command) > MAX_LINE:
+            return 'error line too long'
+        if command != 'quit' and not client.allow(now):
+            client.limited += 1
+            self.limited += 1
+            return 'limited'
+        client.commands += 1
+        self.commands += 1
+        return 'ok' if self.channel.send(command) else 'queued'
+
+    def write(self, client):
+        try:
+            sent = client.sock.send(client.outbox)
+        except (BlockingIOError, InterruptedError):
+            sent = 0
+        except OSError:
+            self.drop(client)
+            return
+        client.outbox = client.outbox[sent:]
+        # only ask for EVENT_WRITE while replies are backed up
+        events = selectors.EVENT_READ | (selectors.EVENT_WRITE if client.outbox else 0)
+        if self.selector.get_key(client.sock).events != events:
+            self.selector.modify(client.sock, events, client)
+
+    def drop(self, client):
+        self.selector.unregister(client.sock)
+        del self.clients[client.sock]
+        client.sock.close()
+
+    def stop(self):
+        """Safe from any thread and from a signal handler."""
+        self.stopping = True
+        try:
+            os.write(self.wake_w, b'x')
+        except BlockingIOError:
+            pass
+
+    def close(self):
+        for client in list(self.clients.values()):
+            self.drop(client)
+        if self.listener is not None:
+            self.selector.unregister(self.listener)
+            self.listener.close()
+            self.listener = None
+            if os.path.exists(self.path):
+                os.unlink(self.path)
+        self.selector.close()
+        os.close(self.wake_r)
+        os.close(self.wake_w)
+        self.channel.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve player commands from many clients over a Unix socket")
+    parser.add_argument('--fifo', default=FIFO_PATH, help="mplayer's -input file")
+    parser.add_argument('--socket', default=SOCKET_PATH, help="where clients connect")
+    parser.add_argument('--rate', type=float, default=RATE_PER_SEC, help="commands per second per client")
+    parser.add_argument('--burst', type=int, default=BURST, help="commands a client may send at once")
+    parser.add_argument('--coalesce', type=float, default=COALESCE_SEC, help="seek coalescing window, 0 for none")
+    args = parser.parse_args()
+
+    channel = SlaveChannel(args.fifo)
+    if args.coalesce > 0:
+        channel = SeekCoalescer(channel, window=args.coalesce)
+    daemon = VideoDaemon(args.socket, channel, rate=args.rate, burst=args.burst)
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signum, lambda *_: daemon.stop())
+    try:
+        daemon.listen()
+    except OSError as e:
+        print(f"video_daemon: {e.strerror}", file=sys.stderr)
+        return 1
+    notify_ready()
+    print(f"video_daemon: {args.socket} -> {args.fifo}", flush=True)
+    daemon.serve()
+    print(f"video_daemon: {daemon.commands} commands from {daemon.connections} connections, "
+          f"{daemon.limited} rate limited")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
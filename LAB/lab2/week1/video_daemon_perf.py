@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+video_daemon_perf.py - Load test for video_daemon.py: many clients, one FIFO
+ECE 5725 Lab 2
+
+Starts video_daemon.py in a subprocess on a temporary socket and FIFO, with a
+stand-in player draining the FIFO, then runs dozens of VideoClient threads
+against it in two phases:
+
+    paced   every client sends CLIENT_RATE commands a second, under the limit
+    flood   every client sends its next command as soon as the reply arrives
+
+and reports commands answered per second, round-trip latency (p50/p99/max),
+how many were rate limited and how many lines reached the player. Seeks are
+coalesced, so the player sees fewer lines than the daemon accepted.
+
+    python3 video_daemon_perf.py [--clients 8,32,64] [--seconds 2] [--client-rate 10]
+"""
+import argparse
+import collections
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from video_client import VideoClient
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+COMMANDS = ('seek 10', 'seek -10', 'pause', 'osd')
+CLIENT_RATE = 10.0
+
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return float('nan')
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * p / 100.0))]
+
+
+class Player(threading.Thread):
+    """Counts the lines the daemon writes to the FIFO."""
+    def __init__(self, path):
+        super().__init__(daemon=True)
+        self.fd = os.open(path, os.O_RDONLY | os.O_NONBLOCK)
+        self.lines = 0
+        self.running = True
+
+    def run(self):
+        while self.running:
+            try:
+                data = os.read(self.fd, 65536)
+            except BlockingIOError:
+                data = b''
+            if data:
+                self.lines += data.count(b'\n')
+            else:
+                time.sleep(0.001)
+
+    def stop(self):
+        self.running = False
+        self.join()
+        os.close(self.fd)
+
+
+def start_daemon(tmp):
+    fifo = os.path.join(tmp, 'video_fifo')
+    sock = os.path.join(tmp, 'video.sock')
+    os.mkfifo(fifo)
+    player = Player(fifo)
+    player.start()
+    daemon = subprocess.Popen([sys.executable, os.path.join(HERE, 'video_daemon.py'), '--fifo', fifo, '--socket', sock],
+                              stdout=subprocess.PIPE, text=True)
+    # the daemon prints its banner once it is listening
+    daemon.stdout.readline()
+    return daemon, player, sock
+
+
+def client(path, interval, start, until, latencies, replies):
+    channel = VideoClient(path, timeout=5.0)
+    rng = random.Random()
+    start.wait()
+    next_at = time.perf_counter() + rng.uniform(0, interval)
+    while True:
+        if interval:
+            delay = next_at - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            next_at += interval
+        t0 = time.perf_counter()
+        if t0 >= until:
+            break
+        reply = channel.request(rng.choice(COMMANDS))
+        latencies.append(time.perf_counter() - t0)
+        replies[reply] += 1
+    channel.close()
+
+
+def phase(sock, clients, seconds, interval):
+    latencies = []
+    counters = [collections.Counter() for _ in range(clients)]
+    start = threading.Event()
+    t0 = time.perf_counter() + 0.2
+    until = t0 + seconds
+    threads = [threading.Thread(target=client, args=(sock, interval, start, until, latencies, counters[i]))
+               for i in range(clients)]
+    for thread in threads:
+        thread.start()
+    time.sleep(max(0.0, t0 - time.perf_counter()))
+    start.set()
+    for thread in threads:
+        thread.join()
+    replies = sum(counters, collections.Counter())
+    latencies.sort()
+    return {
+        'answered': len(latencies) / seconds,
+        'p50': percentile(latencies, 50) * 1e3,
+        'p99': percentile(latencies, 99) * 1e3,
+        'max': latencies[-1] * 1e3 if latencies else float('nan'),
+        'ok': replies['ok'],
+        'limited': replies['limited'],
+        'other': sum(replies.values()) - replies['ok'] - replies['limited'],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--clients', default='8,32,64', help="comma-separated client counts")
+    parser.add_argument('--seconds', type=float, default=2.0, help="length of each phase")
+    parser.add_argument('--client-rate', type=float, default=CLIENT_RATE, help="commands per second per paced client")
+    args = parser.parse_args()
+
+    print(f"{'phase':>6} {'clients':>7} {'cmd/s':>8} {'p50 ms':>7} {'p99 ms':>7} {'max ms':>7} "
+          f"{'ok':>6} {'limited':>7} {'other':>5} {'to player':>9}")
+    for clients in (int(c) for c in args.clients.split(',')):
+        for name, interval in (('paced', 1.0 / args.client_rate), ('flood', 0.0)):
+            with tempfile.TemporaryDirectory() as tmp:
+                daemon, player, sock = start_daemon(tmp)
+                try:
+                    r = phase(sock, clients, args.seconds, interval)
+                    # let the last coalescing window go out
+                    time.sleep(0.3)
+                finally:
+                    daemon.terminate()
+                    daemon.wait()
+                    player.stop()
+            print(f"{name:>6} {clients:>7} {r['answered']:>8.0f} {r['p50']:>7.2f} {r['p99']:>7.2f} {r['max']:>7.2f} "
+                  f"{r['ok']:>6} {r['limited']:>7} {r['other']:>5} {player.lines:>9}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+video_daemon_test.py - Checks video_daemon.VideoDaemon in a thread with a
+recording channel: whole lines from many clients, per-client rate limits
+(quit exempt), bad input, VideoClient across a daemon restart, a command
+that times out not being sent twice, and a second daemon refusing a socket
+that is in use.
+"""
+import errno
+import os
+import socket
+import sys
+import tempfile
+import threading
+import time
+
+from video_client import VideoClient
+from video_daemon import VideoDaemon
+
+CLIENTS = 20
+COMMANDS = 50
+
+
+class Recorder(object):
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.commands = []
+        self.closed = False
+
+    def send(self, command):
+        with self.lock:
+            self.commands.append(command)
+        return True
+
+    def close(self):
+        self.closed = True
+
+
+def start(path, **limits):
+    recorder = Recorder()
+    daemon = VideoDaemon(path, recorder, **limits)
+    thread = threading.Thread(target=daemon.serve, daemon=True)
+    thread.start()
+    daemon.ready.wait(1.0)
+    return daemon, thread, recorder
+
+
+def stop(daemon, thread):
+    daemon.stop()
+    thread.join(1.0)
+
+
+def check_many_clients(path):
+    daemon, thread, recorder = start(path, rate=1e6, burst=COMMANDS)
+
+    def run(i):
+        client = VideoClient(path)
+        for n in range(COMMANDS):
+            client.send(f'osd_show_text client-{i}-{n}-' + 'x' * 100)
+        client.close()
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(CLIENTS)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    stop(daemon, thread)
+    whole = all(command.endswith('x' * 100) for command in recorder.commands)
+    in_order = all([c for c in recorder.commands if f'client-{i}-' in c]
+                   == [f'osd_show_text client-{i}-{n}-' + 'x' * 100 for n in range(COMMANDS)]
+                   for i in range(CLIENTS))
+    ok = len(recorder.commands) == CLIENTS * COMMANDS and whole and in_order and recorder.closed
+    return ok, f"{len(recorder.commands)} lines from {CLIENTS} clients, whole and in order per client"
+
+
+def check_rate_limit(path):
+    daemon, thread, recorder = start(path, rate=1.0, burst=3)
+    first, second = VideoClient(path), VideoClient(path)
+    replies = [first.request('seek 10') for _ in range(5)]
+    # the limit is per client, and quit always goes through
+    other = second.request('pause')
+    quit = first.request('quit')
+    first.close()
+    second.close()
+    stop(daemon, thread)
+    ok = (replies == ['ok'] * 3 + ['limited'] * 2 and other == 'ok' and quit == 'ok'
+          and recorder.commands == ['seek 10'] * 3 + ['pause', 'quit'] and daemon.limited == 2)
+    return ok, f"replies {replies}, other client {other}, quit {quit}"
+
+
+def check_bad_input(path):
+    daemon, thread, recorder = start(path)
+    client = VideoClient(path)
+    empty = client.request('')
+    long = client.request('seek ' + '1' * 300)
+    after = client.request('pause')
+    client.close()
+    stop(daemon, thread)
+    ok = empty == 'error empty command' and long == 'error line too long' and after == 'ok'
+    return ok, f"empty: {empty}; 300 bytes: {long}; next command: {after}"
+
+
+def check_restart(path):
+    client = VideoClient(path, timeout=0.5)
+    before = client.send('pause')
+    daemon, thread, recorder = start(path)
+    first = client.send('pause')
+    stop(daemon, thread)
+    daemon, thread, recorder = start(path)
+    second = client.send('pause')
+    stop(daemon, thread)
+    client.close()
+    ok = not before and first and second and not os.path.exists(path)
+    return ok, f"no daemon {before}, first daemon {first}, after a restart {second}, socket removed"
+
+
+def check_no_resend(path):
+    # a daemon that reads commands but is too slow to answer any of them
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(path)
+    server.listen(4)
+    received = []
+
+    def slow():
+        conns = []
+        server.settimeout(1.0)
+        try:
+            while True:
+                conn, _ = server.accept()
+                conns.append(conn)
+                received.append(conn.recv(4096))
+        except OSError:
+            pass
+        for conn in conns:
+            conn.close()
+
+    thread = threading.Thread(target=slow)
+    thread.start()
+    client = VideoClient(path, timeout=0.2)
+    t0 = time.monotonic()
+    reply = client.request('pause')
+    took = time.monotonic() - t0
+    thread.join()
+    client.close()
+    server.close()
+    os.unlink(path)
+    ok = reply is None and received == [b'pause\n']
+    return ok, f"reply {reply} after {took:.2f} s, daemon got {received}"
+
+
+def check_socket_in_use(path):
+    daemon, thread, recorder = start(path)
+    try:
+        VideoDaemon(path, Recorder()).listen()
+        refused = 'not refused'
+    except OSError as e:
+        refused = errno.errorcode.get(e.errno, str(e.errno))
+    client = VideoClient(path)
+    still = client.send('pause')
+    client.close()
+    stop(daemon, thread)
+    # a socket file nobody answers on is taken over
+    stale = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    stale.bind(path)
+    stale.close()
+    daemon, thread, recorder = start(path)
+    client = VideoClient(path)
+    taken = client.send('pause')
+    client.close()
+    stop(daemon, thread)
+    ok = refused == 'EADDRINUSE' and still and taken
+    return ok, f"second daemon {refused}, first still serving {still}, stale socket taken over {taken}"
+
+
+def main():
+    failed = 0
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, check in (('many clients', check_many_clients), ('rate limit', check_rate_limit),
+                            ('bad input', check_bad_input), ('restart', check_restart),
+                            ('no resend', check_no_resend), ('socket in use', check_socket_in_use)):
+            ok, detail = check(os.path.join(tmp, name.replace(' ', '_') + '.sock'))
+            print(f"{'PASS' if ok else 'FAIL'} {name}: {detail}")
+            failed += not ok
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""
+video_launcher.py - Starts mplayer and its controller together, without sleeps
+ECE 5725 Lab 2
+
+start_video*.sh started the controller, slept a second and then started
+mplayer: a second lost on every start, and still not enough on a slow boot.
+This launcher starts both at once. The launcher holds its own write end of
+the FIFO, so mplayer can start before the controller has opened it and no
+command written later is lost. With --wait-controller, mplayer only starts
+once the controller says it is ready, so no button press after the first
+frame is missed, at the cost of a later first frame. Readiness is:
+
+    player       mplayer has the FIFO open for reading (our non-blocking open
+                 for writing stops failing with ENXIO)
+    controller   the controller has written to READY_FD (notify_ready()), or,
+                 with --socket, the controller's socket accepts connections
+    first frame  mplayer printed FIRST_FRAME_MARKER
+
+The launcher keeps its own write end of the FIFO open, so mplayer never
+sees end-of-file between controller writes. SIGINT, SIGTERM and SIGHUP are
+passed on to both children. When either one exits, the other is stopped too.
+A controller that never gets ready still gets its player after --timeout.
+
+    python3 video_launcher.py --controller 'python3 more_video_control_cb.py' -- \\
+        mplayer -slave -input file=video_fifo -vo fbdev:/dev/fb1 bigbuckbunny320p.mp4
+
+A controller script marks itself ready with:
+
+    from video_launcher import notify_ready
+    notify_ready()      # does nothing when not started by the launcher
+"""
+import argparse
+import errno
+import os
+import shlex
+import signal
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+FIFO_PATH = 'video_fifo'
+READY_TIMEOUT_SEC = 10.0
+PROBE_SEC = 0.005
+STOP_TIMEOUT_SEC = 2.0
+FIRST_FRAME_MARKER = 'Starting playback...'
+
+
+def notify_ready():
+    """Tell video_launcher.py this controller is up; False if it was not started by one."""
+    fd = os.environ.pop('READY_FD', None)
+    if fd is None:
+        return False
+    try:
+        os.write(int(fd), b'ready\n')
+        os.close(int(fd))
+    except OSError:
+        return False
+    return True
+
+
+def open_fifo_writer(path):
+    """Our write end once a reader has the FIFO open, None before that."""
+    try:
+        return os.open(path, os.O_WRONLY | os.O_NONBLOCK)
+    except OSError as e:
+        if e.errno == errno.ENXIO:
+            return None
+        raise
+
+
+def socket_bound(path):
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(path)
+        return True
+    except OSError:
+        return False
+    finally:
+        sock.close()
+
+
+class Launcher(object):
+    def __init__(self, player_argv, controller_argv, fifo=FIFO_PATH, socket_path=None,
+                 marker=FIRST_FRAME_MARKER, echo=True, wait_controller=False):
+        self.player_argv = player_argv
+        self.controller_argv = controller_argv
+        self.fifo = fifo
+        self.socket_path = socket_path
+        self.marker = marker
+        self.echo = echo
+        self.wait_controller = wait_controller
+        self.player = None
+        self.controller = None
+        self.fifo_fd = None
+        self.ready_r = None
+        self.first_frame = threading.Event()
+        self.started = None
+        # seconds from start() to each readiness signal
+        self.times = {}
+
+    def start(self):
+        if not os.path.exists(self.fifo):
+            os.mkfifo(self.fifo)
+        self.started = time.monotonic()
+        env = dict(os.environ)
+        pass_fds = ()
+        if self.socket_path is None:
+            self.ready_r, ready_w = os.pipe()
+            os.set_blocking(self.ready_r, False)
+            env['READY_FD'] = str(ready_w)
+            pass_fds = (ready_w,)
+        self.controller = subprocess.Popen(self.controller_argv, env=env, pass_fds=pass_fds)
+        if pass_fds:
+            os.close(pass_fds[0])
+        if not self.wait_controller:
+            self.start_player()
+
+    def start_player(self):
+        self.player = subprocess.Popen(self.player_argv, stdout=subprocess.PIPE, text=True, bufsize=1)
+        threading.Thread(target=self.relay, daemon=True).start()
+
+    def relay(self):
+        """Echo the player's output, watching for its first frame."""
+        for line in self.player.stdout:
+            if not self.first_frame.is_set() and self.marker in line:
+                self.times.setdefault('first frame', time.monotonic() - self.started)
+                self.first_frame.set()
+            if self.echo:
+                sys.stdout.write(line)
+                sys.stdout.flush()
+
+    def wait_ready(self, timeout=READY_TIMEOUT_SEC):
+        """Wait until player, controller and first frame are all ready; False on timeout or an early exit."""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            now = time.monotonic() - self.started
+            if 'controller' not in self.times and self.controller_ready():
+                self.times['controller'] = now
+                if self.player is None:
+                    self.start_player()
+            if 'player' not in self.times and self.player is not None:
+                self.fifo_fd = open_fifo_writer(self.fifo)
+                if self.fifo_fd is not None:
+                    self.times['player'] = now
+            if len(self.times) == 3 and self.first_frame.is_set():
+                return True
+            if self.controller.poll() is not None or self.player is not None and self.player.poll() is not None:
+                return False
+            time.sleep(PROBE_SEC)
+        if self.player is None:
+            # no readiness from the controller: start the player anyway, as the sleep did
+            self.start_player()
+        return False
+
+    def controller_ready(self):
+        if self.socket_path is not None:
+            return socket_bound(self.socket_path)
+        try:
+            return bool(os.read(self.ready_r, 64))
+        except BlockingIOError:
+            return False
+
+    def forward(self, signum, frame=None):
+        for child in (self.controller, self.player):
+            if child is not None and child.poll() is None:
+                child.send_signal(signum)
+
+    def wait(self):
+        """Wait for either child to exit, then stop the other; the player's exit code."""
+        if self.player is None:
+            self.start_player()
+        while self.player.poll() is None and self.controller.poll() is None:
+            time.sleep(0.05)
+        self.stop()
+        return self.player.returncode
+
+    def stop(self, timeout=STOP_TIMEOUT_SEC):
+        for child in (self.controller, self.player):
+            if child is not None and child.poll() is None:
+                child.terminate()
+        for child in (self.controller, self.player):
+            if child is None:
+                continue
+            try:
+                child.wait(timeout)
+            except subprocess.TimeoutExpired:
+                child.kill()
+                child.wait()
+        for fd in (self.fifo_fd, self.ready_r):
+            if fd is not None:
+                os.close(fd)
+        self.fifo_fd = self.ready_r = None
+
+    def report(self):
+        return ', '.join(f"{name} +{self.times[name]:.3f} s" for name in ('player', 'controller', 'first frame')
+                         if name in self.times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Start mplayer and a controller, waiting on readiness, not sleeps",
+                                     usage="%(prog)s [options] -- player command ...")
+    parser.add_argument('--controller', default='python3 more_video_control_cb.py', help="controller command line")
+    parser.add_argument('--fifo', default=FIFO_PATH, help="the player's -input file")
+    parser.add_argument('--socket', help="wait for this socket to be bound instead of READY_FD")
+    parser.add_argument('--marker', default=FIRST_FRAME_MARKER, help="player output meaning the first frame is up")
+    parser.add_argument('--timeout', type=float, default=READY_TIMEOUT_SEC, help="seconds to wait for readiness")
+    parser.add_argument('--wait-controller', action='store_true',
+                        help="start the player only once the controller is ready")
+    parser.add_argument('player', nargs=argparse.REMAINDER, help="player command line")
+    args = parser.parse_args()
+    player = args.player[1:] if args.player[:1] == ['--'] else args.player
+    if not player:
+        parser.error("no player command given")
+
+    launcher = Launcher(player, shlex.split(args.controller), args.fifo, args.socket, args.marker,
+                        wait_controller=args.wait_controller)
+    for signum in (signal.SIGINT, signal.SIGTERM, signal.SIGHUP):
+        signal.signal(signum, launcher.forward)
+    launcher.start()
+    if launcher.wait_ready(args.timeout):
+        print(f"video_launcher: ready: {launcher.report()}", flush=True)
+    else:
+        print(f"video_launcher: not ready after {args.timeout} s ({launcher.report() or 'nothing'})", flush=True)
+    return launcher.wait()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
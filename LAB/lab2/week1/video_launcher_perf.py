@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+video_launcher_perf.py - Cold start to first frame: start_video*.sh's sleep 1 against video_launcher.py
+ECE 5725 Lab 2
+
+Both ways start the same stand-ins: a controller that takes CONTROLLER_SEC to
+import and set up before it calls notify_ready(), and a player that takes
+PLAYER_SEC to open the FIFO and FRAME_SEC more to show its first frame. The
+shell way starts the controller, sleeps 1 s and then starts the player. The
+launcher starts both at once, or, with wait_controller, starts the player
+when the controller is ready. Each row is the median
+of --runs starts. It shows when the first frame came up, when the controller
+was ready, and whether the controller was ready first (if not, the first
+button presses after the video appears are lost).
+
+    python3 video_launcher_perf.py [--runs 3]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from video_launcher import FIRST_FRAME_MARKER, Launcher, notify_ready
+
+SHELL_SLEEP_SEC = 1.0
+FRAME_SEC = 0.05
+# name, controller start-up, player start-up
+SCENARIOS = (('normal boot', 0.3, 0.4), ('slow boot', 1.5, 0.8))
+
+
+def stand_in_player(fifo, startup):
+    time.sleep(startup)
+    fd = os.open(fifo, os.O_RDONLY | os.O_NONBLOCK)
+    time.sleep(FRAME_SEC)
+    print(FIRST_FRAME_MARKER, flush=True)
+    # play until stopped
+    while True:
+        time.sleep(1)
+        os.read(fd, 4096)
+
+
+def stand_in_controller(startup):
+    time.sleep(startup)
+    notify_ready()
+    while True:
+        time.sleep(1)
+
+
+def argvs(fifo, controller_sec, player_sec):
+    me = os.path.abspath(__file__)
+    return ([sys.executable, me, '--stand-in-player', fifo, str(player_sec)],
+            [sys.executable, me, '--stand-in-controller', str(controller_sec)])
+
+
+def shell_start(fifo, controller_sec, player_sec):
+    """What start_video*.sh did: controller &, sleep 1, player."""
+    player_argv, controller_argv = argvs(fifo, controller_sec, player_sec)
+    ready_r, ready_w = os.pipe()
+    t0 = time.monotonic()
+    controller = subprocess.Popen(controller_argv, env=dict(os.environ, READY_FD=str(ready_w)), pass_fds=(ready_w,))
+    os.close(ready_w)
+    # the controller's readiness is only measured here; the script never waited for it
+    ready = []
+    watcher = threading.Thread(target=lambda: ready.append(os.read(ready_r, 64) and time.monotonic() - t0))
+    watcher.start()
+    time.sleep(SHELL_SLEEP_SEC)
+    player = subprocess.Popen(player_argv, stdout=subprocess.PIPE, text=True)
+    player.stdout.readline()
+    first_frame = time.monotonic() - t0
+    watcher.join()
+    controller_ready = ready[0]
+    os.close(ready_r)
+    for child in (controller, player):
+        child.terminate()
+        child.wait()
+    return first_frame, controller_ready
+
+
+def launcher_start(fifo, controller_sec, player_sec, wait_controller=False):
+    player_argv, controller_argv = argvs(fifo, controller_sec, player_sec)
+    launcher = Launcher(player_argv, controller_argv, fifo, echo=False, wait_controller=wait_controller)
+    launcher.start()
+    launcher.wait_ready()
+    launcher.stop()
+    return launcher.times['first frame'], launcher.times['controller']
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=3, help="starts per row")
+    parser.add_argument('--stand-in-player', nargs=2, metavar=('FIFO', 'SEC'), help=argparse.SUPPRESS)
+    parser.add_argument('--stand-in-controller', metavar='SEC', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.stand_in_player:
+        return stand_in_player(args.stand_in_player[0], float(args.stand_in_player[1]))
+    if args.stand_in_controller:
+        return stand_in_controller(float(args.stand_in_controller))
+
+    print(f"{'scenario':>12} {'start':>9} {'first frame s':>14} {'controller s':>13}  controller first")
+    with tempfile.TemporaryDirectory() as tmp:
+        fifo = os.path.join(tmp, 'video_fifo')
+        os.mkfifo(fifo)
+        for name, controller_sec, player_sec in SCENARIOS:
+            for method, start in (('sleep 1', shell_start), ('launcher', launcher_start),
+                                  ('wait ctl', lambda *a: launcher_start(*a, wait_controller=True))):
+                runs = [start(fifo, controller_sec, player_sec) for _ in range(args.runs)]
+                first_frame = statistics.median(r[0] for r in runs)
+                controller = statistics.median(r[1] for r in runs)
+                print(f"{name:>12} {method:>9} {first_frame:>14.3f} {controller:>13.3f}  "
+                      f"{'yes' if controller <= first_frame else 'NO'}")
+
+
+if __name__ == '__main__':
+    main()
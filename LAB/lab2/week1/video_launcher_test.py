@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+video_launcher_test.py - Checks video_launcher.Launcher with small stand-in
+processes: the player starts at once, or with wait_controller only after
+the controller's notify_ready(), a bound socket counts as ready, signals reach both children, one exiting stops the
+other, and a controller that never gets ready still gets its player.
+"""
+import os
+import signal
+import sys
+import tempfile
+import time
+
+from video_launcher import FIRST_FRAME_MARKER, Launcher
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+PLAYER = f"""
+import os, sys, time
+fd = os.open(sys.argv[1], os.O_RDONLY | os.O_NONBLOCK)
+print({FIRST_FRAME_MARKER!r}, flush=True)
+time.sleep(float(sys.argv[2]))
+"""
+CONTROLLER = f"""
+import sys, time
+sys.path.insert(0, {HERE!r})
+from video_launcher import notify_ready
+time.sleep(0.1)
+if sys.argv[1] == 'notify':
+    notify_ready()
+elif sys.argv[1] == 'socket':
+    import socket
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.bind(sys.argv[2])
+    sock.listen(1)
+time.sleep(30)
+"""
+
+
+def launcher(tmp, mode, play_sec=30, **options):
+    fifo = os.path.join(tmp, 'video_fifo')
+    sock = os.path.join(tmp, 'controller.sock')
+    if os.path.exists(sock):
+        os.unlink(sock)
+    return Launcher([sys.executable, '-c', PLAYER, fifo, str(play_sec)],
+                    [sys.executable, '-c', CONTROLLER, mode, sock], fifo,
+                    socket_path=sock if mode == 'socket' else None, echo=False, **options)
+
+
+def check_parallel(tmp):
+    run = launcher(tmp, 'notify')
+    run.start()
+    ready = run.wait_ready(5.0)
+    run.stop()
+    times = run.times
+    # the controller takes 0.1 s to get ready; the player must not wait for it
+    ok = ready and times['player'] < times['controller']
+    return ok, run.report()
+
+
+def check_ordered(tmp):
+    run = launcher(tmp, 'notify', wait_controller=True)
+    run.start()
+    ready = run.wait_ready(5.0)
+    run.stop()
+    times = run.times
+    # the player is only started once the controller is ready
+    ok = ready and 0.1 <= times['controller'] <= min(times['player'], times['first frame'])
+    return ok, run.report()
+
+
+def check_socket(tmp):
+    run = launcher(tmp, 'socket')
+    run.start()
+    ready = run.wait_ready(5.0)
+    run.stop()
+    return ready and run.times['controller'] >= 0.1, run.report()
+
+
+def check_teardown(tmp):
+    run = launcher(tmp, 'notify', play_sec=0.3)
+    run.start()
+    run.wait_ready(5.0)
+    t0 = time.monotonic()
+    # the player ends by itself; the controller must not be left running
+    code = run.wait()
+    elapsed = time.monotonic() - t0
+    ok = code == 0 and run.controller.returncode is not None and elapsed < 1.5
+    first = (code, run.controller.returncode)
+
+    run = launcher(tmp, 'notify')
+    run.start()
+    run.wait_ready(5.0)
+    run.forward(signal.SIGTERM)
+    run.wait()
+    ok = ok and run.player.returncode == -signal.SIGTERM and run.controller.returncode == -signal.SIGTERM
+    return ok, f"player exit -> exit codes {first}; SIGTERM forwarded -> {run.player.returncode}, {run.controller.returncode}"
+
+
+def check_timeout(tmp):
+    run = launcher(tmp, 'silent', wait_controller=True)
+    run.start()
+    ready = run.wait_ready(0.5)
+    started = run.player is not None
+    run.stop()
+    return not ready and started and 'controller' not in run.times, f"not ready, player started anyway: {started}"
+
+
+def main():
+    failed = 0
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, check in (('parallel', check_parallel), ('ordered', check_ordered), ('socket', check_socket),
+                            ('teardown', check_teardown), ('timeout', check_timeout)):
+            ok, detail = check(tmp)
+            print(f"{'PASS' if ok else 'FAIL'} {name}: {detail}")
+            failed += not ok
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -9,10 +9,11 @@ ECE 5725 Lab 2 Week 2
 import os
 import sys
 import time
-import math
 import pygame
 import RPi.GPIO as GPIO
 
+from ball_world import BallWorld
+
 # --- CONFIGURATION ---
 USE_TFT = True  # Set to True for final piTFT run
 WIDTH, HEIGHT = 320, 240
@@ -24,9 +25,11 @@ BLACK = (0, 0, 0)
 GREEN = (0, 180, 0)
 RED = (220, 0, 0)
 BLUE = (0, 128, 255)
+GREY = (160, 160, 160)
 
 # Animation Defaults
 INITIAL_RADIUS = 25
+BALLS = int(os.environ.get('BALLS', 2))  # more than 2 adds small grey balls
 
 # --- SETUP FUNCTIONS ---
 def setup_env():
@@ -48,84 +51,29 @@ def setup_gpio():
     except:
         return False
 
-# --- COLLISION LOGIC (Adopted from your two_collide.py) ---
-def resolve_elastic_collision(b1, b2, radius):
-    """Handles the physics of an elastic collision and resolves overlap."""
-    dx = b2['x'] - b1['x']
-    dy = b2['y'] - b1['y']
-    dist = math.hypot(dx, dy)
-    
-    if dist == 0: return
-
-    # 1. Positional Correction
-    overlap = 2 * radius - dist
-    if overlap > 0:
-        nx, ny = dx / dist, dy / dist
-        b1['x'] -= nx * overlap / 2
-        b1['y'] -= ny * overlap / 2
-        b2['x'] += nx * overlap / 2
-        b2['y'] += ny * overlap / 2
-
-    # 2. Velocity Change
-    nx, ny = dx / dist, dy / dist
-    rel_vel_dot = (b1['vx'] - b2['vx']) * nx + (b1['vy'] - b2['vy']) * ny
-    
-    if rel_vel_dot < 0:
-        b1['vx'] -= rel_vel_dot * nx
-        b1['vy'] -= rel_vel_dot * ny
-        b2['vx'] += rel_vel_dot * nx
-        b2['vy'] += rel_vel_dot * ny
-
 # --- ANIMATION CLASS ---
 class TwoCollideControl:
     def __init__(self):
         self.radius = INITIAL_RADIUS
-        self.balls = [
-            {'x': WIDTH*0.35, 'y': HEIGHT*0.5, 'vx': 2.5, 'vy': 1.8, 'color': RED},
-            {'x': WIDTH*0.65, 'y': HEIGHT*0.5, 'vx': -1.8, 'vy': -2.2, 'color': BLUE},
-        ]
+        # positions, velocities and collisions live in a ball_world.BallWorld
+        self.world = BallWorld(WIDTH, HEIGHT)
+        self.world.add(WIDTH*0.35, HEIGHT*0.5, 2.5, 1.8, self.radius)
+        self.world.add(WIDTH*0.65, HEIGHT*0.5, -1.8, -2.2, self.radius)
+        self.world.add_random(max(BALLS - 2, 0), radius=(2, 4))
+        self.colors = [RED, BLUE] + [GREY] * (self.world.count - 2)
         self.pause = False
         self.speed_scale = 1.0
 
     def update(self):
-        """Updates ball positions, handles boundary and ball-to-ball collision."""
+        """Moves the balls one frame, scaled by speed_scale, bouncing off walls and each other."""
         if self.pause:
             return
-            
-        r = self.radius
-        
-        # 1. Update Positions and Boundary Collisions
-        for b in self.balls:
-            b['x'] += b['vx'] * self.speed_scale
-            b['y'] += b['vy'] * self.speed_scale
-
-            # X-axis boundary
-            if b['x'] - r < 0:
-                b['x'] = r
-                b['vx'] = -b['vx']
-            elif b['x'] + r > WIDTH:
-                b['x'] = WIDTH - r
-                b['vx'] = -b['vx']
-                
-            # Y-axis boundary
-            if b['y'] - r < 0:
-                b['y'] = r
-                b['vy'] = -b['vy']
-            elif b['y'] + r > HEIGHT:
-                b['y'] = HEIGHT - r
-                b['vy'] = -b['vy']
-
-        # 2. Ball-to-Ball Collision Check
-        b1, b2 = self.balls
-        dx = b2['x'] - b1['x']
-        dy = b2['y'] - b1['y']
-        if dx*dx + dy*dy <= (2*self.radius)*(2*self.radius):
-            resolve_elastic_collision(b1, b2, self.radius)
+        self.world.step(self.speed_scale)
 
     def draw(self, screen):
         """Draws the balls on the screen."""
-        for b in self.balls:
-            pygame.draw.circle(screen, b['color'], (int(b['x']), int(b['y'])), self.radius)
+        for (x, y), r, color in zip(self.world.positions.tolist(), self.world.radii.tolist(), self.colors):
+            pygame.draw.circle(screen, color, (int(x), int(y)), int(r))
 
 # --- MAIN LOGIC ---
 def main():
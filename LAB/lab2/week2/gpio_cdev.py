@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+"""
+gpio_cdev.py - GPIO input through the character device, with kernel timestamps
+ECE 5725
+
+RPi.GPIO runs edge callbacks on its own thread with no timestamp, so the
+only debounce it has is a bouncetime measured whenever that thread woke up.
+This requests lines from /dev/gpiochipN with the v2 line uAPI (the ioctls
+libgpiod wraps, Linux 5.10+) and reads the kernel's edge event records
+instead: each carries the line, the direction and the CLOCK_MONOTONIC time
+the interrupt fired, in ns, comparable with time.monotonic(). One read()
+returns every edge queued on every requested line.
+
+    chip = Chip('/dev/gpiochip0')
+    lines = chip.request([17, 22, 23, 27], bias='up')
+    while True:
+        for event in lines.read_events():
+            print(event.offset, 'rising' if event.level else 'falling', event.time)
+
+Offsets on gpiochip0 are BCM numbers on a Pi 1-4. FakeChip hands out
+requests backed by a pipe and FakeChip.set() writes the same records the
+kernel would, so everything here runs without GPIO hardware; EdgeWatcher
+calls a handler for each event on its own thread.
+"""
+import collections
+import fcntl
+import os
+import select
+import struct
+import threading
+import time
+
+GPIO_CHIP = os.getenv('GPIO_CHIP') or '/dev/gpiochip0'
+CONSUMER = b'ece5725'
+# events taken per read(); the kernel buffers 16 per line by default
+EVENT_BATCH = 64
+
+# linux/gpio.h
+GPIO_MAX_LINES = 64
+GPIO_MAX_ATTRS = 10
+LINE_FLAG_INPUT = 1 << 2
+LINE_FLAG_EDGE_RISING = 1 << 4
+LINE_FLAG_EDGE_FALLING = 1 << 5
+LINE_FLAG_BIAS_PULL_UP = 1 << 8
+LINE_FLAG_BIAS_PULL_DOWN = 1 << 9
+LINE_FLAG_BIAS_DISABLED = 1 << 10
+LINE_ATTR_ID_DEBOUNCE = 3
+EVENT_RISING_EDGE = 1
+EVENT_FALLING_EDGE = 2
+BIAS_FLAGS = {None: 0, 'up': LINE_FLAG_BIAS_PULL_UP, 'down': LINE_FLAG_BIAS_PULL_DOWN,
+              'disable': LINE_FLAG_BIAS_DISABLED}
+EDGE_FLAGS = {None: 0, 'rising': LINE_FLAG_EDGE_RISING, 'falling': LINE_FLAG_EDGE_FALLING,
+              'both': LINE_FLAG_EDGE_RISING | LINE_FLAG_EDGE_FALLING}
+
+# struct gpiochip_info: name, label, lines
+CHIP_INFO = struct.Struct('=32s32sI')
+# struct gpio_v2_line_config_attribute: id, padding, union {flags, values, debounce_period_us}, mask
+LINE_ATTR = struct.Struct('=IIQQ')
+# struct gpio_v2_line_request: offsets, consumer, config (flags, num_attrs, padding, attrs),
+# num_lines, event_buffer_size, padding, fd
+LINE_REQUEST = struct.Struct(f'={GPIO_MAX_LINES}I32sQI5I{GPIO_MAX_ATTRS * LINE_ATTR.size}sII5Ii')
+LINE_REQUEST_FD = LINE_REQUEST.size - 4
+# struct gpio_v2_line_values: bits, mask
+LINE_VALUES = struct.Struct('=QQ')
+# struct gpio_v2_line_event: timestamp_ns, id, offset, seqno, line_seqno, padding
+LINE_EVENT = struct.Struct('=QIIII24x')
+
+
+def _iowr(nr, size, read_only=False):
+    return (2 if read_only else 3) << 30 | size << 16 | 0xB4 << 8 | nr
+
+
+GPIO_GET_CHIPINFO_IOCTL = _iowr(0x01, CHIP_INFO.size, read_only=True)
+GPIO_V2_GET_LINE_IOCTL = _iowr(0x07, LINE_REQUEST.size)
+GPIO_V2_LINE_GET_VALUES_IOCTL = _iowr(0x0E, LINE_VALUES.size)
+
+
+class EdgeEvent(collections.namedtuple('EdgeEvent', 'offset level time timestamp_ns seqno line_seqno')):
+    """One edge: level is the line's level after it (1 rising, 0 falling), time is monotonic seconds."""
+    __slots__ = ()
+
+
+def decode_events(data):
+    events = []
+    for timestamp_ns, event_id, offset, seqno, line_seqno in LINE_EVENT.iter_unpack(data):
+        events.append(EdgeEvent(offset, 1 if event_id == EVENT_RISING_EDGE else 0, timestamp_ns / 1e9,
+                                timestamp_ns, seqno, line_seqno))
+    return events
+
+
+class LineRequest(object):
+    """Requested lines; closing the fd hands them back to the kernel."""
+    def __init__(self, fd, offsets):
+        self.fd = fd
+        self.offsets = list(offsets)
+
+    def fileno(self):
+        return self.fd
+
+    def wait(self, timeout=None):
+        """True once an event can be read, False after timeout seconds."""
+        return bool(select.select([self.fd], [], [], timeout)[0])
+
+    def read_events(self, max_events=EVENT_BATCH):
+        """Every queued event up to max_events, oldest first; blocks until there is one."""
+        return decode_events(os.read(self.fd, max_events * LINE_EVENT.size))
+
+    def values(self):
+        """{offset: level} for every requested line."""
+        buf = bytearray(LINE_VALUES.pack(0, (1 << len(self.offsets)) - 1))
+        fcntl.ioctl(self.fd, GPIO_V2_LINE_GET_VALUES_IOCTL, buf)
+        bits, _ = LINE_VALUES.unpack(buf)
+        return {offset: (bits >> i) & 1 for i, offset in enumerate(self.offsets)}
+
+    def close(self):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+
+class Chip(object):
+    def __init__(self, path=GPIO_CHIP):
+        self.path = path
+
+    def info(self):
+        """(name, label, number of lines) from the chip."""
+        fd = os.open(self.path, os.O_RDONLY)
+        try:
+            buf = bytearray(CHIP_INFO.size)
+            fcntl.ioctl(fd, GPIO_GET_CHIPINFO_IOCTL, buf)
+        finally:
+            os.close(fd)
+        name, label, lines = CHIP_INFO.unpack(buf)
+        return name.rstrip(b'\0').decode(), label.rstrip(b'\0').decode(), lines
+
+    def request(self, offsets, bias='up', edges='both', debounce_us=0, event_buffer_size=0, consumer=CONSUMER):
+        """Request offsets as inputs; bias 'up'/'down'/'disable'/None, edges 'both'/'rising'/'falling'/None."""
+        offsets = list(offsets)
+        if not 0 < len(offsets) <= GPIO_MAX_LINES:
+            raise ValueError(f"between 1 and {GPIO_MAX_LINES} lines per request")
+        flags = LINE_FLAG_INPUT | BIAS_FLAGS[bias] | EDGE_FLAGS[edges]
+        attrs = b''
+        if debounce_us:
+            # the kernel's own debounce, on every line of the request
+            attrs = LINE_ATTR.pack(LINE_ATTR_ID_DEBOUNCE, 0, debounce_us, (1 << len(offsets)) - 1)
+        buf = bytearray(LINE_REQUEST.pack(*(offsets + [0] * (GPIO_MAX_LINES - len(offsets))), consumer, flags,
+                                          1 if attrs else 0, 0, 0, 0, 0, 0, attrs, len(offsets),
+                                          event_buffer_size, 0, 0, 0, 0, 0, 0))
+        fd = os.open(self.path, os.O_RDONLY)
+        try:
+            fcntl.ioctl(fd, GPIO_V2_GET_LINE_IOCTL, buf)
+        finally:
+            # the request keeps its own fd; the chip fd is not needed any more
+            os.close(fd)
+        return LineRequest(struct.unpack_from('=i', buf, LINE_REQUEST_FD)[0], offsets)
+
+
+class FakeLineRequest(LineRequest):
+    def __init__(self, offsets, bias, edges):
+        rfd, self.wfd = os.pipe()
+        super(FakeLineRequest, self).__init__(rfd, offsets)
+        self.bias_level = 0 if bias == 'down' else 1
+        self.levels = dict.fromkeys(self.offsets, self.bias_level)
+        self.edges = EDGE_FLAGS[edges]
+        self.seqno = 0
+        self.line_seqno = dict.fromkeys(self.offsets, 0)
+
+    def values(self):
+        return dict(self.levels)
+
+    def feed(self, offset, level, t):
+        if offset not in self.levels:
+            return
+        level = self.bias_level if level is None else level
+        if level == self.levels[offset]:
+            return
+        self.levels[offset] = level
+        if not self.edges & (LINE_FLAG_EDGE_RISING if level else LINE_FLAG_EDGE_FALLING):
+            return
+        self.seqno += 1
+        self.line_seqno[offset] += 1
+        os.write(self.wfd, LINE_EVENT.pack(int(t * 1e9), EVENT_RISING_EDGE if level else EVENT_FALLING_EDGE,
+                                           offset, self.seqno, self.line_seqno[offset]))
+
+    def close(self):
+        if self.fd is not None:
+            os.close(self.wfd)
+        super(FakeLineRequest, self).close()
+
+
+class FakeChip(object):
+    """Stands in for a Chip; set() drives a line and every request holding it sees the edge."""
+    def __init__(self, path='fake'):
+        self.path = path
+        self.requests = []
+
+    def info(self):
+        return 'fake', 'fake', GPIO_MAX_LINES
+
+    def request(self, offsets, bias='up', edges='both', debounce_us=0, event_buffer_size=0, consumer=CONSUMER):
+        request = FakeLineRequest(offsets, bias, edges)
+        self.requests.append(request)
+        return request
+
+    def set(self, offset, level, t=None):
+        """Drive offset to level (0/1, or None for its bias) at monotonic time t, default now."""
+        t = time.monotonic() if t is None else t
+        for request in self.requests:
+            if request.fd is not None:
+                request.feed(offset, level, t)
+
+
+def open_chip(chip=None):
+    """A Chip for a path (default GPIO_CHIP), or chip itself if it already has request()."""
+    if chip is None or isinstance(chip, str):
+        return Chip(chip or GPIO_CHIP)
+    return chip
+
+
+class EdgeWatcher(threading.Thread):
+    """Reads a LineRequest in batches and calls handler(event) for each edge, on this thread."""
+    def __init__(self, request, handler, batch=EVENT_BATCH):
+        super(EdgeWatcher, self).__init__(daemon=True)
+        self.request = request
+        self.handler = handler
+        self.batch = batch
+        self.wake_r, self.wake_w = os.pipe()
+        self.reads = 0
+        self.events = 0
+
+    def run(self):
+        poller = select.poll()
+        poller.register(self.request.fileno(), select.POLLIN)
+        poller.register(self.wake_r, select.POLLIN)
+        try:
+            while True:
+                ready = [fd for fd, _ in poller.poll()]
+                if self.wake_r in ready:
+                    break
+                events = self.request.read_events(self.batch)
+                self.reads += 1
+                self.events += len(events)
+                for event in events:
+                    self.handler(event)
+        finally:
+            os.close(self.wake_r)
+
+    def stop(self):
+        if self.wake_w is None:
+            return
+        if self.is_alive():
+            os.write(self.wake_w, b'x')
+            self.join()
+        elif self.ident is None:
+            # never started
+            os.close(self.wake_r)
+        os.close(self.wake_w)
+        self.wake_w = None
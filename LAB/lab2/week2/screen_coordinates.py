@@ -3,6 +3,8 @@
 screen_coordinates.py - Displays tap coordinates and a quit button on the piTFT.
 Meets Lab 2, Week 2 requirements including touch coordinate display, quit button,
 physical bailout, and code timeout. Requires pigame.py & pitft_touchscreen.py.
+Run with --calibrate to tap a grid of crosshairs and save a least-squares touch
+calibration that pigame.PiTft loads at startup (see touch_calibration.py).
 """
 import os
 import sys
@@ -41,6 +43,46 @@ def setup_gpio():
         # Fails silently if running on a non-Pi system or RPi.GPIO isn't available
         return False
 
+# --- Calibration Mode ---
+def draw_crosshair(screen, pos, color):
+    """Draws a target crosshair with a small ring at pos."""
+    x, y = pos
+    pygame.draw.line(screen, color, (x - 12, y), (x + 12, y))
+    pygame.draw.line(screen, color, (x, y - 12), (x, y + 12))
+    pygame.draw.circle(screen, color, pos, 6, 1)
+
+def run_calibration(screen, pitft, font, gpio_available, bailout_deadline):
+    """Collects one raw tap per target and saves the fitted affine calibration."""
+    import touch_calibration
+    raw, hit = [], []
+    clock = pygame.time.Clock()
+    for n, target in enumerate(touch_calibration.targets((WIDTH, HEIGHT)), 1):
+        tap = None
+        while tap is None:
+            if (gpio_available and not GPIO.input(BAILOUT_PIN)) or time.time() > bailout_deadline:
+                print("Calibration aborted")
+                return
+            pitft.update()
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT:
+                    return
+                # raw panel coordinates come with the touch release
+                elif event.type == pygame.MOUSEBUTTONUP and hasattr(event, 'raw'):
+                    tap = event.raw
+            screen.fill(BLACK)
+            label = font.render(f"Tap the cross ({n})", True, WHITE)
+            screen.blit(label, label.get_rect(center=(WIDTH // 2, HEIGHT // 2 + 40)))
+            draw_crosshair(screen, target, RED)
+            pygame.display.flip()
+            clock.tick(30)
+        print(f"Target {target}: raw {tap}")
+        raw.append(tap)
+        hit.append(target)
+    coeffs, rms = touch_calibration.fit_affine(raw, hit)
+    touch_calibration.save(coeffs, (WIDTH, HEIGHT), pitft.pitft.pigamerotr)
+    print("x = {0:.4f}*rx + {1:.4f}*ry + {2:.2f}\ny = {3:.4f}*rx + {4:.4f}*ry + {5:.2f}".format(*coeffs))
+    print(f"RMS error {rms:.2f} px, saved to {touch_calibration.CACHE_PATH}")
+
 # --- Main Function ---
 def main():
     setup_env()
@@ -74,6 +116,12 @@ def main():
     gpio_available = setup_gpio()
 
     running = True
+    if '--calibrate' in sys.argv[1:]:
+        if pitft:
+            run_calibration(screen, pitft, font, gpio_available, bailout_deadline)
+        else:
+            print("Calibration needs the piTFT touchscreen (pigame)")
+        running = False
     
     while running:
         # Check physical bailout button (Lab Requirement) 
@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+#  Incremental gesture recognizer for the piTFT touch stream.
+#
+#  feed() is called once per touch sample (by pigame.PiTft(gestures=True),
+#  in the reader thread, or from update() for drain-only sources) and does
+#  constant work: it only updates a handful of slots, so nothing is
+#  allocated per sample. Gestures are reported through the emit callback as
+#  soon as the deciding sample arrives:
+#
+#    emit(kind, phase, x, y, dx, dy, vx, vy)
+#
+#  kind is 'tap', 'double_tap', 'long_press', 'swipe' or 'drag'; phase is
+#  'start'/'move'/'end' for drags, the direction ('left'/'right'/'up'/'down')
+#  for swipes and None otherwise. (dx, dy) is the displacement from the
+#  press, (vx, vy) the smoothed velocity in px/s.
+
+import math
+
+TAP_SLOP_PX = 10          # movement allowed before a press becomes a drag
+LONG_PRESS_SEC = 0.6
+DOUBLE_TAP_SEC = 0.35     # release-to-release gap for a double tap
+DOUBLE_TAP_SLOP_PX = 25
+SWIPE_MIN_SPEED = 400.0   # px/s at release
+SWIPE_MIN_DIST_PX = 40
+VELOCITY_SMOOTHING = 0.5  # weight of the newest sample in the velocity average
+
+IDLE = 0
+PRESSED = 1
+DRAGGING = 2
+
+
+def direction(dx, dy):
+    """Dominant axis of a displacement as 'left'/'right'/'up'/'down' (screen y grows down)."""
+    if abs(dx) >= abs(dy):
+        return 'right' if dx > 0 else 'left'
+    return 'down' if dy > 0 else 'up'
+
+
+class GestureRecognizer(object):
+    __slots__ = ('emit', 'state', 'x0', 'y0', 't0', 'x', 'y', 't', 'vx', 'vy',
+                 'long_fired', 'last_tap_t', 'last_tap_x', 'last_tap_y',
+                 'tap_slop2', 'double_slop2')
+
+    def __init__(self, emit):
+        self.emit = emit
+        self.state = IDLE
+        self.x0 = self.y0 = self.x = self.y = 0
+        self.t0 = self.t = 0.0
+        self.vx = self.vy = 0.0
+        self.long_fired = False
+        self.last_tap_t = -1e9
+        self.last_tap_x = self.last_tap_y = 0
+        self.tap_slop2 = TAP_SLOP_PX * TAP_SLOP_PX
+        self.double_slop2 = DOUBLE_TAP_SLOP_PX * DOUBLE_TAP_SLOP_PX
+
+    def feed(self, x, y, down, t):
+        """One sample: screen position, whether the finger is down, timestamp in seconds."""
+        state = self.state
+        if not down:
+            if state != IDLE:
+                self.release(t)
+            return
+        if state == IDLE:
+            self.state = PRESSED
+            self.x0 = self.x = x
+            self.y0 = self.y = y
+            self.t0 = self.t = t
+            self.vx = self.vy = 0.0
+            self.long_fired = False
+            return
+        dt = t - self.t
+        if dt > 0:
+            k = VELOCITY_SMOOTHING
+            self.vx += k * ((x - self.x) / dt - self.vx)
+            self.vy += k * ((y - self.y) / dt - self.vy)
+        self.x = x
+        self.y = y
+        self.t = t
+        dx = x - self.x0
+        dy = y - self.y0
+        if state == PRESSED:
+            if dx * dx + dy * dy > self.tap_slop2:
+                self.state = DRAGGING
+                self.emit('drag', 'start', x, y, dx, dy, self.vx, self.vy)
+            elif not self.long_fired and t - self.t0 >= LONG_PRESS_SEC:
+                self.long_fired = True
+                self.emit('long_press', None, x, y, dx, dy, 0.0, 0.0)
+        else:
+            self.emit('drag', 'move', x, y, dx, dy, self.vx, self.vy)
+
+    def release(self, t):
+        x = self.x
+        y = self.y
+        dx = x - self.x0
+        dy = y - self.y0
+        if self.state == DRAGGING:
+            self.emit('drag', 'end', x, y, dx, dy, self.vx, self.vy)
+            if (math.hypot(self.vx, self.vy) >= SWIPE_MIN_SPEED
+                    and dx * dx + dy * dy >= SWIPE_MIN_DIST_PX * SWIPE_MIN_DIST_PX):
+                self.emit('swipe', direction(dx, dy), x, y, dx, dy, self.vx, self.vy)
+        elif self.long_fired:
+            pass
+        elif t - self.t0 >= LONG_PRESS_SEC:
+            # held still with no samples in between, decide on release
+            self.emit('long_press', None, x, y, dx, dy, 0.0, 0.0)
+        else:
+            tx = x - self.last_tap_x
+            ty = y - self.last_tap_y
+            if t - self.last_tap_t <= DOUBLE_TAP_SEC and tx * tx + ty * ty <= self.double_slop2:
+                self.last_tap_t = -1e9
+                self.emit('double_tap', None, x, y, dx, dy, 0.0, 0.0)
+            else:
+                self.last_tap_t = t
+                self.last_tap_x = x
+                self.last_tap_y = y
+                self.emit('tap', None, x, y, dx, dy, 0.0, 0.0)
+        self.state = IDLE
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+gesture_trace_test.py - Checks touch_gestures.GestureRecognizer against
+recorded-format touch traces. Each trace is written as a touch_replay log,
+read back, decoded with pitft_touchscreen.TouchDecoder and fed sample by
+sample the way PiTft's reader-thread listener feeds it: positions and the
+touch state carried over frames that do not change them. Pass a .tlog
+recorded with touch_replay.py to print the gestures found in it instead.
+"""
+import os
+import sys
+import tempfile
+
+import touch_replay
+from pitft_touchscreen import TouchDecoder, EV_ABS, EV_KEY, EV_SYN, ABS_X, ABS_Y, BTN_TOUCH, SYN_REPORT
+from touch_gestures import GestureRecognizer
+
+
+def frame(t, x=None, y=None, touch=None):
+    events = []
+    if x is not None:
+        events.append((EV_ABS, ABS_X, x))
+    if y is not None:
+        events.append((EV_ABS, ABS_Y, y))
+    if touch is not None:
+        events.append((EV_KEY, BTN_TOUCH, touch))
+    events.append((EV_SYN, SYN_REPORT, 0))
+    return (t, events)
+
+
+def press(t, x, y, hold=0.05, step=0.01):
+    """Finger down at (x, y), resting for hold seconds, then up."""
+    frames = [frame(t, x, y, 1)]
+    n = int(hold / step)
+    for i in range(1, n + 1):
+        frames.append(frame(t + i * step, x, y))
+    frames.append(frame(t + hold + step, touch=0))
+    return frames
+
+
+def stroke(t, x0, y0, x1, y1, seconds, step=0.01):
+    """Finger down, straight move to (x1, y1) over seconds, then up."""
+    n = int(seconds / step)
+    frames = [frame(t, x0, y0, 1)]
+    for i in range(1, n + 1):
+        frames.append(frame(t + i * step, x0 + (x1 - x0) * i // n, y0 + (y1 - y0) * i // n))
+    frames.append(frame(t + seconds + step, touch=0))
+    return frames
+
+
+TRACES = {
+    'tap': (press(0.0, 100, 100), ['tap']),
+    'double_tap': (press(0.0, 100, 100) + press(0.2, 104, 98), ['tap', 'double_tap']),
+    'two taps too slow': (press(0.0, 100, 100) + press(0.8, 100, 100), ['tap', 'tap']),
+    'long_press': (press(0.0, 50, 60, hold=0.8), ['long_press']),
+    'swipe right': (stroke(0.0, 20, 120, 220, 120, 0.2), ['drag', 'swipe:right']),
+    'swipe up': (stroke(0.0, 160, 220, 160, 40, 0.15), ['drag', 'swipe:up']),
+    'slow drag': (stroke(0.0, 40, 40, 120, 60, 1.5), ['drag']),
+}
+
+
+def gestures_in(frames):
+    """Round-trip frames through a log file and return the recognized gestures."""
+    fd, path = tempfile.mkstemp(suffix='.tlog')
+    os.close(fd)
+    try:
+        touch_replay.write_log(path, frames)
+        frames = touch_replay.read_log(path)
+    finally:
+        os.unlink(path)
+    found = []
+
+    def emit(kind, phase, x, y, dx, dy, vx, vy):
+        if kind == 'drag':
+            if phase == 'start':
+                found.append('drag')
+        elif kind == 'swipe':
+            found.append('swipe:' + phase)
+        else:
+            found.append(kind)
+
+    decoder = TouchDecoder()
+    recognizer = GestureRecognizer(emit)
+    pos = [0, 0]
+    touch = None
+    for t, events in frames:
+        sec = int(t)
+        usec = int(round((t - sec) * 1e6))
+        for type, code, value in events:
+            event = decoder.feed(sec, usec, type, code, value)
+            if event is not None:
+                if event['x'] is not None:
+                    pos[0] = event['x']
+                if event['y'] is not None:
+                    pos[1] = event['y']
+                if event['touch'] is not None:
+                    touch = event['touch']
+                recognizer.feed(pos[0], pos[1], touch != 0, event['time'])
+    return found
+
+
+def main():
+    if len(sys.argv) > 1:
+        print(gestures_in(touch_replay.read_log(sys.argv[1])))
+        return 0
+    failed = 0
+    for name, (frames, expected) in TRACES.items():
+        found = gestures_in(frames)
+        ok = found == expected
+        failed += not ok
+        print(f"{'PASS' if ok else 'FAIL'}  {name:<18} {found}" + ('' if ok else f" expected {expected}"))
+    print(f"{len(TRACES) - failed}/{len(TRACES)} traces passed")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,7 +1,7 @@
-import pygame,pitft_touchscreen,os
+import pygame,pitft_touchscreen,touch_calibration,os,time
 defaultrot = os.getenv('PIGAME_ROT') or '90'
 support_gpio = True
-envmk = ['PIGAME_V2','PIGAME_INVERTX','PIGAME_INVERTY','PIGAME_SWAPXY','PIGAME_BTN1','PIGAME_BTN2','PIGAME_BTN3','PIGAME_BTN4']
+envmk = ['PIGAME_V2','PIGAME_INVERTX','PIGAME_INVERTY','PIGAME_SWAPXY','PIGAME_BTN1','PIGAME_BTN2','PIGAME_BTN3','PIGAME_BTN4','PIGAME_COALESCE','PIGAME_CAL','PIGAME_LATENCY','PIGAME_GESTURES','PIGAME_FILTER','PIGAME_CDEV']
 env = {}
 for i in envmk:
     env[i] = os.getenv(i)
@@ -9,22 +9,74 @@ try:
     import RPi.GPIO as GPIO
 except ImportError:
     support_gpio = False
+try:
+    import numpy as np
+except ImportError:
+    np = None
 from pygame.locals import *
+# custom event posted by the gesture recognizer; attributes: gesture, phase, pos, rel, velocity
+GESTURE = pygame.event.custom_type() if hasattr(pygame.event,'custom_type') else USEREVENT+1
+try:
+    FINGER_TYPES = {'down':FINGERDOWN,'move':FINGERMOTION,'up':FINGERUP}
+except NameError:
+    # pygame 1.9 has no touch events
+    FINGER_TYPES = {'down':USEREVENT+2,'move':USEREVENT+3,'up':USEREVENT+4}
 class PiTft:
-    def __init__(self,rotation:int=-1,v2:bool=False if env['PIGAME_V2']=='off' else True,allow_gpio:bool=True,invertx:bool=True if env['PIGAME_INVERTX']=='on' else False,inverty:bool=True if env['PIGAME_INVERTY']=='on' else False,swapxy:bool=True if env['PIGAME_SWAPXY']=='on' else False,buttons=[False if env['PIGAME_BTN1']=='off' else True,False if env['PIGAME_BTN2']=='off' else True,False if env['PIGAME_BTN3']=='off' else True,False if env['PIGAME_BTN4']=='off' else True]):
-        self.use_gpio = support_gpio and allow_gpio and not (os.getenv('PIGAME_GPIO') == 'off')
+    def __init__(self,rotation:int=-1,v2:bool=False if env['PIGAME_V2']=='off' else True,allow_gpio:bool=True,invertx:bool=True if env['PIGAME_INVERTX']=='on' else False,inverty:bool=True if env['PIGAME_INVERTY']=='on' else False,swapxy:bool=True if env['PIGAME_SWAPXY']=='on' else False,buttons=[False if env['PIGAME_BTN1']=='off' else True,False if env['PIGAME_BTN2']=='off' else True,False if env['PIGAME_BTN3']=='off' else True,False if env['PIGAME_BTN4']=='off' else True],coalesce:bool=True if env['PIGAME_COALESCE']=='on' else False,touchscreen=None,size=None,calibration:bool=False if env['PIGAME_CAL']=='off' else True,latency:bool=True if env['PIGAME_LATENCY']=='on' else False,gestures:bool=True if env['PIGAME_GESTURES']=='on' else False,jitter_filter=True if env['PIGAME_FILTER']=='on' else False,cdev=True if env['PIGAME_CDEV']=='on' else False):
+        # cdev: True (or a chip path, or a gpio_cdev.FakeChip) reads the buttons from the GPIO character device
+        self.use_gpio = (support_gpio or bool(cdev)) and allow_gpio and not (os.getenv('PIGAME_GPIO') == 'off')
         if not self.use_gpio:
             buttons=[False,False,False,False]
         if rotation == -1:
             rotation = int(defaultrot)
-        self.pitft=pitft_touchscreen.pitft_touchscreen()
+        self.pitft=touchscreen if touchscreen is not None else pitft_touchscreen.pitft_touchscreen()
         self.pitft.button_down=False
         self.pitft.pigameapi=2
         self.pitft.pigamerotr=rotation
         self.invertx = invertx
         self.inverty = inverty
         self.swapxy = swapxy
+        self.coalesce = coalesce
+        if size is None:
+            size=(320,240) if rotation in (90,270) else (240,320)
+        self.size = size
+        self.transform = self.compile_transform(rotation,size,invertx,inverty,swapxy)
+        self.shift = 0
+        self.calibrated = False
+        if calibration:
+            cal = touch_calibration.load()
+            # a fit only holds for the rotation and size it was taken at
+            if cal is not None and cal[1]==tuple(size) and cal[2]==rotation:
+                self.transform = touch_calibration.to_fixed(cal[0])
+                self.shift = touch_calibration.FIXED_SHIFT
+                self.calibrated = True
+        self.latency = None
+        if latency:
+            import touch_latency
+            self.latency = self.pitft.latency = touch_latency.TouchLatency()
+        self.cachedraw = [0,0]
         self.cachedpos = [0,0]
+        # last BTN_TOUCH seen; a frame with touch None has no change, None before the first counts as down
+        self.cachedtouch = None
+        self.fingerpos = [(0,0)]*pitft_touchscreen.MAX_SLOTS
+        # True for a default touch_filter.TouchFilter, or any object with apply(frames)
+        self.filter = None
+        if jitter_filter is True:
+            import touch_filter
+            self.filter = touch_filter.TouchFilter(slots=pitft_touchscreen.MAX_SLOTS)
+        elif jitter_filter:
+            self.filter = jitter_filter
+        self.gestures = None
+        if gestures:
+            import touch_gestures
+            self.gestures = touch_gestures.GestureRecognizer(self.__post_gesture)
+            self.__gesture_raw = [0,0]
+            self.__gesture_touch = None
+            # in the reader thread as each frame is decoded, so gestures do not wait for update();
+            # drain-only sources (touch_async, touch_broker readers) are fed from update() instead
+            self.__gesture_listener = hasattr(self.pitft,'add_listener')
+            if self.__gesture_listener:
+                self.pitft.add_listener(self.__feed_gesture)
         self.__b1 = False
         self.__b2 = False
         self.__b3 = False
@@ -33,103 +85,232 @@ class PiTft:
         self.__pin2 = 22
         self.__pin3 = 23
         self.__pin4 = 27
-        if self.use_gpio:
+        if buttons[3] and not v2:
+            self.__pin4 = 21
+        self.__b1,self.__b2,self.__b3,self.__b4 = [bool(b) for b in buttons]
+        pins = [p for p,b in zip((self.__pin1,self.__pin2,self.__pin3,self.__pin4),buttons) if b]
+        self.lines = None
+        # True once RPi.GPIO is set up, the only case __del__ has anything to clean up in it
+        self.__rpi = False
+        self.__callbacks = {}
+        if self.use_gpio and cdev and pins:
+            import gpio_cdev
+            self.lines = gpio_cdev.open_chip(None if cdev is True else cdev).request(pins,bias='up',edges='falling')
+            self.__watcher = gpio_cdev.EdgeWatcher(self.lines,self.__on_edge)
+            self.__watcher.start()
+        elif self.use_gpio and not cdev:
+            self.__rpi = True
             GPIO.setmode(GPIO.BCM)
-        if buttons[0]:
-            GPIO.setup(self.__pin1, GPIO.IN, pull_up_down=GPIO.PUD_UP)
-            self.__b1 = True
-        if buttons[1]:
-            GPIO.setup(self.__pin2, GPIO.IN, pull_up_down=GPIO.PUD_UP)
-            self.__b2 = True
-        if buttons[2]:
-            GPIO.setup(self.__pin3, GPIO.IN, pull_up_down=GPIO.PUD_UP)
-            self.__b3 = True
-        if buttons[3]:
-            if not v2:
-                self.__pin4 = 21
-            GPIO.setup(self.__pin4, GPIO.IN, pull_up_down=GPIO.PUD_UP)
-            self.__b4 = True
+            for pin in pins:
+                GPIO.setup(pin, GPIO.IN, pull_up_down=GPIO.PUD_UP)
         self.pitft.start()
     def update(self):
         """Add Touchscreen Events to PyGame event queue."""
-        while not self.pitft.queue_empty():
-            for r in self.pitft.get_event():
-                e={"y":(r["x"] if r["x"] else self.cachedpos[0]),"x":(r["y"] if r["y"] else self.cachedpos[1])}
-                rel=(e["x"] - self.cachedpos[0],e["y"] - self.cachedpos[1])
-                self.cachedpos=(e["x"],e["y"])
-                if self.pitft.pigamerotr==90:
-                    e={"x":e["x"],"y":240-e["y"]}
-                    rel=(rel[0],240-rel[1])
-                elif self.pitft.pigamerotr==270:
-                    e={"x":320-e["x"],"y":e["y"]}
-                    rel=(320-rel[0],rel[1])
-                else:
-                    raise(Exception("PiTft rotation is unsupported"))
-                d={}
-                t=MOUSEBUTTONUP if r["touch"]==0 else (MOUSEMOTION if self.pitft.button_down else MOUSEBUTTONDOWN)
-                if self.invertx:
-                    e={"x":320-e["x"],"y":e["y"]}
-                    rel=(320-rel[0],rel[1])
-                if self.inverty:
-                    rel=(rel[0],240-rel[1])
-                    e={"y":240-e["y"],"x":e["x"]}
-                if self.swapxy:
-                    rel=(rel[1],rel[0])
-                    e={"x":e["y"],"y":e["x"]}
-                if t==MOUSEBUTTONDOWN:
-                    d["button"]=1
-                    d["pos"]=(e["x"],e["y"])
-                    self.pitft.button_down = True
-                    pygame.mouse.set_pos(e["x"],e["y"])
-                elif t==MOUSEBUTTONUP:
-                    self.pitft.button_down = False
-                    d["button"]=1
-                    d["pos"]=(e["x"],e["y"])
-                else:
-                    d["buttons"]=(True,False,False)
-                    d["rel"]=rel
-                    d["pos"]=(e["x"],e["y"])
-                    pygame.mouse.set_pos(e["x"],e["y"])
-                pe=pygame.event.Event(t,d)
-                pygame.event.post(pe)
+        raws=self.pitft.drain()
+        if self.gestures is not None and not self.__gesture_listener:
+            for r in raws:
+                self.__feed_gesture(r)
+        if self.filter is not None:
+            raws=self.filter.apply(raws)
+        out=self.translate(raws)
+        if self.latency is not None and raws:
+            now=time.time()
+            self.latency.record_posts(raws,now)
+            for t,d in out:
+                d["posted"]=now
+        for t,d in out:
+            if t==MOUSEBUTTONDOWN or t==MOUSEMOTION:
+                pygame.mouse.set_pos(d["pos"])
+            pygame.event.post(pygame.event.Event(t,d))
+    def handled(self,event):
+        """Mark a posted touch event as handled; records post->handler latency when instrumentation is on."""
+        if self.latency is not None and hasattr(event,"posted"):
+            self.latency.record_handled(event,time.time())
+    def translate(self,raws):
+        """Turn a batch of raw touchscreen events into (type,dict) pairs; with coalesce on, motion is merged per
+        stream (the mouse, and each finger id) until that stream's next press or release."""
+        out=[]
+        # stream -> index in out of the motion event later motion is merged into
+        moving={}
+        for r in raws:
+            t,d=self.__translate_one(r)
+            if t is not None:
+                self.__emit(out,moving,"mouse",t,d)
+            contacts=r.get("contacts")
+            if contacts:
+                for t,d in self.__translate_contacts(contacts,r["time"]):
+                    self.__emit(out,moving,d["finger_id"],t,d)
+        return out
+    def __emit(self,out,moving,stream,t,d):
+        if t!=MOUSEMOTION and t!=FINGER_TYPES["move"]:
+            # a press or release ends the stream's motion run
+            moving.pop(stream,None)
+            out.append((t,d))
+            return
+        i=moving.get(stream)
+        if not self.coalesce or i is None:
+            moving[stream]=len(out)
+            out.append((t,d))
+            return
+        last=out[i][1]
+        if t==MOUSEMOTION:
+            last["rel"]=(last["rel"][0]+d["rel"][0],last["rel"][1]+d["rel"][1])
+        else:
+            last["x"],last["y"]=d["x"],d["y"]
+            last["dx"]+=d["dx"]
+            last["dy"]+=d["dy"]
+        last["pos"]=d["pos"]
+        last["time"]=d["time"]
+    def __translate_contacts(self,contacts,t):
+        # per-finger FINGERDOWN/FINGERMOTION/FINGERUP; x,y,dx,dy normalized like pygame's own touch events
+        a,b,c,d,e,f=self.transform
+        s=self.shift
+        w,h=self.size
+        out=[]
+        for phase,slot,fid,rx,ry in contacts:
+            pos=((a*rx+b*ry+c)>>s,(d*rx+e*ry+f)>>s)
+            if phase=="move":
+                last=self.fingerpos[slot]
+                rel=(pos[0]-last[0],pos[1]-last[1])
+            else:
+                rel=(0,0)
+            self.fingerpos[slot]=pos
+            out.append((FINGER_TYPES[phase],{"touch_id":0,"finger_id":fid,"slot":slot,"pos":pos,
+                        "x":pos[0]/w,"y":pos[1]/h,"dx":rel[0]/w,"dy":rel[1]/h,"pressure":1.0,"time":t}))
+        return out
+    def contacts(self):
+        """Active contacts as an (N,4) NumPy array of (slot, id, x, y) rows in screen coordinates, a list of tuples without NumPy."""
+        rows=self.pitft.contacts()
+        if np is None:
+            a,b,c,d,e,f=self.transform
+            s=self.shift
+            return [(slot,i,(a*rx+b*ry+c)>>s,(d*rx+e*ry+f)>>s) for slot,i,rx,ry in rows]
+        if len(rows):
+            rows[:,2:4]=self.transform_batch(rows[:,2:4])
+        return rows
+    @staticmethod
+    def compile_transform(rotation,size=None,invertx=False,inverty=False,swapxy=False):
+        """Fold rotation, invert and swap into one (a,b,c,d,e,f) map: x=a*rx+b*ry+c, y=d*rx+e*ry+f."""
+        if size is None:
+            # the panel is natively portrait, 240x320
+            size=(320,240) if rotation in (90,270) else (240,320)
+        w,h=size
+        if rotation==90:
+            m=[0,1,0,-1,0,h]
+        elif rotation==270:
+            m=[0,-1,w,1,0,0]
+        elif rotation==0:
+            m=[1,0,0,0,1,0]
+        elif rotation==180:
+            m=[-1,0,w,0,-1,h]
+        else:
+            raise(Exception("PiTft rotation is unsupported"))
+        if invertx:
+            m[0:3]=[-m[0],-m[1],w-m[2]]
+        if inverty:
+            m[3:6]=[-m[3],-m[4],h-m[5]]
+        if swapxy:
+            m=m[3:6]+m[0:3]
+        return tuple(m)
+    def transform_batch(self,raw):
+        """Map an (N,2) array of raw touchscreen samples to screen coordinates in one NumPy pass."""
+        a,b,c,d,e,f=self.transform
+        return (np.asarray(raw,dtype=np.int64)@np.array([[a,d],[b,e]],dtype=np.int64)+np.array([c,f],dtype=np.int64))>>self.shift
+    def __feed_gesture(self,r):
+        # a reader listener, or called from update() for sources without add_listener
+        raw=self.__gesture_raw
+        if r["x"] is not None:
+            raw[0]=r["x"]
+        if r["y"] is not None:
+            raw[1]=r["y"]
+        a,b,c,d,e,f=self.transform
+        s=self.shift
+        if r["touch"] is not None:
+            self.__gesture_touch=r["touch"]
+        self.gestures.feed((a*raw[0]+b*raw[1]+c)>>s,(d*raw[0]+e*raw[1]+f)>>s,self.__gesture_touch!=0,r["time"])
+    def __post_gesture(self,kind,phase,x,y,dx,dy,vx,vy):
+        pygame.event.post(pygame.event.Event(GESTURE,{"gesture":kind,"phase":phase,"pos":(x,y),"rel":(dx,dy),"velocity":(vx,vy)}))
+    def __translate_one(self,r):
+        rx=r["x"] if r["x"] is not None else self.cachedraw[0]
+        ry=r["y"] if r["y"] is not None else self.cachedraw[1]
+        raw=self.cachedraw=(rx,ry)
+        a,b,c,d,e,f=self.transform
+        s=self.shift
+        pos=((a*rx+b*ry+c)>>s,(d*rx+e*ry+f)>>s)
+        rel=(pos[0]-self.cachedpos[0],pos[1]-self.cachedpos[1])
+        self.cachedpos=pos
+        if r["touch"] is not None:
+            self.cachedtouch=r["touch"]
+        if self.cachedtouch==0:
+            if not self.pitft.button_down:
+                # the finger is already up: nothing to post
+                return None,None
+            self.pitft.button_down = False
+            return MOUSEBUTTONUP,{"button":1,"pos":pos,"raw":raw,"time":r["time"]}
+        if not self.pitft.button_down:
+            self.pitft.button_down = True
+            return MOUSEBUTTONDOWN,{"button":1,"pos":pos,"raw":raw,"time":r["time"]}
+        return MOUSEMOTION,{"buttons":(True,False,False),"rel":rel,"pos":pos,"time":r["time"]}
     def __del__(self):
         """Cleaning up Touchscreen events and Threads when the Object destroyed."""
         self.pitft.stop()
-        if self.use_gpio:
+        if self.lines is not None:
+            self.__watcher.stop()
+            self.lines.close()
+        elif self.__rpi:
             GPIO.cleanup()
+    def __input(self,pin):
+        if self.lines is not None:
+            return self.lines.values()[pin]
+        return GPIO.input(pin)
+    def __interrupt(self,pin,callback,bouncetime):
+        if self.lines is not None:
+            self.__callbacks[pin] = [callback,bouncetime/1000.0,None]
+        else:
+            GPIO.add_event_detect(pin,GPIO.FALLING,callback=callback,bouncetime=bouncetime)
+    def __on_edge(self,event):
+        """Runs a button callback for a character-device edge; bouncetime is measured between kernel timestamps."""
+        entry = self.__callbacks.get(event.offset)
+        if entry is None or event.level:
+            return
+        if entry[2] is not None and event.time-entry[2] < entry[1]:
+            return
+        entry[2] = event.time
+        if entry[0] is not None:
+            entry[0](event.offset)
     def Button1Interrupt(self,callback=None,bouncetime=200):
         """Calls callback if Button1 pressed."""
-        if self.__b1: 
-            GPIO.add_event_detect(self.__pin1,GPIO.FALLING,callback=callback,bouncetime=bouncetime)
+        if self.__b1:
+            self.__interrupt(self.__pin1,callback,bouncetime)
     def Button2Interrupt(self,callback=None,bouncetime=200):
         """Calls callback if Button2 pressed."""
-        if self.__b2: 
-            GPIO.add_event_detect(self.__pin2,GPIO.FALLING,callback=callback,bouncetime=bouncetime)
+        if self.__b2:
+            self.__interrupt(self.__pin2,callback,bouncetime)
     def Button3Interrupt(self,callback=None,bouncetime=200):
         """Calls callback if Button3 pressed."""
-        if self.__b3: 
-            GPIO.add_event_detect(self.__pin3,GPIO.FALLING,callback=callback,bouncetime=bouncetime)
+        if self.__b3:
+            self.__interrupt(self.__pin3,callback,bouncetime)
     def Button4Interrupt(self,callback=None,bouncetime=200):
         """Calls callback if Button4 pressed."""
-        if self.__b4: 
-            GPIO.add_event_detect(self.__pin4,GPIO.FALLING,callback=callback,bouncetime=bouncetime)
+        if self.__b4:
+            self.__interrupt(self.__pin4,callback,bouncetime)
     @property
     def Button1(self):
         """Equals True if Button 1 is pressed."""
         if self.__b1:
-            return not GPIO.input(self.__pin1)
+            return not self.__input(self.__pin1)
     @property
     def Button2(self):
         """Equals True if Button 2 is pressed."""
         if self.__b2:
-            return not GPIO.input(self.__pin2)
+            return not self.__input(self.__pin2)
     @property
     def Button3(self):
         """Equals True if Button 3 is pressed."""
         if self.__b3:
-            return not GPIO.input(self.__pin3)
+            return not self.__input(self.__pin3)
     @property
     def Button4(self):
         """Equals True if Button 4 is pressed."""
         if self.__b4:
-            return not GPIO.input(self.__pin4)
+            return not self.__input(self.__pin4)
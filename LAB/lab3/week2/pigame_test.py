@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+"""
+pigame_test.py - Checks pigame.PiTft against touch traces written into a
+FakeTouchDevice and read back through pitft_touchscreen: with coalesce on,
+a drained multi-touch drag leaves one motion event per stream (the mouse
+and each finger) holding the whole movement, contacts() gives whole
+frames while the reader thread is writing, with or without NumPy,
+gestures=True works on the default reader (from its thread, without
+update()) and on a touch_broker ring, a frame with touch None keeps the last
+touch state for both gestures and mouse events, and a PiTft on the GPIO
+character device cleans up without RPi.GPIO.
+"""
+import gc
+import os
+import sys
+import threading
+import time
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+import pygame
+
+import gpio_cdev
+import pigame
+import pitft_touchscreen
+import touch_broker
+from pitft_touchscreen import (FakeTouchDevice, EV_ABS, EV_KEY, EV_SYN, ABS_X, ABS_Y, BTN_TOUCH, SYN_REPORT,
+                               ABS_MT_SLOT, ABS_MT_TRACKING_ID, ABS_MT_POSITION_X, ABS_MT_POSITION_Y)
+
+STEPS = 5
+
+
+def mt_drag(steps=STEPS):
+    """Two fingers down, both moving right for steps frames, then lifted; ABS_X/ABS_Y follow slot 0."""
+    frames = [[(EV_ABS, ABS_MT_SLOT, 0), (EV_ABS, ABS_MT_TRACKING_ID, 10),
+               (EV_ABS, ABS_MT_POSITION_X, 100), (EV_ABS, ABS_MT_POSITION_Y, 100),
+               (EV_ABS, ABS_MT_SLOT, 1), (EV_ABS, ABS_MT_TRACKING_ID, 11),
+               (EV_ABS, ABS_MT_POSITION_X, 150), (EV_ABS, ABS_MT_POSITION_Y, 100),
+               (EV_ABS, ABS_X, 100), (EV_ABS, ABS_Y, 100), (EV_KEY, BTN_TOUCH, 1), (EV_SYN, SYN_REPORT, 0)]]
+    for i in range(1, steps + 1):
+        frames.append([(EV_ABS, ABS_MT_SLOT, 0), (EV_ABS, ABS_MT_POSITION_Y, 100 + 4 * i),
+                       (EV_ABS, ABS_MT_SLOT, 1), (EV_ABS, ABS_MT_POSITION_Y, 100 + 4 * i),
+                       (EV_ABS, ABS_Y, 100 + 4 * i), (EV_SYN, SYN_REPORT, 0)])
+    return frames
+
+
+def read_back(frames, **options):
+    """PiTft on a fake device with every frame written and queued, before anything is drained."""
+    device = FakeTouchDevice()
+    reader = pitft_touchscreen.pitft_touchscreen(device)
+    pitft = pigame.PiTft(touchscreen=reader, allow_gpio=False, calibration=False, **options)
+    for k, events in enumerate(frames):
+        device.write_events(events, 1000.0 + k * 0.01)
+    deadline = time.monotonic() + 2.0
+    while reader.events.qsize() < len(frames) and time.monotonic() < deadline:
+        time.sleep(0.005)
+    return pitft, device
+
+
+def check_coalesce_mt():
+    pitft, device = read_back(mt_drag(), coalesce=True)
+    out = pitft.translate(pitft.pitft.drain())
+    device.close()
+    names = [pygame.event.event_name(t) for t, d in out]
+    mouse = [d for t, d in out if t == pygame.MOUSEMOTION]
+    fingers = {}
+    for t, d in out:
+        if t == pigame.FINGER_TYPES['move']:
+            fingers.setdefault(d['finger_id'], []).append(d)
+    # rotated 90: screen x is raw y, screen y is 240 - raw x; the merged events carry the whole drag
+    end = {10: (100 + 4 * STEPS, 140), 11: (100 + 4 * STEPS, 90)}
+    ok = (len(mouse) == 1 and mouse[0]['rel'] == (4 * STEPS, 0) and sorted(fingers) == [10, 11]
+          and all(len(m) == 1 and m[0]['pos'] == end[f] for f, m in fingers.items()))
+    return ok, ', '.join(names)
+
+
+def check_uncoalesced_mt():
+    pitft, device = read_back(mt_drag(), coalesce=False)
+    out = pitft.translate(pitft.pitft.drain())
+    device.close()
+    mouse = sum(t == pygame.MOUSEMOTION for t, d in out)
+    fingers = sum(t == pigame.FINGER_TYPES['move'] for t, d in out)
+    return mouse == STEPS and fingers == 2 * STEPS, f"{mouse} mouse and {fingers} finger motions without coalesce"
+
+
+def check_contacts_fallback():
+    frames = mt_drag()
+    pitft, device = read_back(frames)
+    rows = [tuple(row) for row in pitft.contacts().tolist()]
+    saved = pigame.np, pitft_touchscreen.np
+    pigame.np = pitft_touchscreen.np = None
+    try:
+        listed = pitft.contacts()
+    finally:
+        pigame.np, pitft_touchscreen.np = saved
+    device.close()
+    ok = rows == listed == [(0, 10, 120, 140), (1, 11, 120, 90)]
+    return ok, f"numpy {rows}, lists {listed}"
+
+
+def check_contacts_whole():
+    # every frame moves both fingers to x = y = k, so a row mixing two frames shows up as x != y
+    device = FakeTouchDevice()
+    reader = pitft_touchscreen.pitft_touchscreen(device)
+    pitft = pigame.PiTft(touchscreen=reader, allow_gpio=False, calibration=False, rotation=0)
+    device.write_events([(EV_ABS, ABS_MT_SLOT, 0), (EV_ABS, ABS_MT_TRACKING_ID, 1),
+                         (EV_ABS, ABS_MT_SLOT, 1), (EV_ABS, ABS_MT_TRACKING_ID, 2), (EV_SYN, SYN_REPORT, 0)], 1000.0)
+    stop = threading.Event()
+
+    def writer():
+        k = 0
+        while not stop.is_set():
+            k = k % 200 + 1
+            device.write_events([(EV_ABS, ABS_MT_SLOT, 0), (EV_ABS, ABS_MT_POSITION_X, k),
+                                 (EV_ABS, ABS_MT_POSITION_Y, k), (EV_ABS, ABS_MT_SLOT, 1),
+                                 (EV_ABS, ABS_MT_POSITION_X, k), (EV_ABS, ABS_MT_POSITION_Y, k),
+                                 (EV_SYN, SYN_REPORT, 0)], 1000.0)
+            reader.drain()
+
+    thread = threading.Thread(target=writer)
+    thread.start()
+    reads = torn = 0
+    deadline = time.monotonic() + 0.5
+    while time.monotonic() < deadline:
+        rows = pitft.contacts().tolist()
+        reads += 1
+        torn += len(rows) != 2 or any(x != y for slot, i, x, y in rows) or rows[0][2] != rows[1][2]
+    stop.set()
+    thread.join()
+    device.close()
+    return torn == 0, f"{torn} torn of {reads} reads"
+
+
+def tap_frames(t, hold=0.05, resting=1):
+    """A finger at raw (100, 100) for hold seconds, as pitft_touchscreen frame dicts; resting is the touch of the frames between."""
+    frames = [{'time': t, 'id': None, 'x': 100, 'y': 100, 'touch': 1, 'contacts': None}]
+    n = int(round(hold / 0.01))
+    for i in range(1, n + 1):
+        frames.append({'time': t + i * 0.01, 'id': None, 'x': 100, 'y': 100, 'touch': resting, 'contacts': None})
+    frames.append({'time': t + (n + 1) * 0.01, 'id': None, 'x': None, 'y': None, 'touch': 0, 'contacts': None})
+    return frames
+
+
+def posted(pitft, count, update=True):
+    """Run update() (or just wait, for gestures fed by the reader thread) until count GESTURE events are posted,
+    or a second passes; (gestures, mouse event names)."""
+    found = []
+    mouse = []
+    deadline = time.monotonic() + 1.0
+    while len(found) < count and time.monotonic() < deadline:
+        if update:
+            pitft.update()
+        for e in pygame.event.get():
+            if e.type == pigame.GESTURE:
+                found.append(e.gesture)
+            elif e.type in (pygame.MOUSEBUTTONDOWN, pygame.MOUSEBUTTONUP):
+                mouse.append(pygame.event.event_name(e.type))
+        time.sleep(0.005)
+    return found, mouse
+
+
+def write_frames(device, frames):
+    for f in frames:
+        events = [(EV_ABS, ABS_X, f['x']), (EV_ABS, ABS_Y, f['y'])] if f['x'] is not None else []
+        events += [(EV_KEY, BTN_TOUCH, f['touch'])] if f['touch'] is not None else []
+        device.write_events(events + [(EV_SYN, SYN_REPORT, 0)], f['time'])
+
+
+def check_gestures_sources():
+    pygame.display.init()
+    pygame.display.set_mode((320, 240))
+    frames = tap_frames(1000.0) + tap_frames(1000.2)
+    details = []
+
+    device = FakeTouchDevice()
+    pitft = pigame.PiTft(touchscreen=pitft_touchscreen.pitft_touchscreen(device), allow_gpio=False,
+                         calibration=False, gestures=True)
+    pygame.event.clear()
+    write_frames(device, frames)
+    # the reader thread recognizes and posts them; update() is never called
+    found, _ = posted(pitft, 2, update=False)
+    device.close()
+    details.append(f"reader thread {found}")
+    ok = found == ['tap', 'double_tap']
+
+    ring = touch_broker.TouchRing(name='pigame_test_ring', records=64)
+    try:
+        pitft = pigame.PiTft(touchscreen=touch_broker.TouchRingReader('pigame_test_ring'), allow_gpio=False,
+                             calibration=False, gestures=True)
+        pygame.event.clear()
+        for f in frames:
+            ring.write(f)
+        found, _ = posted(pitft, 2)
+        pitft.pitft.stop()
+    finally:
+        ring.close()
+    details.append(f"ring {found}")
+    ok = ok and found == ['tap', 'double_tap']
+    return ok, ', '.join(details)
+
+
+def check_touch_carried():
+    # held past the long-press time with touch None on every resting frame, as a ring record without a BTN_TOUCH change
+    pygame.display.init()
+    pygame.display.set_mode((320, 240))
+    ring = touch_broker.TouchRing(name='pigame_test_ring', records=256)
+    try:
+        pitft = pigame.PiTft(touchscreen=touch_broker.TouchRingReader('pigame_test_ring'), allow_gpio=False,
+                             calibration=False, gestures=True)
+        pygame.event.clear()
+        frames = tap_frames(1000.0, hold=0.8, resting=None)
+        # and a frame after the release that changes nothing
+        frames.append({'time': 1000.9, 'id': None, 'x': None, 'y': None, 'touch': None, 'contacts': None})
+        for f in frames:
+            ring.write(f)
+        found, mouse = posted(pitft, 1)
+        # let the trailing frame through too
+        found2, mouse2 = posted(pitft, 1)
+        pitft.pitft.stop()
+    finally:
+        ring.close()
+    found += found2
+    mouse += mouse2
+    ok = found == ['long_press'] and mouse == ['MouseButtonDown', 'MouseButtonUp']
+    return ok, f"gestures {found}, mouse {mouse}"
+
+
+def check_cdev_cleanup():
+    errors = []
+    saved = sys.unraisablehook
+    sys.unraisablehook = lambda unraisable: errors.append(repr(unraisable.exc_value))
+    try:
+        for buttons in ([True] * 4, [False] * 4):
+            device = FakeTouchDevice()
+            pitft = pigame.PiTft(touchscreen=pitft_touchscreen.pitft_touchscreen(device), calibration=False,
+                                 cdev=gpio_cdev.FakeChip(), buttons=buttons)
+            del pitft
+            gc.collect()
+            device.close()
+    finally:
+        sys.unraisablehook = saved
+    return not errors, f"errors from __del__: {errors or 'none'}"
+
+
+def main():
+    failed = 0
+    for name, check in (('coalesce multi-touch', check_coalesce_mt), ('no coalesce', check_uncoalesced_mt),
+                        ('contacts without numpy', check_contacts_fallback),
+                        ('contacts while reading', check_contacts_whole),
+                        ('gestures on any source', check_gestures_sources),
+                        ('touch carried', check_touch_carried),
+                        ('cdev cleanup', check_cdev_cleanup)):
+        ok, detail = check()
+        print(f"{'PASS' if ok else 'FAIL'} {name}: {detail}")
+        failed += not ok
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
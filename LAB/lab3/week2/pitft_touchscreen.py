@@ -1,14 +1,22 @@
 # -*- coding: utf-8 -*-
 #  piTFT touchscreen handling using evdev
+#
+#  The device nodes are read directly as packed input_event structs, so one
+#  thread can serve several devices (or fake ones built on a pipe) through a
+#  single epoll loop.
 
 import os
-
+import errno
+import fcntl
+import select
+import struct
+import termios
+import threading
+import time
 try:
-    import evdev
+    import numpy as np
 except ImportError:
-    print("Evdev package is not installed.  Run 'pip3 install evdev' or 'pip install evdev' (Python 2.7) to install.")
-    raise(ImportError("Evdev package not found."))
-import threading
+    np = None
 try:
     # python 3.5+
     import queue
@@ -16,85 +24,487 @@ except ImportError:
     # python 2.7
     import Queue as queue
 
+# Event types and codes from linux/input-event-codes.h
+EV_SYN = 0x00
+EV_KEY = 0x01
+EV_ABS = 0x03
+SYN_REPORT = 0
+SYN_DROPPED = 3
+BTN_TOUCH = 0x14a
+ABS_X = 0x00
+ABS_Y = 0x01
+ABS_MT_SLOT = 0x2f
+ABS_MT_POSITION_X = 0x35
+ABS_MT_POSITION_Y = 0x36
+ABS_MT_TRACKING_ID = 0x39
+
+# struct input_event { struct timeval time; __u16 type; __u16 code; __s32 value; }
+INPUT_EVENT = struct.Struct('llHHi')
+# struct input_absinfo { __s32 value, minimum, maximum, fuzz, flat, resolution; }
+INPUT_ABSINFO = struct.Struct('6i')
+# _IOW('E', 0x90, int)
+EVIOCGRAB = 0x40044590
+# bitmap sizes for KEY_MAX (0x2ff) and ABS_MAX (0x3f)
+KEY_BYTES = 96
+ABS_BYTES = 8
+
+
+# _IOR('E', nr, size) for the evdev state queries
+def eviocg(nr, size):
+    return (2 << 30) | (size << 16) | (ord('E') << 8) | nr
+
+
+EVIOCGKEY = eviocg(0x18, KEY_BYTES)
+EVIOCGBIT_ABS = eviocg(0x20 + EV_ABS, ABS_BYTES)
+
+# number of input_event structs pulled per read()
+READ_EVENTS = 64
+# multi-touch slots tracked per device
+MAX_SLOTS = 10
+
+
+# Decodes raw input_event fields into the frame dicts queued by pitft_touchscreen.
+#
+# Single-touch state (x, y, touch) follows ABS_X/ABS_Y/BTN_TOUCH. Multi-touch
+# devices are tracked with the MT protocol B slots in fixed preallocated
+# lists; a frame where any slot changed carries 'contacts', a list of
+# (phase, slot, id, x, y) with phase 'down', 'move' or 'up'.
+#
+# After SYN_DROPPED everything up to the next SYN_REPORT is discarded and
+# need_resync is set; the owner then queries the device and passes the
+# result to resync(), which emits whatever the lost events would have.
+class TouchDecoder(object):
+    def __init__(self, slots=MAX_SLOTS):
+        self.event = {'time': None, 'id': None, 'x': None, 'y': None, 'touch': None, 'contacts': None}
+        # x, y, touch as of the last SYN_REPORT
+        self.committed = (None, None, None)
+        self.dropping = False
+        self.need_resync = False
+        # SYN_DROPPED events seen
+        self.drops = 0
+        self.slots = slots
+        self.slot = 0
+        # values being built for the current frame
+        self.ids = [-1] * slots
+        self.xs = [0] * slots
+        self.ys = [0] * slots
+        # values as of the last SYN_REPORT
+        self.cids = [-1] * slots
+        self.cxs = [0] * slots
+        self.cys = [0] * slots
+        self.changed = 0
+        # (slot, id, x, y) of every active contact as of the last SYN_REPORT;
+        # replaced whole, never changed, so other threads can read it as is
+        self.active = ()
+
+    # returns the finished frame on SYN_REPORT, otherwise None
+    def feed(self, sec, usec, type, code, value):
+        event = self.event
+        if type == EV_ABS:
+            if code == ABS_X:
+                event['x'] = value
+            elif code == ABS_Y:
+                event['y'] = value
+            elif code == ABS_MT_SLOT:
+                self.slot = value if value < self.slots else -1
+            elif code == ABS_MT_TRACKING_ID:
+                event['id'] = value
+                slot = self.slot
+                if slot >= 0:
+                    self.ids[slot] = value
+                    self.changed |= 1 << slot
+                if value == -1 and max(self.ids) == -1:
+                    # last finger lifted
+                    event['x'] = None
+                    event['y'] = None
+                    event['touch'] = None
+            elif code == ABS_MT_POSITION_X:
+                if self.slot >= 0:
+                    self.xs[self.slot] = value
+                    self.changed |= 1 << self.slot
+            elif code == ABS_MT_POSITION_Y:
+                if self.slot >= 0:
+                    self.ys[self.slot] = value
+                    self.changed |= 1 << self.slot
+        elif type == EV_KEY:
+            event['touch'] = value
+        elif type == EV_SYN:
+            if code == SYN_DROPPED:
+                if not self.dropping:
+                    self.drops += 1
+                self.dropping = True
+            elif code == SYN_REPORT:
+                if self.dropping:
+                    # forget the partial frame, resync() fills in the rest
+                    event['x'], event['y'], event['touch'] = self.committed
+                    self.ids[:] = self.cids
+                    self.xs[:] = self.cxs
+                    self.ys[:] = self.cys
+                    self.changed = 0
+                    self.dropping = False
+                    self.need_resync = True
+                else:
+                    event['time'] = sec + usec / 1000000.0
+                    if self.changed:
+                        event['contacts'] = self.commit()
+                    self.committed = (event['x'], event['y'], event['touch'])
+                    self.event = {'time': None, 'id': event['id'], 'x': event['x'],
+                                  'y': event['y'], 'touch': event['touch'], 'contacts': None}
+                    return event
+        return None
+
+    # bring the decoder in line with a state from query_state(); returns a
+    # corrective frame, or None when nothing changed while events were lost
+    def resync(self, state, sec, usec):
+        self.need_resync = False
+        events = []
+        # slots first: lifting the last finger resets x, y and touch
+        if state['slots'] is not None:
+            for slot, (i, sx, sy) in enumerate(state['slots'][:self.slots]):
+                if i != self.cids[slot] or (i >= 0 and (sx != self.cxs[slot] or sy != self.cys[slot])):
+                    events.append((EV_ABS, ABS_MT_SLOT, slot))
+                    events.append((EV_ABS, ABS_MT_TRACKING_ID, i))
+                    events.append((EV_ABS, ABS_MT_POSITION_X, sx))
+                    events.append((EV_ABS, ABS_MT_POSITION_Y, sy))
+        x, y, touch = self.committed
+        if state['x'] is not None and (state['x'] != x or events):
+            events.append((EV_ABS, ABS_X, state['x']))
+        if state['y'] is not None and (state['y'] != y or events):
+            events.append((EV_ABS, ABS_Y, state['y']))
+        if state['touch'] is not None and (state['touch'] != (touch or 0) or events):
+            events.append((EV_KEY, BTN_TOUCH, state['touch']))
+        frame = None
+        if events:
+            for type, code, value in events:
+                self.feed(sec, usec, type, code, value)
+            frame = self.feed(sec, usec, EV_SYN, SYN_REPORT, 0)
+        if state['slot'] is not None:
+            self.feed(sec, usec, EV_ABS, ABS_MT_SLOT, state['slot'])
+        return frame
+
+    # fold the changed slots into the committed state, returning their transitions
+    def commit(self):
+        contacts = []
+        changed = self.changed
+        slot = 0
+        while changed:
+            if changed & 1:
+                old = self.cids[slot]
+                new = self.ids[slot]
+                x = self.xs[slot]
+                y = self.ys[slot]
+                if old >= 0 and new != old:
+                    contacts.append(('up', slot, old, self.cxs[slot], self.cys[slot]))
+                    old = -1
+                if new >= 0:
+                    if old < 0:
+                        contacts.append(('down', slot, new, x, y))
+                    elif x != self.cxs[slot] or y != self.cys[slot]:
+                        contacts.append(('move', slot, new, x, y))
+                self.cids[slot] = new
+                self.cxs[slot] = x
+                self.cys[slot] = y
+            changed >>= 1
+            slot += 1
+        self.changed = 0
+        self.active = tuple((slot, i, self.cxs[slot], self.cys[slot]) for slot, i in enumerate(self.cids) if i >= 0)
+        return contacts
+
+    # active contacts as of the last frame, as (slot, id, x, y) rows; safe to
+    # call from any thread, it only reads the snapshot commit() published
+    def contacts(self):
+        return self.active
+
+
+# Pipe carrying packed input_event structs; stands in for an evdev node.
+#
+# It keeps the device state the written events describe, for resync after
+# a drop. With buffer_events set it also behaves like the kernel's evdev
+# client buffer of that many events: on overflow every unread event is
+# thrown away and replaced by SYN_DROPPED.
+class FakeTouchDevice(object):
+    def __init__(self, buffer_events=None, slots=MAX_SLOTS, fds=None):
+        # fds: an already open (read, write) pair instead of a new pipe
+        self.rfd, self.wfd = fds if fds is not None else os.pipe()
+        self.buffer_events = buffer_events
+        self.state = {'x': None, 'y': None, 'touch': 0, 'slot': 0, 'slots': [(-1, 0, 0)] * slots}
+
+    def fileno(self):
+        return self.rfd
+
+    def pack(self, type, code, value, t):
+        sec = int(t)
+        return INPUT_EVENT.pack(sec, int((t - sec) * 1000000), type, code, value)
+
+    def write_events(self, events, t):
+        # events is a list of (type, code, value), written with a single write()
+        for event in events:
+            self.apply(*event)
+        if self.buffer_events is None:
+            os.write(self.wfd, b''.join(self.pack(ty, co, va, t) for ty, co, va in events))
+            return
+        for type, code, value in events:
+            unread = struct.unpack('i', fcntl.ioctl(self.wfd, termios.FIONREAD, b'\0' * 4))[0]
+            if unread // INPUT_EVENT.size + 1 > self.buffer_events:
+                try:
+                    os.read(self.rfd, unread)
+                except OSError:
+                    # the reader got there first
+                    pass
+                os.write(self.wfd, self.pack(EV_SYN, SYN_DROPPED, 0, t))
+            os.write(self.wfd, self.pack(type, code, value, t))
+
+    def apply(self, type, code, value):
+        state = self.state
+        if type == EV_KEY and code == BTN_TOUCH:
+            state['touch'] = value
+        elif type == EV_ABS:
+            if code == ABS_X:
+                state['x'] = value
+            elif code == ABS_Y:
+                state['y'] = value
+            elif code == ABS_MT_SLOT:
+                state['slot'] = value
+            elif code in (ABS_MT_TRACKING_ID, ABS_MT_POSITION_X, ABS_MT_POSITION_Y):
+                slot = state['slot']
+                if 0 <= slot < len(state['slots']):
+                    row = list(state['slots'][slot])
+                    row[(ABS_MT_TRACKING_ID, ABS_MT_POSITION_X, ABS_MT_POSITION_Y).index(code)] = value
+                    state['slots'][slot] = tuple(row)
+
+    # same shape as query_state() on a real device
+    def query_state(self):
+        state = dict(self.state)
+        state['slots'] = list(state['slots'])
+        return state
+
+    def write_frame(self, x, y, touch, t):
+        self.write_events([(EV_ABS, ABS_X, x), (EV_ABS, ABS_Y, y),
+                           (EV_KEY, BTN_TOUCH, touch), (EV_SYN, SYN_REPORT, 0)], t)
+
+    def close(self):
+        # the reader sees end-of-file and drops the device
+        if self.wfd is not None:
+            os.close(self.wfd)
+            self.wfd = None
+
+
+# Current device state through the evdev ioctls, in the shape
+# TouchDecoder.resync() takes; axes the device lacks are None
+def query_state(fd, slots=MAX_SLOTS):
+    state = {'x': None, 'y': None, 'touch': None, 'slot': None, 'slots': None}
+    axes = int.from_bytes(fcntl.ioctl(fd, EVIOCGBIT_ABS, bytes(ABS_BYTES)), 'little')
+
+    def value(code):
+        if not axes >> code & 1:
+            return None
+        info = fcntl.ioctl(fd, eviocg(0x40 + code, INPUT_ABSINFO.size), bytes(INPUT_ABSINFO.size))
+        return INPUT_ABSINFO.unpack(info)[0]
+
+    state['x'] = value(ABS_X)
+    state['y'] = value(ABS_Y)
+    keys = fcntl.ioctl(fd, EVIOCGKEY, bytes(KEY_BYTES))
+    state['touch'] = keys[BTN_TOUCH // 8] >> (BTN_TOUCH % 8) & 1
+    state['slot'] = value(ABS_MT_SLOT)
+    if state['slot'] is not None:
+        # EVIOCGMTSLOTS: u32 code in, s32 value per slot out
+        mt = struct.Struct('I%di' % slots)
+        columns = []
+        for code in (ABS_MT_TRACKING_ID, ABS_MT_POSITION_X, ABS_MT_POSITION_Y):
+            data = fcntl.ioctl(fd, eviocg(0x0a, mt.size), mt.pack(code, *([0] * slots)))
+            columns.append(mt.unpack(data)[1:])
+        state['slots'] = list(zip(*columns))
+    return state
+
+
+# One opened input node (or a caller-owned object with fileno()) and its decoder
+class TouchDevice(object):
+    def __init__(self, path, grab=False):
+        self.path = path
+        self.grab = grab
+        self.decoder = TouchDecoder()
+        self.pending = b''
+        # fake devices answer state queries themselves
+        self.query = getattr(path, 'query_state', None)
+        if hasattr(path, 'fileno'):
+            # caller owns the fd, never close it here
+            self.fd = path.fileno()
+            self.owned = False
+        else:
+            self.fd = os.open(path, os.O_RDONLY | os.O_NONBLOCK)
+            self.owned = True
+            if grab:
+                try:
+                    fcntl.ioctl(self.fd, EVIOCGRAB, 1)
+                except Exception:
+                    os.close(self.fd)
+                    raise
+        fl = fcntl.fcntl(self.fd, fcntl.F_GETFL)
+        fcntl.fcntl(self.fd, fcntl.F_SETFL, fl | os.O_NONBLOCK)
+
+    def fileno(self):
+        return self.fd
+
+    # drain everything readable, calling emit(frame) per SYN_REPORT;
+    # returns False once the device hits end-of-file or is unplugged
+    def read(self, emit):
+        size = INPUT_EVENT.size
+        decoder = self.decoder
+        while True:
+            try:
+                data = os.read(self.fd, size * READ_EVENTS)
+            except OSError as ex:
+                if ex.errno in (errno.EAGAIN, errno.EWOULDBLOCK):
+                    return True
+                return False
+            if not data:
+                return False
+            full = len(data) == size * READ_EVENTS
+            data = self.pending + data
+            whole = len(data) - len(data) % size
+            self.pending = data[whole:]
+            for sec, usec, type, code, value in INPUT_EVENT.iter_unpack(data[:whole]):
+                event = decoder.feed(sec, usec, type, code, value)
+                if event is not None:
+                    emit(event)
+                elif decoder.need_resync:
+                    event = self.resync(sec, usec)
+                    if event is not None:
+                        emit(event)
+            if not full:
+                return True
+
+    # after a SYN_DROPPED: read back the real state and correct the decoder
+    def resync(self, sec, usec):
+        try:
+            state = self.query() if self.query is not None else query_state(self.fd, self.decoder.slots)
+        except OSError:
+            # not an evdev node (a plain pipe or FIFO), nothing to ask
+            self.decoder.need_resync = False
+            return None
+        return self.decoder.resync(state, sec, usec)
+
+    def close(self):
+        if self.owned and self.fd is not None:
+            if self.grab:
+                try:
+                    fcntl.ioctl(self.fd, EVIOCGRAB, 0)
+                except OSError:
+                    pass
+            os.close(self.fd)
+        self.fd = None
+
+
+# Opens every path in device_path (one path/device or a list of them)
+def open_devices(device_path, grab=False):
+    paths = device_path if isinstance(device_path, (list, tuple)) else [device_path]
+    devices = []
+    for path in paths:
+        # if the path to device is not found, os.open raises an OSError
+        # exception.  This will handle it and close thread.
+        try:
+            devices.append(TouchDevice(path, grab))
+        except Exception as ex:
+            for device in devices:
+                device.close()
+            message = "Unable to load device {0} due to a {1} exception with" \
+                      " message: {2}.".format(path, type(ex).__name__, str(ex))
+            raise Exception(message)
+    return devices
+
 
 # Class for handling events from piTFT
 class pitft_touchscreen(threading.Thread):
     def __init__(self, device_path=os.getenv("PIGAME_TS") or "/dev/input/touchscreen", grab=False):
         super(pitft_touchscreen, self).__init__()
+        self.daemon = True
+        # a single path/device, or a list of them, all served by this thread
         self.device_path = device_path
         self.grab = grab
         self.events = queue.Queue()
         self.shutdown = threading.Event()
+        self.devices = []
+        # optional touch_latency.TouchLatency, set before start()
+        self.latency = None
+        # callables run on every frame in the reader thread, before it is queued
+        self.listeners = []
+        self.wake_lock = threading.Lock()
+        if hasattr(os, 'eventfd'):
+            # python 3.10+
+            self.wake_r = self.wake_w = os.eventfd(0, os.EFD_NONBLOCK | os.EFD_CLOEXEC)
+        else:
+            self.wake_r, self.wake_w = os.pipe()
+            fcntl.fcntl(self.wake_r, fcntl.F_SETFL, os.O_NONBLOCK)
 
     def run(self):
-        thread_process = threading.Thread(target=self.process_device)
-        # run thread as a daemon so it gets cleaned up on exit.
-        thread_process.daemon = True
-        thread_process.start()
-        self.shutdown.wait()
-
-    # thread function
-    def process_device(self):
-        device = None
-        # if the path to device is not found, InputDevice raises an OSError
-        # exception.  This will handle it and close thread.
         try:
-            device = evdev.InputDevice(self.device_path)
-            if self.grab:
-                device.grab()
-        except Exception as ex:
-            message = "Unable to load device {0} due to a {1} exception with" \
-                      " message: {2}.".format(self.device_path,
-                                              type(ex).__name__, str(ex))
-            raise Exception(message)
+            devices = open_devices(self.device_path, self.grab)
+        except Exception:
+            self.shutdown.set()
+            raise
+        self.devices = devices
+        live = dict((device.fd, device) for device in devices)
+        poller = select.epoll()
+        poller.register(self.wake_r, select.EPOLLIN)
+        for fd in live:
+            poller.register(fd, select.EPOLLIN)
+        emit = self.sink()
+        try:
+            while live and not self.shutdown.is_set():
+                for fd, mask in poller.poll():
+                    if fd == self.wake_r:
+                        continue
+                    if not live[fd].read(emit):
+                        poller.unregister(fd)
+                        del live[fd]
         finally:
-            if device is None:
-                self.shutdown.set()
-        # Loop for getting evdev events
-        event = {'time': None, 'id': None, 'x': None, 'y': None, 'touch': None}
-        dropping = False
-        while not self.shutdown.is_set():
-            for input_event in device.read_loop():
-                if input_event.type == evdev.ecodes.EV_ABS:
-                    if input_event.code == evdev.ecodes.ABS_X:
-                        event['x'] = input_event.value
-                    elif input_event.code == evdev.ecodes.ABS_Y:
-                        event['y'] = input_event.value
-                    elif input_event.code == evdev.ecodes.ABS_MT_TRACKING_ID:
-                        event['id'] = input_event.value
-                        if input_event.value == -1:
-                            event['x'] = None
-                            event['y'] = None
-                            event['touch'] = None
-                    elif input_event.code == evdev.ecodes.ABS_MT_POSITION_X:
-                        pass
-                    elif input_event.code == evdev.ecodes.ABS_MT_POSITION_Y:
-                        pass
-                elif input_event.type == evdev.ecodes.EV_KEY:
-                    event['touch'] = input_event.value
-                elif input_event.type == evdev.ecodes.SYN_REPORT:
-                    if dropping:
-                        event['x'] = None
-                        event['y'] = None
-                        event['touch'] = None
-                        dropping = False
-                    else:
-                        event['time'] = input_event.timestamp()
-                        self.events.put(event)
-                        e = event
-                        event = {'x': e['x'], 'y': e['y']}
-                        try:
-                            event['id'] = e['id']
-                        except KeyError:
-                            event['id'] = None
-                        try:
-                            event['touch'] = e['touch']
-                        except KeyError:
-                            event['touch'] = None
-                elif input_event.type == evdev.ecodes.SYN_DROPPED:
-                    dropping = True
-        if self.grab:
-            device.ungrab()
+            poller.close()
+            for device in devices:
+                device.close()
+            self.shutdown.set()
+            self.close_wake()
+
+    # the callable run() hands each decoded frame to
+    def sink(self):
+        return self.events.put if self.latency is None and not self.listeners else self.emit
+
+    def add_listener(self, listener):
+        self.listeners.append(listener)
+
+    # queue path used when latency stamping or listeners are enabled
+    def emit(self, event):
+        if self.latency is not None:
+            now = time.time()
+            event['queued'] = now
+            self.latency.kernel_to_queue.record(now - event['time'])
+        for listener in self.listeners:
+            listener(event)
+        self.events.put(event)
+
+    def close_wake(self):
+        with self.wake_lock:
+            if self.wake_r is None:
+                return
+            os.close(self.wake_r)
+            if self.wake_w != self.wake_r:
+                os.close(self.wake_w)
+            self.wake_r = self.wake_w = None
+
+    # snapshot of every active contact on every device: an (N, 4) int32
+    # array of (slot, id, x, y) rows, or a list of tuples without numpy.
+    # Each device's rows come from one SYN_REPORT, never half of one.
+    def contacts(self):
+        rows = []
+        for device in list(self.devices):
+            rows.extend(device.decoder.contacts())
+        if np is None:
+            return rows
+        return np.array(rows, dtype=np.int32).reshape(-1, 4)
+
+    # SYN_DROPPED overruns seen on all devices so far
+    @property
+    def drops(self):
+        return sum(device.decoder.drops for device in self.devices)
 
     def get_event(self):
         if not self.events.empty():
@@ -103,11 +513,30 @@ class pitft_touchscreen(threading.Thread):
         else:
             yield None
 
+    def drain(self):
+        # empty the whole queue in one call, oldest event first
+        events = []
+        try:
+            while True:
+                events.append(self.events.get_nowait())
+        except queue.Empty:
+            pass
+        return events
+
     def queue_empty(self):
         return self.events.empty()
 
     def stop(self):
         self.shutdown.set()
+        # wake the epoll loop so run() returns right away
+        with self.wake_lock:
+            if self.wake_w is not None:
+                if self.wake_w == self.wake_r:
+                    os.eventfd_write(self.wake_w, 1)
+                else:
+                    os.write(self.wake_w, b'\0')
 
     def __del__(self):
         self.shutdown.set()
+        if not self.is_alive():
+            self.close_wake()
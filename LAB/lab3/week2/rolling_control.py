@@ -2,7 +2,6 @@
 # Description: Integrates motor control with a piTFT GUI, using the Lab 2
 # touch control method (evdev + pigame).
 
-import RPi.GPIO as GPIO
 import time
 import signal
 import sys
@@ -11,6 +10,13 @@ import pygame
 from collections import deque
 import pigame
 from pygame.locals import *
+from button_map import ButtonMap
+# the motors are driven through RPi.GPIO; the buttons go through button_map's
+# backend, so with BUTTON_BACKEND=cdev the script runs without RPi.GPIO
+try:
+    import RPi.GPIO as GPIO
+except ImportError:
+    GPIO = None
 
 # Set environment variables for piTFT display and touch functionality
 os.putenv('SDL_VIDEODRIVER', 'fbcon')
@@ -22,7 +28,8 @@ os.putenv('DISPLAY','')
 pygame.init()
 
 # (Lab 2) Create a PiTft object to handle touch events
-pitft = pigame.PiTft()
+# coalesce=True folds each drag burst into one MOUSEMOTION per frame
+pitft = pigame.PiTft(coalesce=True)
 
 # Screen properties
 SCREEN_SIZE = (320, 240)
@@ -42,10 +49,10 @@ FONT_SMALL = pygame.font.Font(None, 22)
 PWM_FREQUENCY_HZ = 50 
 FULL_SPEED_DC = 99.0 
 STOP_SPEED_DC = 0.0
-BOUNCE_TIME_MS = 200
 
 MOTOR_L_PINS = {'IN1': 5, 'IN2': 6, 'PWM': 26, 'name': 'Left'}
 MOTOR_R_PINS = {'IN1': 20, 'IN2': 21, 'PWM': 16, 'name': 'Right'}
+MOTOR_GPIO = [motor[k] for motor in (MOTOR_L_PINS, MOTOR_R_PINS) for k in ('IN1', 'IN2', 'PWM')]
 
 BUTTON_PINS = {
     'L_CW': 17, 'L_STOP': 22, 'L_CCW': 23,
@@ -74,11 +81,17 @@ def cleanup_and_exit(signum=None, frame=None):
     """Stops motors, cleans up GPIO, and quits Pygame on exit."""
     global pitft
     print("\nStopping motors and cleaning up...")
+    buttons.stop()
+    buttons.cleanup()
     if 'pwm_L' in globals() and pwm_L: pwm_L.stop()
     if 'pwm_R' in globals() and pwm_R: pwm_R.stop()
-    GPIO.cleanup()
+    # only the motor pins; the buttons cleaned up their own above
+    if GPIO is not None: GPIO.cleanup(MOTOR_GPIO)
     
     if 'pitft' in globals():
+        # PIGAME_LATENCY=on prints where touch time went (kernel/queue/post/handler)
+        if pitft.latency is not None:
+            pitft.latency.dump()
         del(pitft)
         
     pygame.quit()
@@ -87,6 +100,9 @@ def cleanup_and_exit(signum=None, frame=None):
 
 def setup_gpio():
     global pwm_L, pwm_R
+    if GPIO is None:
+        print("RPi.GPIO not installed, motors disabled.")
+        return
     GPIO.setmode(GPIO.BCM)
     for motor in [MOTOR_L_PINS, MOTOR_R_PINS]:
         GPIO.setup([motor['IN1'], motor['IN2'], motor['PWM']], GPIO.OUT)
@@ -95,20 +111,19 @@ def setup_gpio():
         pwm_instance.start(STOP_SPEED_DC)
         if motor['name'] == 'Left': pwm_L = pwm_instance
         else: pwm_R = pwm_instance
-    for pin in BUTTON_PINS.values():
-        GPIO.setup(pin, GPIO.IN, pull_up_down=GPIO.PUD_UP)
     print("GPIO setup complete.")
 
 def control_motor(motor_pins, direction, speed_dc):
     global left_motor_state, right_motor_state, left_history, right_history
     if panic_mode and direction != 'STOP': return
     pwm_obj = pwm_L if motor_pins['name'] == 'Left' else pwm_R
-    in1_state, in2_state, mode_str = GPIO.LOW, GPIO.LOW, "Stopped"
-    if direction == 'CW': in1_state, in2_state, mode_str = GPIO.HIGH, GPIO.LOW, "Clockwise"
-    elif direction == 'CCW': in1_state, in2_state, mode_str = GPIO.LOW, GPIO.HIGH, "Counter-Clk"
-    GPIO.output(motor_pins['IN1'], in1_state)
-    GPIO.output(motor_pins['IN2'], in2_state)
-    pwm_obj.ChangeDutyCycle(speed_dc)
+    in1_state, in2_state, mode_str = 0, 0, "Stopped"
+    if direction == 'CW': in1_state, in2_state, mode_str = 1, 0, "Clockwise"
+    elif direction == 'CCW': in1_state, in2_state, mode_str = 0, 1, "Counter-Clk"
+    if pwm_obj is not None:
+        GPIO.output(motor_pins['IN1'], in1_state)
+        GPIO.output(motor_pins['IN2'], in2_state)
+        pwm_obj.ChangeDutyCycle(speed_dc)
     timestamp = round(time.time() - start_time, 1)
     if motor_pins['name'] == 'Left':
         if left_motor_state != mode_str:
@@ -119,18 +134,26 @@ def control_motor(motor_pins, direction, speed_dc):
             right_motor_state = mode_str
             right_history.appendleft((mode_str, timestamp))
 
-# --- Specific Motor Actions and Button Callbacks ---
-def left_servo_clockwise(): control_motor(MOTOR_L_PINS, 'CW', FULL_SPEED_DC)
-def left_servo_stop(): control_motor(MOTOR_L_PINS, 'STOP', STOP_SPEED_DC)
-def left_servo_counter_clockwise(): control_motor(MOTOR_L_PINS, 'CCW', FULL_SPEED_DC)
-def right_servo_clockwise(): control_motor(MOTOR_R_PINS, 'CW', FULL_SPEED_DC)
-def right_servo_stop(): control_motor(MOTOR_R_PINS, 'STOP', STOP_SPEED_DC)
-def right_servo_counter_clockwise(): control_motor(MOTOR_R_PINS, 'CCW', FULL_SPEED_DC)
-
-def button_handler_factory(action_func):
-    def handler(channel):
-        if GPIO.input(channel) == GPIO.LOW: action_func()
-    return handler
+# --- Button Bindings ---
+# kind, buttons, motor moves; a tuple of buttons is a chord pressed together.
+# Both CW or both CCW buttons drive the two motors together; the stop
+# buttons are in no chord, so they act on the press with no chord wait.
+BINDINGS = (
+    ('press', BUTTON_PINS['L_CW'],                        ((MOTOR_L_PINS, 'CW'),)),
+    ('press', BUTTON_PINS['L_STOP'],                      ((MOTOR_L_PINS, 'STOP'),)),
+    ('press', BUTTON_PINS['L_CCW'],                       ((MOTOR_L_PINS, 'CCW'),)),
+    ('press', BUTTON_PINS['R_CW'],                        ((MOTOR_R_PINS, 'CW'),)),
+    ('press', BUTTON_PINS['R_STOP'],                      ((MOTOR_R_PINS, 'STOP'),)),
+    ('press', BUTTON_PINS['R_CCW'],                       ((MOTOR_R_PINS, 'CCW'),)),
+    ('press', (BUTTON_PINS['L_CW'], BUTTON_PINS['R_CW']),   ((MOTOR_L_PINS, 'CW'), (MOTOR_R_PINS, 'CW'))),
+    ('press', (BUTTON_PINS['L_CCW'], BUTTON_PINS['R_CCW']), ((MOTOR_L_PINS, 'CCW'), (MOTOR_R_PINS, 'CCW'))),
+)
+
+def move_motors(moves):
+    for motor_pins, direction in moves:
+        control_motor(motor_pins, direction, STOP_SPEED_DC if direction == 'STOP' else FULL_SPEED_DC)
+
+buttons = ButtonMap(BINDINGS, handler=move_motors)
 
 # --- GUI Drawing Function ---
 def draw_gui():
@@ -163,13 +186,8 @@ if __name__ == '__main__':
     
     try:
         setup_gpio()
-        # Attach GPIO event detectors for all 6 buttons
-        GPIO.add_event_detect(BUTTON_PINS['L_CW'], GPIO.FALLING, callback=button_handler_factory(left_servo_clockwise), bouncetime=BOUNCE_TIME_MS)
-        GPIO.add_event_detect(BUTTON_PINS['L_STOP'], GPIO.FALLING, callback=button_handler_factory(left_servo_stop), bouncetime=BOUNCE_TIME_MS)
-        GPIO.add_event_detect(BUTTON_PINS['L_CCW'], GPIO.FALLING, callback=button_handler_factory(left_servo_counter_clockwise), bouncetime=BOUNCE_TIME_MS)
-        GPIO.add_event_detect(BUTTON_PINS['R_CW'], GPIO.FALLING, callback=button_handler_factory(right_servo_clockwise), bouncetime=BOUNCE_TIME_MS)
-        GPIO.add_event_detect(BUTTON_PINS['R_STOP'], GPIO.FALLING, callback=button_handler_factory(right_servo_stop), bouncetime=BOUNCE_TIME_MS)
-        GPIO.add_event_detect(BUTTON_PINS['R_CCW'], GPIO.FALLING, callback=button_handler_factory(right_servo_counter_clockwise), bouncetime=BOUNCE_TIME_MS)
+        # all 6 buttons (and their chords) from the table, on one dispatcher thread
+        buttons.start()
 
         print("Listening for button presses and screen touches...")
         
@@ -178,6 +196,7 @@ if __name__ == '__main__':
             # Scan for Pygame events (which now include touch) 
             for event in pygame.event.get():
                 if event.type == MOUSEBUTTONUP:
+                    pitft.handled(event)
                     pos = pygame.mouse.get_pos()
                     if BUTTON_RECTS['quit'].collidepoint(pos):
                         cleanup_and_exit(signum=0)
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+touch_async.py - asyncio touch event source for pigame.
+TouchEventSource reads the touchscreen with loop.add_reader, so nothing runs
+until the kernel has a frame ready. It is an async iterator of decoded touch
+frames and also works as the touchscreen of a pigame.PiTft. FrameClock lets a
+pygame loop await the next input or the next frame deadline instead of sleeping:
+
+    source = touch_async.TouchEventSource()
+    pitft = pigame.PiTft(touchscreen=source)
+    clock = touch_async.FrameClock(pitft, fps=30)
+    while True:
+        await clock.next()
+        for event in pygame.event.get(): ...
+"""
+import asyncio
+import collections
+import os
+import time
+
+import pitft_touchscreen
+
+
+class TouchEventSource:
+    """Touch frames from one or more devices, delivered on the asyncio loop."""
+    def __init__(self, device_path=os.getenv("PIGAME_TS") or "/dev/input/touchscreen", grab=False):
+        self.device_path = device_path
+        self.grab = grab
+        self.devices = []
+        self.frames = collections.deque()
+        self.loop = None
+        self.ready = None
+        self.closed = False
+
+    def attach(self):
+        """Open the devices and register them with the running loop."""
+        if self.loop is not None or self.closed:
+            return
+        self.loop = asyncio.get_running_loop()
+        self.ready = asyncio.Event()
+        if self.frames:
+            self.ready.set()
+        self.devices = pitft_touchscreen.open_devices(self.device_path, self.grab)
+        for device in self.devices:
+            self.loop.add_reader(device.fd, self.on_readable, device)
+
+    def on_readable(self, device):
+        if not device.read(self.frames.append):
+            self.loop.remove_reader(device.fd)
+            device.close()
+            self.devices.remove(device)
+            if not self.devices:
+                self.closed = True
+        if self.frames or self.closed:
+            self.ready.set()
+
+    async def wait(self, timeout=None):
+        """Wait until a frame is queued or timeout seconds pass; True if frames are queued."""
+        self.attach()
+        if not self.frames and not self.closed:
+            self.ready.clear()
+            try:
+                await asyncio.wait_for(self.ready.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        return bool(self.frames)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        while not self.frames:
+            if self.closed:
+                raise StopAsyncIteration
+            await self.wait()
+        return self.frames.popleft()
+
+    # pitft_touchscreen API, so PiTft can use this source directly
+    def start(self):
+        try:
+            self.attach()
+        except RuntimeError:
+            # no running loop yet, attach on the first await instead
+            pass
+
+    def stop(self):
+        self.closed = True
+        for device in self.devices:
+            if self.loop is not None and not self.loop.is_closed():
+                self.loop.remove_reader(device.fd)
+            device.close()
+        self.devices = []
+        if self.ready is not None:
+            self.ready.set()
+
+    def drain(self):
+        frames = list(self.frames)
+        self.frames.clear()
+        return frames
+
+    def queue_empty(self):
+        return not self.frames
+
+    def get_event(self):
+        yield self.frames.popleft() if self.frames else None
+
+    @property
+    def drops(self):
+        return sum(device.decoder.drops for device in self.devices)
+
+    def contacts(self):
+        rows = []
+        for device in self.devices:
+            rows.extend(device.decoder.contacts())
+        if pitft_touchscreen.np is None:
+            return rows
+        return pitft_touchscreen.np.array(rows, dtype=pitft_touchscreen.np.int32).reshape(-1, 4)
+
+
+class FrameClock:
+    """Awaits the next touch input or frame deadline, then posts touches through PiTft."""
+    def __init__(self, pitft, fps=30):
+        self.pitft = pitft
+        self.source = pitft.pitft
+        # fps=None waits for input only, so an idle screen costs nothing
+        self.period = 1.0 / fps if fps else None
+        self.deadline = time.monotonic()
+
+    async def next(self):
+        """Return 'input' when touches were posted to pygame, 'frame' on a frame deadline."""
+        timeout = None
+        if self.period is not None:
+            now = time.monotonic()
+            if self.deadline <= now:
+                # skip frames that were missed instead of bursting to catch up
+                self.deadline += self.period * (int((now - self.deadline) / self.period) + 1)
+            timeout = self.deadline - now
+        if await self.source.wait(timeout):
+            self.pitft.update()
+            return 'input'
+        return 'frame'
+
+
+async def main():
+    # print every frame with its kernel-to-handler latency
+    async for frame in TouchEventSource():
+        print(frame, f"{(time.time() - frame['time']) * 1e6:.0f} us")
+
+
+if __name__ == '__main__':
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+touch_async_perf.py - Touch-to-handler latency and idle CPU of the demos'
+sleep-and-poll loop versus awaiting touch_async.TouchEventSource.
+Frames are written into a FakeTouchDevice at random moments, so no piTFT is needed.
+"""
+import asyncio
+import random
+import threading
+import time
+
+import pitft_touchscreen
+import touch_async
+
+TOUCHES = 100
+POLL_SLEEP_SEC = 0.05
+IDLE_SEC = 2.0
+
+
+def toucher(device):
+    """Write TOUCHES frames at random gaps from another thread."""
+    time.sleep(IDLE_SEC)
+    for i in range(TOUCHES):
+        time.sleep(random.uniform(0.005, 0.02))
+        device.write_frame(100, 100, i % 2, time.time())
+
+
+def report(name, latencies, idle_cpu):
+    """idle_cpu is the CPU spent before the first touch was handled."""
+    latencies.sort()
+    print(f"{name:<8}{latencies[len(latencies) // 2] * 1e3:>10.2f}"
+          f"{latencies[int(len(latencies) * 0.99)] * 1e3:>10.2f}{idle_cpu * 1e3:>10.2f}")
+
+
+def run_poll():
+    device = pitft_touchscreen.FakeTouchDevice()
+    ts = pitft_touchscreen.pitft_touchscreen(device)
+    ts.start()
+    threading.Thread(target=toucher, args=(device,), daemon=True).start()
+    latencies = []
+    cpu0 = time.process_time()
+    idle_cpu = None
+    while len(latencies) < TOUCHES:
+        for frame in ts.drain():
+            if idle_cpu is None:
+                idle_cpu = time.process_time() - cpu0
+            latencies.append(time.time() - frame['time'])
+        time.sleep(POLL_SLEEP_SEC)
+    ts.stop()
+    device.close()
+    report('poll', latencies, idle_cpu)
+
+
+async def run_async():
+    device = pitft_touchscreen.FakeTouchDevice()
+    source = touch_async.TouchEventSource(device)
+    threading.Thread(target=toucher, args=(device,), daemon=True).start()
+    latencies = []
+    cpu0 = time.process_time()
+    idle_cpu = None
+    async for frame in source:
+        if idle_cpu is None:
+            idle_cpu = time.process_time() - cpu0
+        latencies.append(time.time() - frame['time'])
+        if len(latencies) == TOUCHES:
+            break
+    source.stop()
+    device.close()
+    report('async', latencies, idle_cpu)
+
+
+def main():
+    print(f"{TOUCHES} touches after {IDLE_SEC:.0f} s idle, poll loop sleeps {POLL_SLEEP_SEC * 1e3:.0f} ms")
+    print(f"{'loop':<8}{'p50 ms':>10}{'p99 ms':>10}{'idle ms':>10}")
+    run_poll()
+    asyncio.run(run_async())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+"""
+touch_broker.py - Shares one touchscreen between any number of processes.
+
+TouchBroker reads the device once, decodes it like pitft_touchscreen does
+and publishes every frame into a single-producer ring buffer in
+multiprocessing.shared_memory. Readers in other processes (the GUI, a
+logger, the robot controller) attach by name, keep their own cursor and
+consume at their own pace; a reader that falls more than a ring behind
+skips ahead and counts the frames it missed in .lost. A TouchRingReader is
+also a drop-in touchscreen for pigame.PiTft:
+
+    python3 touch_broker.py                 # in one process
+    pitft = pigame.PiTft(touchscreen=touch_broker.TouchRingReader())
+
+Ring layout: a 64-byte header ('PGTR', u16 version, u16 pad, u32 records,
+u32 record size, u64 frames written, u32 owner pid), then fixed-size
+records. Each record starts with its u64 sequence number, which the broker
+zeroes before and sets after writing the rest, so a reader that copies a
+record and sees the same sequence on both sides got a whole one. Nothing
+takes a lock. A new broker only replaces a ring whose owner has died.
+"""
+import os
+import struct
+import sys
+import time
+from multiprocessing import shared_memory
+
+import pitft_touchscreen
+
+RING_NAME = os.getenv("PIGAME_RING") or "pigame_touch"
+RING_RECORDS = 1024
+RING_MAGIC = b'PGTR'
+RING_VERSION = 1
+HEADER = struct.Struct('<4sHHII')
+HEAD = struct.Struct('<Q')
+HEAD_OFFSET = 16
+OWNER = struct.Struct('<I')
+OWNER_OFFSET = 24
+HEADER_SIZE = 64
+SEQ = struct.Struct('<Q')
+# time, queued (publish time), x, y, touch, id, contact count
+FRAME = struct.Struct('<ddiiiiB')
+# phase, slot, tracking id, x, y
+CONTACT = struct.Struct('<bBxxiii')
+FRAME_OFFSET = SEQ.size
+CONTACT_OFFSET = 48
+RECORD_SIZE = CONTACT_OFFSET + pitft_touchscreen.MAX_SLOTS * CONTACT.size
+# stands for None in the x, y, touch and id fields
+NONE = -2 ** 31
+PHASES = ('down', 'move', 'up')
+PHASE_CODES = {'down': 0, 'move': 1, 'up': 2}
+# how often wait() looks at the ring
+POLL_SEC = 0.0005
+
+
+# rings created by this process, which its resource tracker is right to clean up
+created = set()
+
+
+def attach(name):
+    """Open an existing ring without letting this process's exit unlink it."""
+    try:
+        # python 3.13+
+        return shared_memory.SharedMemory(name, track=False)
+    except TypeError:
+        # older pythons register every attach with the resource tracker,
+        # which unlinks the block when the attaching process exits
+        from multiprocessing import resource_tracker
+        shm = shared_memory.SharedMemory(name)
+        if name not in created:
+            resource_tracker.unregister(shm._name, 'shared_memory')
+        return shm
+
+
+def pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # someone else's process
+        return True
+    return True
+
+
+def reclaim(name):
+    """Unlink a ring left behind by a broker that was killed; FileExistsError if its broker is running."""
+    stale = attach(name)
+    try:
+        if stale.size < HEADER_SIZE or bytes(stale.buf[:len(RING_MAGIC)]) != RING_MAGIC:
+            raise FileExistsError(f"shared memory '{name}' exists and is not a touch ring")
+        owner = OWNER.unpack_from(stale.buf, OWNER_OFFSET)[0]
+    finally:
+        stale.close()
+    if owner and pid_alive(owner):
+        raise FileExistsError(f"touch ring '{name}' is in use by pid {owner}")
+    # a tracked attach, so unlink() has a registration to drop
+    stale = shared_memory.SharedMemory(name)
+    stale.close()
+    stale.unlink()
+
+
+class TouchRing(object):
+    """The producer side: owns the shared memory block and writes frames into it."""
+    def __init__(self, name=RING_NAME, records=RING_RECORDS):
+        self.name = name
+        self.records = records
+        try:
+            self.shm = shared_memory.SharedMemory(name, create=True, size=HEADER_SIZE + records * RECORD_SIZE)
+        except FileExistsError:
+            reclaim(name)
+            self.shm = shared_memory.SharedMemory(name, create=True, size=HEADER_SIZE + records * RECORD_SIZE)
+        created.add(name)
+        self.buf = self.shm.buf
+        HEADER.pack_into(self.buf, 0, RING_MAGIC, RING_VERSION, 0, records, RECORD_SIZE)
+        HEAD.pack_into(self.buf, HEAD_OFFSET, 0)
+        OWNER.pack_into(self.buf, OWNER_OFFSET, os.getpid())
+        self.head = 0
+
+    def write(self, frame):
+        n = self.head
+        buf = self.buf
+        offset = HEADER_SIZE + n % self.records * RECORD_SIZE
+        SEQ.pack_into(buf, offset, 0)
+        contacts = frame.get('contacts') or ()
+        count = min(len(contacts), pitft_touchscreen.MAX_SLOTS)
+        x, y, touch, i = frame['x'], frame['y'], frame['touch'], frame['id']
+        FRAME.pack_into(buf, offset + FRAME_OFFSET, frame['time'], frame.get('queued') or time.time(),
+                        NONE if x is None else x, NONE if y is None else y,
+                        NONE if touch is None else touch, NONE if i is None else i, count)
+        for k in range(count):
+            phase, slot, cid, cx, cy = contacts[k]
+            CONTACT.pack_into(buf, offset + CONTACT_OFFSET + k * CONTACT.size, PHASE_CODES[phase], slot, cid, cx, cy)
+        SEQ.pack_into(buf, offset, n + 1)
+        self.head = n + 1
+        HEAD.pack_into(buf, HEAD_OFFSET, n + 1)
+
+    def close(self):
+        self.buf = None
+        self.shm.close()
+        self.shm.unlink()
+        created.discard(self.name)
+
+
+class TouchRingReader(object):
+    """One consumer with its own cursor; starts at the newest frame unless from_start is set."""
+    def __init__(self, name=RING_NAME, from_start=False):
+        self.name = name
+        self.from_start = from_start
+        self.shm = None
+        self.buf = None
+        self.cursor = 0
+        # frames overwritten before this reader got to them
+        self.lost = 0
+        self.live = {}
+
+    def open(self):
+        self.shm = attach(self.name)
+        self.buf = self.shm.buf
+        magic, version, _, self.records, record_size = HEADER.unpack_from(self.buf, 0)
+        if magic != RING_MAGIC or version != RING_VERSION or record_size != RECORD_SIZE:
+            self.close()
+            raise ValueError(f"{self.name} is not a touch ring")
+        head = HEAD.unpack_from(self.buf, HEAD_OFFSET)[0]
+        self.cursor = max(0, head - self.records) if self.from_start else head
+
+    def read(self):
+        """Every frame published since the last call, oldest first, as pitft_touchscreen frame dicts."""
+        buf = self.buf
+        records = self.records
+        head = HEAD.unpack_from(buf, HEAD_OFFSET)[0]
+        cursor = self.cursor
+        if head - cursor > records:
+            self.lost += head - cursor - records
+            cursor = head - records
+        frames = []
+        while cursor < head:
+            offset = HEADER_SIZE + cursor % records * RECORD_SIZE
+            cursor += 1
+            if SEQ.unpack_from(buf, offset)[0] != cursor:
+                # the broker has lapped this reader
+                self.lost += 1
+                continue
+            t, queued, x, y, touch, i, count = FRAME.unpack_from(buf, offset + FRAME_OFFSET)
+            contacts = None
+            if count:
+                contacts = []
+                for k in range(count):
+                    phase, slot, cid, cx, cy = CONTACT.unpack_from(buf, offset + CONTACT_OFFSET + k * CONTACT.size)
+                    contacts.append((PHASES[phase], slot, cid, cx, cy))
+            if SEQ.unpack_from(buf, offset)[0] != cursor:
+                # overwritten while being copied
+                self.lost += 1
+                continue
+            frames.append({'time': t, 'queued': queued, 'id': None if i == NONE else i,
+                           'x': None if x == NONE else x, 'y': None if y == NONE else y,
+                           'touch': None if touch == NONE else touch, 'contacts': contacts})
+            for phase, slot, cid, cx, cy in contacts or ():
+                if phase == 'up':
+                    self.live.pop(slot, None)
+                else:
+                    self.live[slot] = (slot, cid, cx, cy)
+        self.cursor = cursor
+        return frames
+
+    def pending(self):
+        return HEAD.unpack_from(self.buf, HEAD_OFFSET)[0] - self.cursor
+
+    def wait(self, timeout=None):
+        """Poll until a frame is published or timeout seconds pass; True if one is waiting."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not self.pending():
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(POLL_SEC)
+        return True
+
+    def close(self):
+        if self.shm is not None:
+            self.buf = None
+            self.shm.close()
+            self.shm = None
+
+    # pitft_touchscreen API, so PiTft can use a reader directly
+    def start(self):
+        self.open()
+
+    def stop(self):
+        self.close()
+
+    def drain(self):
+        return self.read() if self.buf is not None else []
+
+    def queue_empty(self):
+        return self.buf is None or not self.pending()
+
+    def get_event(self):
+        frames = self.drain()
+        yield frames[0] if frames else None
+
+    def contacts(self):
+        rows = sorted(self.live.values())
+        if pitft_touchscreen.np is None:
+            return rows
+        return pitft_touchscreen.np.array(rows, dtype=pitft_touchscreen.np.int32).reshape(-1, 4)
+
+
+class TouchBroker(pitft_touchscreen.pitft_touchscreen):
+    """pitft_touchscreen whose frames go into a TouchRing instead of its own queue."""
+    def __init__(self, device_path=os.getenv("PIGAME_TS") or "/dev/input/touchscreen", grab=False,
+                 name=RING_NAME, records=RING_RECORDS):
+        super(TouchBroker, self).__init__(device_path, grab)
+        self.ring = TouchRing(name, records)
+
+    def sink(self):
+        return self.publish
+
+    def publish(self, frame):
+        frame['queued'] = now = time.time()
+        if self.latency is not None:
+            self.latency.kernel_to_queue.record(now - frame['time'])
+        for listener in self.listeners:
+            listener(frame)
+        self.ring.write(frame)
+
+    def run(self):
+        try:
+            super(TouchBroker, self).run()
+        finally:
+            self.ring.close()
+
+
+def main():
+    # the broker only needs the device, grab it so the console does not see touches
+    broker = TouchBroker(grab=True)
+    broker.start()
+    print(f"publishing touches to shared memory '{broker.ring.name}', Ctrl+C to stop")
+    try:
+        while broker.is_alive():
+            broker.join(1.0)
+    except KeyboardInterrupt:
+        broker.stop()
+        broker.join(1.0)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+touch_broker_perf.py - Fan-out cost of one TouchBroker feeding N reader
+processes through shared memory, against N processes that each run their
+own pitft_touchscreen. The separate readers each get a FakeTouchDevice
+carrying a copy of every frame, the way evdev gives every open fd its own
+buffer. Reports kernel-timestamp-to-reader latency, the CPU time all
+processes spent, and frames lost.
+"""
+import multiprocessing
+import time
+
+import pitft_touchscreen
+import touch_broker
+from pitft_touchscreen import FakeTouchDevice
+
+FRAMES = 400
+FRAME_GAP_SEC = 0.005
+READERS = (1, 2, 4, 8)
+RING = 'pigame_touch_perf'
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+
+def ring_reader(ready, results):
+    reader = touch_broker.TouchRingReader(RING)
+    reader.open()
+    ready.release()
+    latencies = []
+    cpu0 = time.process_time()
+    while len(latencies) < FRAMES and reader.wait(1.0):
+        for frame in reader.read():
+            latencies.append(time.time() - frame['time'])
+    results.put((latencies, time.process_time() - cpu0, reader.lost))
+    reader.close()
+
+
+def own_reader(device, ready, results):
+    ts = pitft_touchscreen.pitft_touchscreen(device)
+    ts.start()
+    ready.release()
+    latencies = []
+    cpu0 = time.process_time()
+    try:
+        while len(latencies) < FRAMES:
+            frame = ts.events.get(timeout=1.0)
+            latencies.append(time.time() - frame['time'])
+    except Exception:
+        pass
+    results.put((latencies, time.process_time() - cpu0, 0))
+    ts.stop()
+
+
+def write_frames(devices):
+    for i in range(FRAMES):
+        t = time.time()
+        for device in devices:
+            device.write_frame(100 + i % 50, 100, 1, t)
+        time.sleep(FRAME_GAP_SEC)
+
+
+def run(name, n, ctx):
+    ready = ctx.Semaphore(0)
+    results = ctx.Queue()
+    if name == 'broker':
+        devices = [FakeTouchDevice()]
+        broker = touch_broker.TouchBroker(devices[0], name=RING)
+        procs = [ctx.Process(target=ring_reader, args=(ready, results)) for _ in range(n)]
+    else:
+        devices = [FakeTouchDevice() for _ in range(n)]
+        broker = None
+        procs = [ctx.Process(target=own_reader, args=(device, ready, results)) for device in devices]
+    # fork the readers before any thread exists in this process
+    for proc in procs:
+        proc.start()
+    for _ in procs:
+        ready.acquire()
+    cpu0 = time.process_time()
+    if broker is not None:
+        broker.start()
+    write_frames(devices)
+    rows = [results.get() for _ in procs]
+    for proc in procs:
+        proc.join()
+    if broker is not None:
+        broker.stop()
+        broker.join(1.0)
+    parent_cpu = time.process_time() - cpu0
+    for device in devices:
+        device.close()
+    latencies = [v for row in rows for v in row[0]]
+    cpu = parent_cpu + sum(row[1] for row in rows)
+    lost = sum(row[2] for row in rows)
+    missing = n * FRAMES - len(latencies)
+    return percentile(latencies, 50), percentile(latencies, 99), cpu, lost + missing
+
+
+def main():
+    ctx = multiprocessing.get_context('fork')
+    print(f"{FRAMES} frames at {1 / FRAME_GAP_SEC:.0f} Hz")
+    print("{0:<10}{1:>8}{2:>12}{3:>12}{4:>12}{5:>8}".format('readers', 'n', 'p50 (ms)', 'p99 (ms)', 'cpu (ms)', 'lost'))
+    for n in READERS:
+        for name in ('separate', 'broker'):
+            p50, p99, cpu, lost = run(name, n, ctx)
+            print("{0:<10}{1:>8}{2:>12.3f}{3:>12.3f}{4:>12.1f}{5:>8}".format(name, n, p50 * 1e3, p99 * 1e3, cpu * 1e3, lost))
+
+
+if __name__ == '__main__':
+    main()
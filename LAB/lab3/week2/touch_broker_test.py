@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+touch_broker_test.py - Checks who may take over a touch_broker ring: a ring
+whose owner pid is dead is replaced, a ring whose owner is running is left
+alone, and a reader in another process can attach and exit without its
+resource tracker unlinking the ring or complaining.
+"""
+import subprocess
+import sys
+from multiprocessing import shared_memory
+
+import touch_broker
+from touch_broker import HEADER, HEADER_SIZE, OWNER, OWNER_OFFSET, RING_MAGIC, RING_VERSION, RECORD_SIZE
+
+RING = 'pigame_broker_test'
+
+
+def dead_pid():
+    proc = subprocess.Popen([sys.executable, '-c', 'pass'])
+    proc.wait()
+    return proc.pid
+
+
+def check_stale():
+    # what a broker killed along with its resource tracker leaves behind
+    shm = shared_memory.SharedMemory(RING, create=True, size=HEADER_SIZE + 4 * RECORD_SIZE)
+    HEADER.pack_into(shm.buf, 0, RING_MAGIC, RING_VERSION, 0, 4, RECORD_SIZE)
+    pid = dead_pid()
+    OWNER.pack_into(shm.buf, OWNER_OFFSET, pid)
+    shm.close()
+    ring = touch_broker.TouchRing(RING, records=16)
+    owner, records = OWNER.unpack_from(ring.buf, OWNER_OFFSET)[0], ring.records
+    ring.close()
+    return owner != pid and records == 16, f"ring of dead pid {pid} replaced by pid {owner}"
+
+
+def check_live():
+    ring = touch_broker.TouchRing(RING, records=16)
+    ring.write({'time': 1.0, 'x': 10, 'y': 20, 'touch': 1, 'id': None, 'contacts': None})
+    try:
+        touch_broker.TouchRing(RING, records=16)
+        refused = 'not refused'
+    except FileExistsError as ex:
+        refused = str(ex)
+    reader = touch_broker.TouchRingReader(RING, from_start=True)
+    reader.open()
+    frames = reader.read()
+    reader.close()
+    ring.close()
+    ok = refused != 'not refused' and [(f['x'], f['y']) for f in frames] == [(10, 20)]
+    return ok, f"{refused}, first frame still readable: {bool(frames)}"
+
+
+def check_attach():
+    ring = touch_broker.TouchRing(RING, records=16)
+    script = (f"import touch_broker\nr = touch_broker.TouchRingReader({RING!r})\nr.open()\nr.close()\n")
+    proc = subprocess.run([sys.executable, '-c', script], capture_output=True, text=True)
+    try:
+        reader = touch_broker.TouchRingReader(RING)
+        reader.open()
+        reader.close()
+        survived = True
+    except FileNotFoundError:
+        survived = False
+    ring.close()
+    ok = proc.returncode == 0 and survived and not proc.stderr
+    return ok, f"ring survived another reader's exit: {survived}, its stderr: {proc.stderr.strip() or 'empty'}"
+
+
+def main():
+    failed = 0
+    for name, check in (('stale ring', check_stale), ('live ring', check_live), ('attach', check_attach)):
+        ok, detail = check()
+        print(f"{'PASS' if ok else 'FAIL'} {name}: {detail}")
+        failed += not ok
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
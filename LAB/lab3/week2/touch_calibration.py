@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+#  Touchscreen calibration: least-squares affine fit and the binary cache
+#  file that pigame.PiTft memory-maps at startup.
+#
+#  Cache layout (little endian, 60 bytes):
+#    magic 'PGCL', u16 version, u16 width, u16 height, u16 rotation,
+#    6 x f64 coefficients (x = a*rx + b*ry + c, y = d*rx + e*ry + f)
+
+import mmap
+import os
+import struct
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+CACHE_PATH = os.getenv("PIGAME_CALIBRATION") or os.path.expanduser("~/.pigame_calibration")
+CACHE_FORMAT = struct.Struct('<4sHHHH6d')
+CACHE_MAGIC = b'PGCL'
+CACHE_VERSION = 1
+# fractional bits of the fixed-point transform PiTft applies
+FIXED_SHIFT = 16
+
+
+def targets(size=(320, 240), margin=20):
+    """Crosshair positions: the four inset corners, the edge midpoints and the centre."""
+    w, h = size
+    xs = (margin, w // 2, w - 1 - margin)
+    ys = (margin, h // 2, h - 1 - margin)
+    return [(x, y) for y in ys for x in xs]
+
+
+def fit_affine(raw, screen):
+    """Least-squares affine map from raw touch samples to screen points.
+
+    Returns ((a, b, c, d, e, f), rms_error_px). Needs at least three
+    points that are not on one line.
+    """
+    raw = np.asarray(raw, dtype=np.float64)
+    screen = np.asarray(screen, dtype=np.float64)
+    if len(raw) < 3 or len(raw) != len(screen):
+        raise ValueError("need three or more raw/screen point pairs")
+    design = np.column_stack((raw, np.ones(len(raw))))
+    coeffs, _, rank, _ = np.linalg.lstsq(design, screen, rcond=None)
+    if rank < 3:
+        raise ValueError("calibration points are collinear")
+    residual = design @ coeffs - screen
+    rms = float(np.sqrt((residual ** 2).sum(axis=1).mean()))
+    (a, d), (b, e), (c, f) = coeffs.tolist()
+    return (a, b, c, d, e, f), rms
+
+
+def save(coeffs, size, rotation, path=CACHE_PATH):
+    """Write the cache atomically so a running PiTft never maps a torn file."""
+    data = CACHE_FORMAT.pack(CACHE_MAGIC, CACHE_VERSION, size[0], size[1], rotation, *coeffs)
+    tmp = path + '.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def load(path=CACHE_PATH):
+    """Map the cache and return (coeffs, (width, height), rotation), or None if missing or invalid."""
+    try:
+        with open(path, 'rb') as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                if len(mm) < CACHE_FORMAT.size:
+                    return None
+                magic, version, w, h, rotation, *coeffs = CACHE_FORMAT.unpack_from(mm)
+    except (OSError, ValueError):
+        return None
+    if magic != CACHE_MAGIC or version != CACHE_VERSION:
+        return None
+    return tuple(coeffs), (w, h), rotation
+
+
+def to_fixed(coeffs, shift=FIXED_SHIFT):
+    """Integer coefficients for (a*rx + b*ry + c) >> shift, rounding to nearest."""
+    scale = 1 << shift
+    a, b, c, d, e, f = coeffs
+    half = scale >> 1
+    return (int(round(a * scale)), int(round(b * scale)), int(round(c * scale)) + half,
+            int(round(d * scale)), int(round(e * scale)), int(round(f * scale)) + half)
@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+#  Jitter filter stage for the piTFT touch stream.
+#
+#  The resistive panel reports a few units of noise on every sample, even
+#  from a resting finger, and every sample becomes a MOUSEMOTION that makes
+#  the app redraw. TouchFilter runs on the frames drained from the reader
+#  (pigame.PiTft(jitter_filter=True) calls apply() before translating them):
+#
+#    - motion samples are smoothed with a One-Euro filter, which follows
+#      fast strokes closely and smooths slow ones hard;
+#    - a smoothed sample that is within the dead-band of the last position
+#      passed on is dropped, and counted in self.suppressed.
+#
+#  Presses and releases always pass through unchanged. The single-touch
+#  stream and each multi-touch slot keep their own state in preallocated
+#  lists, and the batch and each frame's contacts are compacted in place,
+#  so the only thing allocated per sample is the tuple for a contact that
+#  moved. Positions are raw touchscreen units, which are screen pixels on
+#  the stock piTFT driver.
+
+import math
+
+MIN_CUTOFF_HZ = 1.0   # cutoff for a resting finger, lower is smoother
+BETA = 0.02           # cutoff increase per unit/s of speed, higher lags less
+D_CUTOFF_HZ = 1.0     # cutoff of the speed estimate
+DEADBAND = 2.0        # movement below this is not reported
+DEFAULT_DT = 0.01     # sample interval assumed when timestamps do not advance
+
+
+def smoothing(cutoff, dt):
+    """Weight of the new sample in an exponential low-pass at cutoff Hz."""
+    tau = 1.0 / (2.0 * math.pi * cutoff)
+    return 1.0 / (1.0 + tau / dt)
+
+
+class TouchFilter(object):
+    def __init__(self, min_cutoff=MIN_CUTOFF_HZ, beta=BETA, d_cutoff=D_CUTOFF_HZ, deadband=DEADBAND, slots=10):
+        self.min_cutoff = min_cutoff
+        self.beta = beta
+        self.d_cutoff = d_cutoff
+        self.deadband = deadband
+        # motion samples dropped by the dead-band
+        self.suppressed = 0
+        # index slots holds the single-touch stream, 0..slots-1 the MT slots
+        self.slots = slots
+        n = slots + 1
+        self.down = [False] * n
+        self.t = [0.0] * n
+        self.x = [0.0] * n
+        self.y = [0.0] * n
+        self.dx = [0.0] * n
+        self.dy = [0.0] * n
+        # last position passed on
+        self.ex = [0] * n
+        self.ey = [0] * n
+
+    def reset(self, i, x, y, t):
+        self.down[i] = True
+        self.t[i] = t
+        self.x[i] = x
+        self.y[i] = y
+        self.dx[i] = self.dy[i] = 0.0
+        self.ex[i] = x
+        self.ey[i] = y
+
+    def step(self, i, x, y, t):
+        """Filter one motion sample; False if it is in the dead-band, else True with the position in ex[i], ey[i]."""
+        dt = t - self.t[i]
+        if dt <= 0:
+            dt = DEFAULT_DT
+        self.t[i] = t
+        a = smoothing(self.d_cutoff, dt)
+        dx = self.dx[i] = self.dx[i] + a * ((x - self.x[i]) / dt - self.dx[i])
+        dy = self.dy[i] = self.dy[i] + a * ((y - self.y[i]) / dt - self.dy[i])
+        min_cutoff = self.min_cutoff
+        beta = self.beta
+        fx = self.x[i] = self.x[i] + smoothing(min_cutoff + beta * abs(dx), dt) * (x - self.x[i])
+        fy = self.y[i] = self.y[i] + smoothing(min_cutoff + beta * abs(dy), dt) * (y - self.y[i])
+        ox = fx - self.ex[i]
+        oy = fy - self.ey[i]
+        if ox * ox + oy * oy < self.deadband * self.deadband:
+            self.suppressed += 1
+            return False
+        self.ex[i] = int(round(fx))
+        self.ey[i] = int(round(fy))
+        return True
+
+    def apply(self, frames):
+        """Filter a batch of decoder frames in place; returns the same list, cut down to the frames still worth posting."""
+        single = self.slots
+        ex = self.ex
+        ey = self.ey
+        n = 0
+        for frame in frames:
+            keep = True
+            x = frame['x']
+            y = frame['y']
+            t = frame['time']
+            if not frame['touch'] or x is None or y is None:
+                self.down[single] = False
+            elif not self.down[single]:
+                self.reset(single, x, y, t)
+            else:
+                # in the dead-band this reports the last position, so a
+                # frame kept for its contacts still reads as no movement
+                keep = self.step(single, x, y, t)
+                frame['x'] = ex[single]
+                frame['y'] = ey[single]
+            contacts = frame.get('contacts')
+            if contacts:
+                k = 0
+                for contact in contacts:
+                    phase, slot, fid, cx, cy = contact
+                    if phase == 'move':
+                        if not self.step(slot, cx, cy, t):
+                            continue
+                        contact = (phase, slot, fid, ex[slot], ey[slot])
+                    elif phase == 'down':
+                        self.reset(slot, cx, cy, t)
+                    else:
+                        self.down[slot] = False
+                    contacts[k] = contact
+                    k += 1
+                del contacts[k:]
+                if k:
+                    keep = True
+            if keep:
+                frames[n] = frame
+                n += 1
+        del frames[n:]
+        return frames
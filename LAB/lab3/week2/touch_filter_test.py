@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+touch_filter_test.py - Checks touch_filter.TouchFilter on synthetic noisy
+traces decoded with pitft_touchscreen.TouchDecoder, and prints how many
+motion events the filter saved on each.
+"""
+import random
+import sys
+
+from pitft_touchscreen import (TouchDecoder, EV_ABS, EV_KEY, EV_SYN, ABS_X, ABS_Y, BTN_TOUCH, SYN_REPORT,
+                               ABS_MT_SLOT, ABS_MT_TRACKING_ID, ABS_MT_POSITION_X, ABS_MT_POSITION_Y)
+from touch_filter import TouchFilter
+
+NOISE = 2
+STEP = 0.01
+
+
+def decode(frames):
+    decoder = TouchDecoder()
+    out = []
+    for t, events in frames:
+        sec = int(t)
+        usec = int(round((t - sec) * 1000000))
+        for type, code, value in events:
+            frame = decoder.feed(sec, usec, type, code, value)
+            if frame is not None:
+                out.append(frame)
+    return out
+
+
+def noisy_stroke(rng, x0, y0, x1, y1, seconds):
+    """Finger down, moving from (x0, y0) to (x1, y1) with +-NOISE jitter, then up."""
+    n = int(seconds / STEP)
+    frames = [(0.0, [(EV_ABS, ABS_X, x0), (EV_ABS, ABS_Y, y0), (EV_KEY, BTN_TOUCH, 1), (EV_SYN, SYN_REPORT, 0)])]
+    for i in range(1, n + 1):
+        x = x0 + (x1 - x0) * i // n + rng.randint(-NOISE, NOISE)
+        y = y0 + (y1 - y0) * i // n + rng.randint(-NOISE, NOISE)
+        frames.append((i * STEP, [(EV_ABS, ABS_X, x), (EV_ABS, ABS_Y, y), (EV_SYN, SYN_REPORT, 0)]))
+    frames.append(((n + 1) * STEP, [(EV_KEY, BTN_TOUCH, 0), (EV_SYN, SYN_REPORT, 0)]))
+    return frames
+
+
+def two_fingers(rng, seconds):
+    """Slot 0 resting with jitter while slot 1 moves right."""
+    n = int(seconds / STEP)
+    frames = [(0.0, [(EV_ABS, ABS_MT_SLOT, 0), (EV_ABS, ABS_MT_TRACKING_ID, 1),
+                     (EV_ABS, ABS_MT_POSITION_X, 50), (EV_ABS, ABS_MT_POSITION_Y, 50),
+                     (EV_ABS, ABS_MT_SLOT, 1), (EV_ABS, ABS_MT_TRACKING_ID, 2),
+                     (EV_ABS, ABS_MT_POSITION_X, 100), (EV_ABS, ABS_MT_POSITION_Y, 100),
+                     (EV_SYN, SYN_REPORT, 0)])]
+    for i in range(1, n + 1):
+        frames.append((i * STEP, [(EV_ABS, ABS_MT_SLOT, 0),
+                                  (EV_ABS, ABS_MT_POSITION_X, 50 + rng.randint(-NOISE, NOISE)),
+                                  (EV_ABS, ABS_MT_POSITION_Y, 50 + rng.randint(-NOISE, NOISE)),
+                                  (EV_ABS, ABS_MT_SLOT, 1),
+                                  (EV_ABS, ABS_MT_POSITION_X, 100 + 200 * i // n),
+                                  (EV_SYN, SYN_REPORT, 0)]))
+    frames.append(((n + 1) * STEP, [(EV_ABS, ABS_MT_SLOT, 0), (EV_ABS, ABS_MT_TRACKING_ID, -1),
+                                    (EV_ABS, ABS_MT_SLOT, 1), (EV_ABS, ABS_MT_TRACKING_ID, -1),
+                                    (EV_SYN, SYN_REPORT, 0)]))
+    return frames
+
+
+def moves(frames, slot):
+    return [c for f in frames for c in (f['contacts'] or ()) if c[1] == slot and c[0] == 'move']
+
+
+def check_resting(rng):
+    raw = decode(noisy_stroke(rng, 120, 80, 120, 80, 1.0))
+    n = len(raw)
+    f = TouchFilter()
+    out = f.apply(raw)
+    ok = (out[0]['touch'] == 1 and out[-1]['touch'] == 0 and len(out) <= n // 10
+          and all(abs(e['x'] - 120) <= NOISE and abs(e['y'] - 80) <= NOISE for e in out[:-1]))
+    return ok, f"{n} frames -> {len(out)}, {f.suppressed} suppressed"
+
+
+def check_stroke(rng):
+    raw = decode(noisy_stroke(rng, 20, 120, 300, 120, 0.3))
+    n = len(raw)
+    f = TouchFilter()
+    out = f.apply(raw)
+    last = out[-2]
+    ok = out[-1]['touch'] == 0 and abs(last['x'] - 300) <= 12 and abs(last['y'] - 120) <= NOISE
+    return ok, f"{n} frames -> {len(out)}, ends at ({last['x']}, {last['y']})"
+
+
+def check_multitouch(rng):
+    raw = decode(two_fingers(rng, 0.5))
+    # apply() filters in place, count the raw moves first
+    raw_rest = len(moves(raw, 0))
+    raw_moving = len(moves(raw, 1))
+    f = TouchFilter()
+    out = f.apply(raw)
+    rest = moves(out, 0)
+    moving = moves(out, 1)
+    downs = sum(1 for e in out for c in (e['contacts'] or ()) if c[0] == 'down')
+    ups = sum(1 for e in out for c in (e['contacts'] or ()) if c[0] == 'up')
+    ok = downs == 2 and ups == 2 and len(rest) <= 3 and len(moving) >= 10 and moving[-1][3] >= 280
+    return ok, f"resting finger {raw_rest} moves -> {len(rest)}, moving finger {raw_moving} -> {len(moving)}"
+
+
+def main():
+    rng = random.Random(1)
+    failed = 0
+    for name, check in (('resting finger', check_resting), ('fast stroke', check_stroke),
+                        ('two fingers', check_multitouch)):
+        ok, detail = check(rng)
+        print(f"{'PASS' if ok else 'FAIL'} {name}: {detail}")
+        failed += not ok
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
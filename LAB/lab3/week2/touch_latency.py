@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+#  Opt-in touch latency instrumentation for pigame.
+#
+#  Turn it on with PIGAME_LATENCY=on (or PiTft(latency=True)), mark events
+#  as handled with pitft.handled(event) and print pitft.latency.dump().
+#  Each stage goes into a fixed-size log histogram, so recording never
+#  allocates and memory stays constant however long the app runs.
+
+import math
+
+# buckets per power of two, about 9% resolution
+SUB_BUCKETS = 8
+# 1 us .. 2^24 us (~16 s); slower samples land in the last bucket
+BUCKETS = 24 * SUB_BUCKETS
+
+
+class LatencyHistogram(object):
+    def __init__(self, name):
+        self.name = name
+        self.counts = [0] * BUCKETS
+        self.count = 0
+        self.max = 0.0
+
+    def record(self, seconds):
+        us = seconds * 1e6
+        index = int(math.log2(us) * SUB_BUCKETS) if us > 1.0 else 0
+        self.counts[index if index < BUCKETS else BUCKETS - 1] += 1
+        self.count += 1
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, p):
+        """Upper edge of the bucket holding the p-th percentile, in seconds."""
+        if not self.count:
+            return None
+        rank = self.count * p / 100.0
+        seen = 0
+        for index, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank and n:
+                return min(2 ** ((index + 1) / SUB_BUCKETS) / 1e6, self.max)
+        return self.max
+
+    def clear(self):
+        self.counts = [0] * BUCKETS
+        self.count = 0
+        self.max = 0.0
+
+
+class TouchLatency(object):
+    """Histograms for each hop a touch takes from the kernel to the app's handler."""
+    def __init__(self):
+        # written by the reader thread
+        self.kernel_to_queue = LatencyHistogram('kernel->queue')
+        # written by the thread calling PiTft.update() / handled()
+        self.queue_to_post = LatencyHistogram('queue->post')
+        self.post_to_handler = LatencyHistogram('post->handler')
+        self.kernel_to_handler = LatencyHistogram('kernel->handler')
+
+    def stages(self):
+        return [self.kernel_to_queue, self.queue_to_post, self.post_to_handler, self.kernel_to_handler]
+
+    def report(self, percentiles=(50, 95, 99)):
+        """{stage name: {'count': n, 'max': s, 50: s, 95: s, 99: s}} in seconds."""
+        out = {}
+        for h in self.stages():
+            row = {'count': h.count, 'max': h.max}
+            for p in percentiles:
+                row[p] = h.percentile(p)
+            out[h.name] = row
+        return out
+
+    def dump(self):
+        print("{0:<18}{1:>8}{2:>10}{3:>10}{4:>10}{5:>10}".format('stage (ms)', 'count', 'p50', 'p95', 'p99', 'max'))
+        for name, row in self.report().items():
+            cells = ['{0:>10.2f}'.format(row[k] * 1e3) if row[k] is not None else '{0:>10}'.format('-')
+                     for k in (50, 95, 99, 'max')]
+            print('{0:<18}{1:>8}'.format(name, row['count']) + ''.join(cells))
+
+    def clear(self):
+        for h in self.stages():
+            h.clear()
+
+    def record_posts(self, raws, now):
+        """Called by PiTft.update() for every raw frame it is about to post."""
+        for r in raws:
+            # sources other than pitft_touchscreen may not stamp frames
+            queued = r.get('queued')
+            if queued is not None:
+                self.queue_to_post.record(now - queued)
+
+    def record_handled(self, event, now):
+        self.post_to_handler.record(now - event.posted)
+        if event.time is not None:
+            self.kernel_to_handler.record(now - event.time)
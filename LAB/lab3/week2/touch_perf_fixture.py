@@ -0,0 +1,20 @@
+"""
+touch_perf_fixture.py - Shared setup for the headless touch benchmarks.
+Import it before pigame: it pins the SDL dummy driver, no GPIO and no
+calibration, so a ~/.pigame_calibration left by the piTFT does not change
+the transform being timed. QueueTouchscreen is a touchscreen whose queue
+the benchmark fills instead of a device.
+"""
+import os
+
+os.environ['SDL_VIDEODRIVER'] = 'dummy'
+os.environ['PIGAME_GPIO'] = 'off'
+os.environ['PIGAME_CAL'] = 'off'
+
+import pitft_touchscreen
+
+
+class QueueTouchscreen(pitft_touchscreen.pitft_touchscreen):
+    """Touchscreen whose queue is filled by the benchmark instead of a device."""
+    def run(self):
+        self.shutdown.wait()
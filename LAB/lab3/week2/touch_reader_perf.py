@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+touch_reader_perf.py - Compares the epoll touchscreen reader against the old
+two-thread design (run() parked on shutdown, a daemon thread blocked in read).
+Both read a FakeTouchDevice pipe, so no piTFT is needed. Reports threads used,
+wakeup latency (input_event timestamp -> queue), CPU time and stop() latency.
+"""
+import os
+import threading
+import time
+
+import pitft_touchscreen
+from pitft_touchscreen import FakeTouchDevice, TouchDecoder, INPUT_EVENT
+
+FRAMES = 500
+FRAME_GAP_SEC = 0.002
+IDLE_SEC = 1.0
+
+
+class LegacyTouchscreen(pitft_touchscreen.pitft_touchscreen):
+    """The previous layout, kept here only for comparison."""
+    def run(self):
+        thread_process = threading.Thread(target=self.process_device)
+        thread_process.daemon = True
+        thread_process.start()
+        self.inner = thread_process
+        self.shutdown.wait()
+
+    def process_device(self):
+        # blocking reads stand in for evdev's device.read_loop()
+        fd = self.device_path.fileno()
+        decoder = TouchDecoder()
+        while not self.shutdown.is_set():
+            data = os.read(fd, INPUT_EVENT.size)
+            if not data:
+                return
+            event = decoder.feed(*INPUT_EVENT.unpack(data))
+            if event is not None:
+                self.events.put(event)
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+
+def run(name, cls):
+    device = FakeTouchDevice()
+    threads_before = threading.active_count()
+    ts = cls(device)
+    ts.start()
+    time.sleep(0.05)
+    threads = threading.active_count() - threads_before
+
+    cpu0 = time.process_time()
+    time.sleep(IDLE_SEC)
+    idle_cpu = time.process_time() - cpu0
+
+    latencies = []
+    cpu0 = time.process_time()
+    for i in range(FRAMES):
+        device.write_frame(100 + i % 50, 100, 1, time.time())
+        event = ts.events.get()
+        latencies.append(time.time() - event['time'])
+        time.sleep(FRAME_GAP_SEC)
+    busy_cpu = time.process_time() - cpu0
+
+    t0 = time.perf_counter()
+    ts.stop()
+    ts.join(1.0)
+    inner = getattr(ts, 'inner', None)
+    if inner is not None:
+        inner.join(0.1)
+    stopped = not ts.is_alive() and (inner is None or not inner.is_alive())
+    stop_us = (time.perf_counter() - t0) * 1e6
+    device.close()
+    if inner is not None:
+        # end-of-file finally releases the blocked legacy thread
+        inner.join(1.0)
+
+    print(f"{name:<8}{threads:>8}{percentile(latencies, 50) * 1e6:>10.0f}"
+          f"{percentile(latencies, 99) * 1e6:>10.0f}{idle_cpu * 1e3:>10.2f}"
+          f"{busy_cpu / FRAMES * 1e6:>12.1f}"
+          f"{(f'{stop_us:.0f}' if stopped else 'blocked'):>12}")
+
+
+def main():
+    print(f"{FRAMES} frames every {FRAME_GAP_SEC * 1e3:.0f} ms, {IDLE_SEC:.0f} s idle")
+    print(f"{'reader':<8}{'threads':>8}{'p50 us':>10}{'p99 us':>10}"
+          f"{'idle ms':>10}{'cpu us/evt':>12}{'stop us':>12}")
+    run('legacy', LegacyTouchscreen)
+    run('epoll', pitft_touchscreen.pitft_touchscreen)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+touch_replay.py - Records raw touchscreen frames and replays them
+deterministically, so the piTFT demos can be benchmarked and regression-tested
+without a touchscreen.
+
+  python3 touch_replay.py record drag.tlog
+  python3 touch_replay.py play drag.tlog --speed 4 -- python3 rolling_control.py
+  python3 touch_replay.py play drag.tlog --fast -- python3 ../../lab2/week2/control_two_collide.py
+
+'play' creates a FIFO, points PIGAME_TS at it and starts the command, so the
+app's PiTft reads the replayed frames exactly as it would read the device.
+In-process, TouchReplayer writes into a FakeTouchDevice that a
+pitft_touchscreen (and so a PiTft) can read.
+
+Log format (little endian): header 'PGTL' u16 version u16 pad, then one record
+per SYN_REPORT-delimited frame: f64 timestamp, u16 event count, followed by
+count x (u16 type, u16 code, s32 value). The SYN_REPORT itself is included.
+"""
+import argparse
+import errno
+import fcntl
+import os
+import select
+import struct
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import pitft_touchscreen
+from pitft_touchscreen import INPUT_EVENT, EV_SYN, SYN_REPORT
+
+LOG_HEADER = struct.Struct('<4sHH')
+LOG_MAGIC = b'PGTL'
+LOG_VERSION = 1
+FRAME_HEADER = struct.Struct('<dH')
+LOG_EVENT = struct.Struct('<HHi')
+
+
+def write_log(path, frames):
+    """Save [(timestamp, [(type, code, value), ...]), ...] to a log file."""
+    with open(path, 'wb') as f:
+        f.write(LOG_HEADER.pack(LOG_MAGIC, LOG_VERSION, 0))
+        for t, events in frames:
+            f.write(FRAME_HEADER.pack(t, len(events)))
+            f.write(b''.join(LOG_EVENT.pack(*e) for e in events))
+
+
+def read_log(path):
+    """Load a log file as [(timestamp, [(type, code, value), ...]), ...]."""
+    with open(path, 'rb') as f:
+        data = f.read()
+    magic, version, _ = LOG_HEADER.unpack_from(data)
+    if magic != LOG_MAGIC or version != LOG_VERSION:
+        raise ValueError(f"{path} is not a touch log")
+    frames = []
+    offset = LOG_HEADER.size
+    while offset < len(data):
+        t, count = FRAME_HEADER.unpack_from(data, offset)
+        offset += FRAME_HEADER.size
+        events = list(LOG_EVENT.iter_unpack(data[offset:offset + count * LOG_EVENT.size]))
+        offset += count * LOG_EVENT.size
+        frames.append((t, events))
+    return frames
+
+
+def record(device_path, log_path, seconds=None):
+    """Copy raw frames from the device into a log until Ctrl+C, end-of-file or seconds elapse.
+
+    device_path may also be an object with fileno(), such as a FakeTouchDevice.
+    """
+    if hasattr(device_path, 'fileno'):
+        fd = device_path.fileno()
+        owned = False
+    else:
+        fd = os.open(device_path, os.O_RDONLY | os.O_NONBLOCK)
+        owned = True
+    fcntl.fcntl(fd, fcntl.F_SETFL, fcntl.fcntl(fd, fcntl.F_GETFL) | os.O_NONBLOCK)
+    poller = select.poll()
+    poller.register(fd, select.POLLIN)
+    size = INPUT_EVENT.size
+    frames = []
+    current = []
+    pending = b''
+    deadline = time.monotonic() + seconds if seconds else None
+    try:
+        while True:
+            timeout = None
+            if deadline is not None:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                timeout *= 1000
+            # an idle screen sends nothing, so wait here rather than in read()
+            if not poller.poll(timeout):
+                continue
+            try:
+                data = os.read(fd, size * pitft_touchscreen.READ_EVENTS)
+            except BlockingIOError:
+                continue
+            if not data:
+                break
+            data = pending + data
+            whole = len(data) - len(data) % size
+            pending = data[whole:]
+            for sec, usec, type, code, value in INPUT_EVENT.iter_unpack(data[:whole]):
+                current.append((type, code, value))
+                if type == EV_SYN and code == SYN_REPORT:
+                    frames.append((sec + usec / 1000000.0, current))
+                    current = []
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if owned:
+            os.close(fd)
+    write_log(log_path, frames)
+    return frames
+
+
+class TouchReplayer(threading.Thread):
+    """Writes logged frames into a device at original speed, speed x faster, or speed=0 as fast as possible.
+
+    Frames are stamped with the replay time, so latency measurements stay
+    meaningful. The default target is a fresh FakeTouchDevice (self.device).
+    """
+    def __init__(self, frames, speed=1.0, device=None):
+        super().__init__(daemon=True)
+        self.frames = frames
+        self.speed = speed
+        self.device = device if device is not None else pitft_touchscreen.FakeTouchDevice()
+        self.done = threading.Event()
+
+    def run(self):
+        try:
+            self.play()
+        finally:
+            self.done.set()
+
+    def play(self):
+        if not self.frames:
+            return
+        first = self.frames[0][0]
+        start = time.monotonic()
+        for t, events in self.frames:
+            if self.speed:
+                delay = start + (t - first) / self.speed - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+            self.device.write_events(events, time.time())
+
+
+class FifoDevice(pitft_touchscreen.FakeTouchDevice):
+    """Write end of a named pipe, opened once the app's reader has opened it."""
+    def __init__(self, path, proc):
+        while True:
+            try:
+                wfd = os.open(path, os.O_WRONLY | os.O_NONBLOCK)
+                break
+            except OSError as ex:
+                if ex.errno != errno.ENXIO or proc.poll() is not None:
+                    raise
+                # no reader yet, the app is still starting
+                time.sleep(0.01)
+        # blocking writes, so a slow app throttles the replay instead of losing frames
+        fcntl.fcntl(wfd, fcntl.F_SETFL, fcntl.fcntl(wfd, fcntl.F_GETFL) & ~os.O_NONBLOCK)
+        super().__init__(fds=(None, wfd))
+
+
+def play_command(frames, speed, command, linger):
+    """Run command with PIGAME_TS on a FIFO fed from frames; returns its exit code."""
+    tmpdir = tempfile.mkdtemp(prefix='touch_replay')
+    fifo = os.path.join(tmpdir, 'touchscreen')
+    os.mkfifo(fifo)
+    env = dict(os.environ, PIGAME_TS=fifo)
+    script = next((arg for arg in command if arg.endswith('.py')), None)
+    cwd = os.path.dirname(os.path.abspath(script)) if script else None
+    proc = subprocess.Popen(command, env=env, cwd=cwd)
+    try:
+        device = FifoDevice(fifo, proc)
+        t0 = time.monotonic()
+        replayer = TouchReplayer(frames, speed, device)
+        replayer.play()
+        # end-of-file tells the app's reader the recording is over
+        device.close()
+        print(f"replayed {len(frames)} frames in {time.monotonic() - t0:.3f} s", file=sys.stderr)
+        try:
+            return proc.wait(linger)
+        except subprocess.TimeoutExpired:
+            proc.terminate()
+            return proc.wait()
+    finally:
+        if proc.poll() is None:
+            proc.kill()
+        os.unlink(fifo)
+        os.rmdir(tmpdir)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    sub = parser.add_subparsers(dest='mode', required=True)
+    rec = sub.add_parser('record', help='record raw frames from the touchscreen')
+    rec.add_argument('log')
+    rec.add_argument('--device', default=os.getenv("PIGAME_TS") or "/dev/input/touchscreen")
+    rec.add_argument('--seconds', type=float)
+    play = sub.add_parser('play', help='replay a log into a command through PIGAME_TS')
+    play.add_argument('log')
+    play.add_argument('--speed', type=float, default=1.0, help='N x original speed')
+    play.add_argument('--fast', action='store_true', help='as fast as possible')
+    play.add_argument('--linger', type=float, default=2.0,
+                      help='seconds to let the app run after the last frame')
+    play.add_argument('command', nargs=argparse.REMAINDER)
+    args = parser.parse_args()
+
+    if args.mode == 'record':
+        print("Recording, press Ctrl+C to stop")
+        frames = record(args.device, args.log, args.seconds)
+        print(f"{len(frames)} frames saved to {args.log}")
+        return 0
+    command = args.command[1:] if args.command[:1] == ['--'] else args.command
+    if not command:
+        parser.error('play needs a command to run')
+    return play_command(read_log(args.log), 0 if args.fast else args.speed, command, args.linger)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+touch_replay_test.py - Checks touch_replay.record against a FakeTouchDevice:
+--seconds stops it on an idle screen, the frames written come back from the
+log unchanged, events split across reads are joined, and end-of-file ends
+a recording without a deadline.
+"""
+import os
+import sys
+import tempfile
+import threading
+import time
+
+import touch_replay
+from gesture_trace_test import press, stroke
+from pitft_touchscreen import FakeTouchDevice
+
+# longest a record() call may take past its deadline
+SLACK_SEC = 0.5
+
+
+def run_record(device, path, seconds=None, limit=3.0):
+    """record() in a thread, so a hang fails the check instead of the run; (frames or None, seconds taken)."""
+    result = []
+    t0 = time.monotonic()
+    thread = threading.Thread(target=lambda: result.append(touch_replay.record(device, path, seconds)), daemon=True)
+    thread.start()
+    thread.join(limit)
+    return (result[0] if result else None), time.monotonic() - t0
+
+
+def same(frames, written):
+    # record() keeps kernel timestamps to the microsecond
+    return (len(frames) == len(written)
+            and all(abs(t - u) < 1e-5 and e == f for (t, e), (u, f) in zip(frames, written)))
+
+
+def check_idle(tmp):
+    device = FakeTouchDevice()
+    frames, took = run_record(device, os.path.join(tmp, 'idle.tlog'), seconds=0.3)
+    device.close()
+    ok = frames == [] and took < 0.3 + SLACK_SEC
+    return ok, f"stopped after {took:.3f} s with {None if frames is None else len(frames)} frames"
+
+
+def check_frames(tmp):
+    path = os.path.join(tmp, 'drag.tlog')
+    written = press(1000.0, 100, 100) + stroke(1001.0, 20, 120, 220, 120, 0.2)
+    device = FakeTouchDevice()
+
+    def touch():
+        time.sleep(0.05)
+        for t, events in written:
+            device.write_events(events, t)
+
+    threading.Thread(target=touch).start()
+    # the screen goes idle after the last frame; the deadline must still end the recording
+    frames, took = run_record(device, path, seconds=0.5)
+    device.close()
+    ok = frames is not None and same(frames, written) and same(touch_replay.read_log(path), written)
+    return ok and took < 0.5 + SLACK_SEC, f"{len(written)} frames written, {None if frames is None else len(frames)} recorded in {took:.3f} s"
+
+
+def check_split(tmp):
+    written = press(1000.0, 50, 60)
+    device = FakeTouchDevice()
+    data = b''.join(device.pack(ty, co, va, t) for t, events in written for ty, co, va in events)
+
+    def touch():
+        # cut through the middle of events, as a short read from a pipe could
+        for k in range(0, len(data), 7):
+            os.write(device.wfd, data[k:k + 7])
+        device.close()
+
+    threading.Thread(target=touch).start()
+    frames, took = run_record(device, os.path.join(tmp, 'split.tlog'))
+    ok = frames is not None and same(frames, written)
+    return ok, f"{len(data)} bytes in 7-byte writes, {None if frames is None else len(frames)} frames, ended by end-of-file"
+
+
+def main():
+    failed = 0
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, check in (('idle screen', check_idle), ('frames', check_frames), ('split reads', check_split)):
+            ok, detail = check(tmp)
+            print(f"{'PASS' if ok else 'FAIL'} {name}: {detail}")
+            failed += not ok
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+touch_resync_test.py - Stress test for SYN_DROPPED recovery. A touch trace
+is replayed through a FakeTouchDevice whose kernel buffer holds only a few
+events, so the reader keeps overrunning it. After every replay the state
+rebuilt from the emitted frames (finger down or up, position, contacts)
+must match the device. Pass a .tlog recorded with touch_replay.py to use
+it instead of the built-in trace.
+"""
+import random
+import sys
+import time
+
+import pitft_touchscreen
+import touch_replay
+from gesture_trace_test import press, stroke
+from pitft_touchscreen import (FakeTouchDevice, TouchDevice, EV_ABS, EV_SYN, SYN_REPORT,
+                               ABS_MT_SLOT, ABS_MT_TRACKING_ID, ABS_MT_POSITION_X, ABS_MT_POSITION_Y)
+
+BUFFER_EVENTS = 6
+# frames written between reads in the synchronous runs
+BURST = 4
+CUTS = 25
+
+
+def pinch(t, seconds, step=0.01):
+    """Two fingers moving apart, then lifted."""
+    n = int(seconds / step)
+    frames = [(t, [(EV_ABS, ABS_MT_SLOT, 0), (EV_ABS, ABS_MT_TRACKING_ID, 10),
+                   (EV_ABS, ABS_MT_POSITION_X, 150), (EV_ABS, ABS_MT_POSITION_Y, 120),
+                   (EV_ABS, ABS_MT_SLOT, 1), (EV_ABS, ABS_MT_TRACKING_ID, 11),
+                   (EV_ABS, ABS_MT_POSITION_X, 170), (EV_ABS, ABS_MT_POSITION_Y, 120),
+                   (EV_SYN, SYN_REPORT, 0)])]
+    for i in range(1, n + 1):
+        frames.append((t + i * step, [(EV_ABS, ABS_MT_SLOT, 0), (EV_ABS, ABS_MT_POSITION_X, 150 - i),
+                                      (EV_ABS, ABS_MT_SLOT, 1), (EV_ABS, ABS_MT_POSITION_X, 170 + i),
+                                      (EV_SYN, SYN_REPORT, 0)]))
+    frames.append((t + (n + 1) * step, [(EV_ABS, ABS_MT_SLOT, 0), (EV_ABS, ABS_MT_TRACKING_ID, -1),
+                                        (EV_ABS, ABS_MT_SLOT, 1), (EV_ABS, ABS_MT_TRACKING_ID, -1),
+                                        (EV_SYN, SYN_REPORT, 0)]))
+    return frames
+
+
+def builtin_trace():
+    return (press(0.0, 100, 100) + stroke(0.2, 20, 120, 220, 120, 0.2)
+            + pinch(0.6, 0.3) + stroke(1.0, 40, 40, 120, 60, 0.5) + press(1.6, 50, 60, hold=0.3))
+
+
+class View(object):
+    """What an app knows about the touchscreen, built only from emitted frames."""
+    def __init__(self):
+        self.touch = 0
+        self.x = self.y = None
+        self.contacts = {}
+
+    def apply(self, frame):
+        if frame['touch'] is not None:
+            self.touch = frame['touch']
+        if frame['x'] is not None:
+            self.x, self.y = frame['x'], frame['y']
+        for phase, slot, i, x, y in frame['contacts'] or ():
+            if phase == 'up':
+                self.contacts.pop(slot, None)
+            else:
+                self.contacts[slot] = (i, x, y)
+
+    def matches(self, state):
+        contacts = dict((slot, row) for slot, row in enumerate(state['slots']) if row[0] >= 0)
+        if self.touch != state['touch'] or self.contacts != contacts:
+            return False
+        return not state['touch'] or (self.x, self.y) == (state['x'], state['y'])
+
+
+def run_sync(frames):
+    """Writes BURST frames between reads, so the tiny buffer overflows on most bursts."""
+    fake = FakeTouchDevice(buffer_events=BUFFER_EVENTS)
+    device = TouchDevice(fake)
+    view = View()
+    for n, (t, events) in enumerate(frames, 1):
+        fake.write_events(events, t)
+        if n % BURST == 0:
+            device.read(view.apply)
+    device.read(view.apply)
+    fake.close()
+    return view.matches(fake.query_state()), device.decoder.drops
+
+
+def run_threaded(frames):
+    """A pitft_touchscreen reader racing a full-speed TouchReplayer."""
+    fake = FakeTouchDevice(buffer_events=BUFFER_EVENTS)
+    reader = pitft_touchscreen.pitft_touchscreen(fake)
+    reader.start()
+    while not reader.devices:
+        time.sleep(0.001)
+    touch_replay.TouchReplayer(frames, 0, fake).play()
+    fake.close()
+    reader.join(5)
+    view = View()
+    for frame in reader.drain():
+        view.apply(frame)
+    return view.matches(fake.query_state()), reader.drops
+
+
+def main():
+    frames = touch_replay.read_log(sys.argv[1]) if len(sys.argv) > 1 else builtin_trace()
+    rng = random.Random(1)
+    # cut the trace at random points, so it ends with fingers both down and up
+    cuts = sorted(rng.sample(range(1, len(frames) + 1), min(CUTS, len(frames)))) + [len(frames)]
+    failed = 0
+    for name, run in (('synchronous', run_sync), ('threaded', run_threaded)):
+        bad = 0
+        drops = 0
+        for cut in cuts:
+            ok, n = run(frames[:cut])
+            bad += not ok
+            drops += n
+        print(f"{'PASS' if not bad and drops else 'FAIL'} {name}: {len(cuts)} replays, "
+              f"{drops} drops, {bad} final states wrong")
+        failed += bad or not drops
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+touch_transform_perf.py - Cost of mapping raw touches to screen coordinates.
+The transform alone is timed three ways: the old dict-per-step chain, PiTft's
+compiled affine transform applied per sample, and the NumPy batch path. Then
+the whole translate() step is timed, old and new. On a desktop x86 the affine
+map is about 3x faster than the dict chain (0.4 vs 1.3 us/sample), but a
+whole event only gets about 20% faster (4.3 vs 5.3 us). Reading the raw
+sample and building the event dominate. Runs headless (SDL dummy driver), no
+piTFT needed.
+"""
+import random
+import time
+
+# pins the environment pigame reads at import
+from touch_perf_fixture import QueueTouchscreen
+
+import pigame
+from pygame.locals import MOUSEBUTTONDOWN, MOUSEBUTTONUP, MOUSEMOTION
+
+SAMPLES = 100000
+ROTATION, INVERTX, INVERTY, SWAPXY = 90, True, True, False
+
+
+class LegacyMapper:
+    """The per-event chain PiTft.update used before the transform was compiled."""
+    def __init__(self):
+        self.cachedpos = [0, 0]
+        self.button_down = False
+
+    def translate_one(self, r):
+        e = {"y": (r["x"] if r["x"] else self.cachedpos[0]), "x": (r["y"] if r["y"] else self.cachedpos[1])}
+        rel = (e["x"] - self.cachedpos[0], e["y"] - self.cachedpos[1])
+        self.cachedpos = (e["x"], e["y"])
+        if ROTATION == 90:
+            e = {"x": e["x"], "y": 240 - e["y"]}
+            rel = (rel[0], 240 - rel[1])
+        else:
+            e = {"x": 320 - e["x"], "y": e["y"]}
+            rel = (320 - rel[0], rel[1])
+        d = {}
+        t = MOUSEBUTTONUP if r["touch"] == 0 else (MOUSEMOTION if self.button_down else MOUSEBUTTONDOWN)
+        if INVERTX:
+            e = {"x": 320 - e["x"], "y": e["y"]}
+            rel = (320 - rel[0], rel[1])
+        if INVERTY:
+            rel = (rel[0], 240 - rel[1])
+            e = {"y": 240 - e["y"], "x": e["x"]}
+        if SWAPXY:
+            rel = (rel[1], rel[0])
+            e = {"x": e["y"], "y": e["x"]}
+        if t == MOUSEBUTTONDOWN:
+            d["button"] = 1
+            d["pos"] = (e["x"], e["y"])
+            self.button_down = True
+        elif t == MOUSEBUTTONUP:
+            self.button_down = False
+            d["button"] = 1
+            d["pos"] = (e["x"], e["y"])
+        else:
+            d["buttons"] = (True, False, False)
+            d["rel"] = rel
+            d["pos"] = (e["x"], e["y"])
+        return t, d
+
+    def translate(self, raws):
+        return [self.translate_one(r) for r in raws]
+
+
+def legacy_transform(rx, ry):
+    """The position half of LegacyMapper.translate_one: the dict chain with no event built."""
+    e = {"y": rx, "x": ry}
+    if ROTATION == 90:
+        e = {"x": e["x"], "y": 240 - e["y"]}
+    else:
+        e = {"x": 320 - e["x"], "y": e["y"]}
+    if INVERTX:
+        e = {"x": 320 - e["x"], "y": e["y"]}
+    if INVERTY:
+        e = {"y": 240 - e["y"], "x": e["x"]}
+    if SWAPXY:
+        e = {"x": e["y"], "y": e["x"]}
+    return e["x"], e["y"]
+
+
+def per_sample_us(fn, raw):
+    t0 = time.perf_counter()
+    fn(raw)
+    return (time.perf_counter() - t0) / len(raw) * 1e6
+
+
+def main():
+    samples = [{'time': None, 'id': 0, 'x': random.randrange(1, 240), 'y': random.randrange(1, 320), 'touch': 1}
+               for _ in range(SAMPLES)]
+
+    raw = [(r['x'], r['y']) for r in samples]
+    ts = QueueTouchscreen()
+    pitft = pigame.PiTft(rotation=ROTATION, invertx=INVERTX, inverty=INVERTY, swapxy=SWAPXY, touchscreen=ts)
+    a, b, c, d, e, f = pitft.transform
+    s = pitft.shift
+
+    def affine(raw):
+        return [((a * rx + b * ry + c) >> s, (d * rx + e * ry + f) >> s) for rx, ry in raw]
+
+    def legacy(raw):
+        return [legacy_transform(rx, ry) for rx, ry in raw]
+
+    print(f"{SAMPLES} samples, rotation {ROTATION}, invertx {INVERTX}, inverty {INVERTY}, swapxy {SWAPXY}")
+    print(f"positions agree: {affine(raw[:1000]) == legacy(raw[:1000])}")
+    print("transform only:")
+    print(f"  {'legacy dict chain':<20}{per_sample_us(legacy, raw):>8.3f} us/sample")
+    print(f"  {'compiled affine':<20}{per_sample_us(affine, raw):>8.3f} us/sample")
+    if pigame.np is not None:
+        batch = pigame.np.array(raw)
+        print(f"  {'numpy batch':<20}{per_sample_us(pitft.transform_batch, batch):>8.3f} us/sample")
+    # the transform is a small part of an event: reading the raw dict and building the event dominate
+    print("whole event (translate):")
+    print(f"  {'legacy mapper':<20}{per_sample_us(LegacyMapper().translate, samples):>8.3f} us/event")
+    print(f"  {'PiTft.translate':<20}{per_sample_us(pitft.translate, samples):>8.3f} us/event")
+    ts.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+touch_update_perf.py - Measures PiTft.update() with and without coalescing.
+Feeds a synthetic drag (1 down, MOVES_PER_FRAME moves, 1 up) into the touch
+queue every frame and reports pygame events posted and time per update().
+Runs headless (SDL dummy driver), no piTFT needed.
+"""
+import time
+
+# pins the environment pigame reads at import
+from touch_perf_fixture import QueueTouchscreen
+
+import pygame
+import pigame
+
+FRAMES = 2000
+MOVES_PER_FRAME = 30
+
+
+def fill_drag(ts, frame):
+    """Queue one press-drag-release gesture in raw touchscreen coordinates."""
+    x0, y0 = 40 + frame % 100, 60
+    ts.events.put({'time': None, 'id': 0, 'x': x0, 'y': y0, 'touch': 1})
+    for i in range(MOVES_PER_FRAME):
+        ts.events.put({'time': None, 'id': 0, 'x': x0 + i, 'y': y0 + 2 * i, 'touch': 1})
+    ts.events.put({'time': None, 'id': 0, 'x': x0 + MOVES_PER_FRAME, 'y': y0, 'touch': 0})
+
+
+def run(coalesce):
+    ts = QueueTouchscreen()
+    pitft = pigame.PiTft(coalesce=coalesce, touchscreen=ts)
+    posted = 0
+    spent = 0.0
+    for frame in range(FRAMES):
+        fill_drag(ts, frame)
+        t0 = time.perf_counter()
+        pitft.update()
+        spent += time.perf_counter() - t0
+        posted += len(pygame.event.get())
+    ts.stop()
+    return posted, spent
+
+
+def main():
+    pygame.init()
+    pygame.display.set_mode((320, 240))
+    print(f"{FRAMES} frames, {MOVES_PER_FRAME + 2} touch samples per frame")
+    print(f"{'mode':<12}{'posted':>10}{'per frame':>12}{'us/update':>12}")
+    for coalesce in (False, True):
+        posted, spent = run(coalesce)
+        name = 'coalesce' if coalesce else 'per-sample'
+        print(f"{name:<12}{posted:>10}{posted / FRAMES:>12.1f}{spent / FRAMES * 1e6:>12.1f}")
+    pygame.quit()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,258 @@
+"""
+Fake RPi.GPIO for running the lab scripts on plain Linux.
+
+Covers the calls the labs use: setmode, setup, input, output, PWM,
+add_event_detect / event_detected / wait_for_edge and cleanup, with the
+same errors as the real module for pins used before setup. Inputs read
+their pull resistor unless gpio_sim.drive() or gpio_sim.press() drives
+them; edges run the registered callbacks, honouring bouncetime. Outputs
+and PWM changes are recorded in gpio_sim.timeline.
+"""
+import gpio_sim
+
+VERSION = '0.7.1-sim'
+RPI_INFO = {'P1_REVISION': 3, 'REVISION': 'sim', 'TYPE': 'Simulated', 'MANUFACTURER': 'sim',
+            'PROCESSOR': 'sim', 'RAM': 'sim'}
+BOARD = 10
+BCM = 11
+OUT = 0
+IN = 1
+LOW = 0
+HIGH = 1
+PUD_OFF = 20
+PUD_DOWN = 21
+PUD_UP = 22
+RISING = 31
+FALLING = 32
+BOTH = 33
+
+mode = None
+warnings = True
+# pin -> Pin
+pins = {}
+
+
+class Pin:
+    def __init__(self, pin, direction, pull):
+        self.pin = pin
+        self.direction = direction
+        self.pull = pull
+        self.driven = None
+        self.value = LOW
+        self.edge = None
+        self.callbacks = []
+        self.bouncetime = None
+        self.last_callback = None
+        self.detected = False
+
+    def level(self):
+        if self.direction == OUT:
+            return self.value
+        if self.driven is not None:
+            return self.driven
+        return HIGH if self.pull == PUD_UP else LOW
+
+
+def channels(channel):
+    return list(channel) if isinstance(channel, (list, tuple)) else [channel]
+
+
+def check_mode():
+    if mode is None:
+        raise RuntimeError("Please set pin numbering mode using GPIO.setmode(GPIO.BOARD) or GPIO.setmode(GPIO.BCM)")
+
+
+def get(channel):
+    check_mode()
+    pin = pins.get(channel)
+    if pin is None or pin.direction is None:
+        raise RuntimeError("You must setup() the GPIO channel first")
+    return pin
+
+
+def setmode(new_mode):
+    global mode
+    if new_mode not in (BOARD, BCM):
+        raise ValueError("An invalid mode was passed to setmode()")
+    if mode is not None and new_mode != mode:
+        raise ValueError("A different mode has already been set!")
+    mode = new_mode
+
+
+def getmode():
+    return mode
+
+
+def setwarnings(flag):
+    global warnings
+    warnings = bool(flag)
+
+
+def setup(channel, direction, pull_up_down=PUD_OFF, initial=None):
+    check_mode()
+    for c in channels(channel):
+        pin = Pin(c, direction, pull_up_down)
+        old = pins.get(c)
+        if old is not None and direction == IN:
+            pin.driven = old.driven
+        pins[c] = pin
+        if direction == OUT:
+            pin.value = HIGH if initial else LOW
+            gpio_sim.timeline.record(gpio_sim.clock.now(), c, gpio_sim.OUTPUT, pin.value)
+
+
+def input(channel):
+    return get(channel).level()
+
+
+def output(channel, value):
+    chans = channels(channel)
+    values = channels(value) if isinstance(value, (list, tuple)) else [value] * len(chans)
+    if len(values) != len(chans):
+        raise RuntimeError("Number of channels != number of values")
+    for c, v in zip(chans, values):
+        pin = get(c)
+        if pin.direction != OUT:
+            raise RuntimeError("The GPIO channel has not been set up as an OUTPUT")
+        v = HIGH if v else LOW
+        if v != pin.value:
+            gpio_sim.timeline.record(gpio_sim.clock.now(), c, gpio_sim.OUTPUT, v)
+        pin.value = v
+
+
+def gpio_function(channel):
+    pin = pins.get(channel)
+    return IN if pin is None or pin.direction is None else pin.direction
+
+
+def add_event_detect(channel, edge, callback=None, bouncetime=None):
+    pin = get(channel)
+    if pin.direction != IN:
+        raise RuntimeError("You must setup() the GPIO channel as an input first")
+    if pin.edge is not None:
+        raise RuntimeError("Conflicting edge detection already enabled for this GPIO channel")
+    if edge not in (RISING, FALLING, BOTH):
+        raise ValueError("The edge must be set to RISING, FALLING or BOTH")
+    pin.edge = edge
+    pin.bouncetime = bouncetime
+    if callback is not None:
+        pin.callbacks.append(callback)
+
+
+def add_event_callback(channel, callback):
+    pin = get(channel)
+    if pin.edge is None:
+        raise RuntimeError("Add event detection using add_event_detect first before adding a callback")
+    pin.callbacks.append(callback)
+
+
+def remove_event_detect(channel):
+    pin = get(channel)
+    pin.edge = None
+    pin.callbacks = []
+    pin.detected = False
+
+
+def event_detected(channel):
+    pin = get(channel)
+    detected = pin.detected
+    pin.detected = False
+    return detected
+
+
+def wait_for_edge(channel, edge, bouncetime=None, timeout=None):
+    """Returns channel on an edge, None on timeout (timeout in ms, like RPi.GPIO)."""
+    pin = get(channel)
+    if pin.edge is not None:
+        raise RuntimeError("Conflicting edge detection events already exist for this GPIO channel")
+    pin.edge = edge
+    pin.detected = False
+    try:
+        seen = gpio_sim.clock.wait_until(lambda: pin.detected, None if timeout is None else timeout / 1000.0)
+    finally:
+        pin.edge = None
+        pin.detected = False
+    return channel if seen else None
+
+
+def apply_input(channel, level):
+    """Called by gpio_sim when a stimulus drives a pin."""
+    pin = pins.get(channel)
+    if pin is None or pin.direction != IN:
+        # not set up yet: remember the level for when it is
+        pin = pins.setdefault(channel, Pin(channel, None, PUD_OFF))
+        pin.driven = level
+        return
+    before = pin.level()
+    pin.driven = level
+    after = pin.level()
+    if before == after or pin.edge is None:
+        return
+    if pin.edge == RISING and after != HIGH or pin.edge == FALLING and after != LOW:
+        return
+    now = gpio_sim.clock.now()
+    if pin.bouncetime and pin.last_callback is not None and (now - pin.last_callback) * 1000 < pin.bouncetime:
+        return
+    pin.last_callback = now
+    pin.detected = True
+    for callback in list(pin.callbacks):
+        try:
+            callback(channel)
+        except gpio_sim.SimulationEnd:
+            raise
+        except SystemExit as ex:
+            # RPi.GPIO's PyErr_Print() ends the whole process, not just the callback
+            gpio_sim.exit_process(ex.code)
+
+
+gpio_sim.apply_input = apply_input
+
+
+def cleanup(channel=None):
+    global mode
+    for c in (list(pins) if channel is None else channels(channel)):
+        pin = pins.pop(c, None)
+        if pin is not None and pin.direction == OUT and pin.value != LOW:
+            gpio_sim.timeline.record(gpio_sim.clock.now(), c, gpio_sim.OUTPUT, LOW)
+    if channel is None:
+        mode = None
+
+
+class PWM:
+    def __init__(self, channel, frequency):
+        pin = get(channel)
+        if pin.direction != OUT:
+            raise RuntimeError("You must setup() the GPIO channel as an output first")
+        if frequency <= 0.0:
+            raise ValueError("frequency must be greater than 0.0")
+        self.channel = channel
+        self.frequency = frequency
+        self.duty = 0.0
+        self.running = False
+        gpio_sim.timeline.record(gpio_sim.clock.now(), channel, gpio_sim.FREQUENCY, frequency)
+
+    def start(self, dutycycle):
+        # not running yet, so the starting duty is always recorded
+        self.running = False
+        self.ChangeDutyCycle(dutycycle)
+
+    def ChangeDutyCycle(self, dutycycle):
+        if not 0.0 <= dutycycle <= 100.0:
+            raise ValueError("dutycycle must have a value from 0.0 to 100.0")
+        if dutycycle != self.duty or not self.running:
+            gpio_sim.timeline.record(gpio_sim.clock.now(), self.channel, gpio_sim.DUTY, dutycycle)
+        self.duty = dutycycle
+        self.running = True
+
+    def ChangeFrequency(self, frequency):
+        if frequency <= 0.0:
+            raise ValueError("frequency must be greater than 0.0")
+        if frequency != self.frequency:
+            gpio_sim.timeline.record(gpio_sim.clock.now(), self.channel, gpio_sim.FREQUENCY, frequency)
+        self.frequency = frequency
+
+    def stop(self):
+        if self.running and self.duty:
+            gpio_sim.timeline.record(gpio_sim.clock.now(), self.channel, gpio_sim.DUTY, 0.0)
+        self.running = False
+        self.duty = 0.0
@@ -0,0 +1 @@
+# Fake RPi package for running the lab scripts off a Pi, see gpio_sim.py
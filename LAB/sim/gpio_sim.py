@@ -0,0 +1,335 @@
+#!/usr/bin/env python3
+"""
+gpio_sim.py - Pin simulator behind the fake RPi.GPIO in LAB/sim/RPi
+ECE 5725
+
+Put LAB/sim first on PYTHONPATH and `import RPi.GPIO as GPIO` gets the fake
+module. Scripts then run on plain Linux in real time, with input stimuli
+scheduled through this module. Run them through this file instead and they
+get a virtual clock as well: time.sleep(), time.time(), time.monotonic(),
+pygame's tick functions and the main thread's Thread.join() all follow
+simulated time, which runs at --speed times real time, or as fast as
+possible with --speed 0:
+
+    python3 gpio_sim.py --until 30 --timeline motor.npz ../../PROJ/tests/unit_tests/motor_test.py
+    python3 gpio_sim.py --press 27@2.5 --until 10 ../lab2/week1/more_video_control_cb.py
+
+Every output change, PWM duty/frequency change and input stimulus goes into
+a timeline, a NumPy structured array of (t, pin, kind, value) rows.
+"""
+import argparse
+import heapq
+import os
+import runpy
+import sys
+import threading
+import time
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# timeline row kinds
+OUTPUT = 0
+DUTY = 1
+FREQUENCY = 2
+INPUT = 3
+KIND_NAMES = ('output', 'duty', 'frequency', 'input')
+TIMELINE_DTYPE = [('t', 'f8'), ('pin', 'i2'), ('kind', 'u1'), ('value', 'f8')]
+
+real_sleep = time.sleep
+real_monotonic = time.monotonic
+real_time = time.time
+real_perf_counter = time.perf_counter
+real_join = threading.Thread.join
+# real time a joined thread gets between simulated stimuli
+JOIN_STEP_SEC = 0.01
+
+
+class SimulationEnd(SystemExit):
+    """Raised in the script when the --until time is reached."""
+
+
+class RealClock:
+    """Wall-clock time; scheduled callbacks fire from timer threads."""
+    def __init__(self):
+        self.start = real_monotonic()
+        self.lock = threading.RLock()
+
+    def now(self):
+        return real_monotonic() - self.start
+
+    def call_at(self, t, fn, *args):
+        timer = threading.Timer(max(0.0, t - self.now()), fn, args)
+        timer.daemon = True
+        timer.start()
+
+    def wait_until(self, predicate, timeout=None):
+        deadline = None if timeout is None else self.now() + timeout
+        while not predicate():
+            if deadline is not None and self.now() >= deadline:
+                return False
+            real_sleep(0.001)
+        return True
+
+
+class VirtualClock:
+    """Simulated time that only moves when the script sleeps (or waits for an edge).
+
+    Scheduled callbacks run in time order on the thread that is sleeping
+    past them, so a single-threaded script runs the same way every time.
+    """
+    def __init__(self, speed=0.0):
+        self.speed = speed
+        self.t = 0.0
+        self.queue = []
+        self.seq = 0
+        self.lock = threading.RLock()
+        self.epoch = real_time()
+
+    def now(self):
+        return self.t
+
+    def call_at(self, t, fn, *args):
+        with self.lock:
+            self.seq += 1
+            heapq.heappush(self.queue, (t, self.seq, fn, args))
+
+    def next_time(self):
+        with self.lock:
+            return self.queue[0][0] if self.queue else None
+
+    def advance_to(self, target):
+        while True:
+            with self.lock:
+                if not self.queue or self.queue[0][0] > target:
+                    break
+                t, _, fn, args = heapq.heappop(self.queue)
+            self.pass_time(t)
+            fn(*args)
+        self.pass_time(target)
+
+    def pass_time(self, t):
+        with self.lock:
+            dt = t - self.t
+            if dt <= 0:
+                return
+            self.t = t
+        if self.speed:
+            real_sleep(dt / self.speed)
+
+    def sleep(self, seconds):
+        self.advance_to(self.t + max(0.0, seconds))
+
+    def join(self, thread, timeout=None):
+        """Thread.join() in simulated time: stimuli keep firing while the main thread waits."""
+        deadline = None if timeout is None else self.t + timeout
+        while thread.is_alive():
+            # give the thread a moment of real time to react to the last stimulus
+            real_join(thread, JOIN_STEP_SEC)
+            if not thread.is_alive():
+                break
+            t = self.next_time()
+            if t is None and deadline is None:
+                real_join(thread)
+                break
+            if t is None or (deadline is not None and t > deadline):
+                self.advance_to(deadline)
+                break
+            self.advance_to(t)
+
+    def wait_until(self, predicate, timeout=None):
+        deadline = None if timeout is None else self.t + timeout
+        while not predicate():
+            t = self.next_time()
+            if t is None and deadline is None:
+                raise RuntimeError("waiting for an edge that no stimulus will produce")
+            if t is None or (deadline is not None and t > deadline):
+                self.advance_to(deadline)
+                return predicate()
+            self.advance_to(t)
+        return True
+
+
+class Timeline:
+    """Growable record of (t, pin, kind, value) rows."""
+    def __init__(self, capacity=1024):
+        self.count = 0
+        self.rows = np.zeros(capacity, dtype=TIMELINE_DTYPE) if np is not None else []
+
+    def record(self, t, pin, kind, value):
+        if np is None:
+            self.rows.append((t, pin, kind, value))
+            return
+        if self.count == len(self.rows):
+            self.rows = np.resize(self.rows, 2 * len(self.rows))
+        self.rows[self.count] = (t, pin, kind, value)
+        self.count += 1
+
+    def array(self):
+        """The rows so far; a NumPy structured array, or a list of tuples without NumPy."""
+        if np is None:
+            return list(self.rows)
+        return self.rows[:self.count].copy()
+
+    def clear(self):
+        self.count = 0
+        if np is None:
+            self.rows = []
+
+
+clock = RealClock()
+timeline = Timeline()
+# set by the fake RPi.GPIO: called as apply_input(pin, level) when a stimulus fires
+apply_input = None
+# run by exit_process() before the process ends
+exit_hooks = []
+
+
+def use_clock(new_clock):
+    global clock
+    clock = new_clock
+
+
+def drive(pin, level, at=None):
+    """Drive an input pin to level (0/1, or None to release it to its pull) now or at time `at`."""
+    if at is None or at <= clock.now():
+        fire(pin, level)
+    else:
+        clock.call_at(at, fire, pin, level)
+
+
+def press(pin, at, duration=0.1, bounce=0, active_low=True):
+    """Schedule a button press on pin at time `at`, with `bounce` extra chatter edges 1 ms apart."""
+    down, up = (0, 1) if active_low else (1, 0)
+    for i in range(bounce):
+        drive(pin, down, at + i * 0.002)
+        drive(pin, up, at + i * 0.002 + 0.001)
+    drive(pin, down, at + bounce * 0.002)
+    drive(pin, None, at + duration)
+
+
+def fire(pin, level):
+    timeline.record(clock.now(), pin, INPUT, -1 if level is None else level)
+    if apply_input is not None:
+        apply_input(pin, level)
+
+
+def exit_code(code):
+    if code is None:
+        return 0
+    if isinstance(code, int):
+        return code
+    print(code, file=sys.stderr)
+    return 1
+
+
+def exit_process(code):
+    """End the process on the spot, as sys.exit() in an RPi.GPIO callback does."""
+    for hook in exit_hooks:
+        hook()
+    sys.stdout.flush()
+    sys.stderr.flush()
+    os._exit(exit_code(code))
+
+
+def install_virtual_time(virtual, headless=True):
+    """Point time.* (and pygame's clock, if it is installed) at a VirtualClock."""
+    use_clock(virtual)
+    time.sleep = virtual.sleep
+    time.monotonic = virtual.now
+    time.perf_counter = virtual.now
+    time.time = lambda: virtual.epoch + virtual.t
+    # ButtonService scripts wait in join(); only the main thread's joins move the clock
+    threading.Thread.join = lambda thread, timeout=None: (
+        virtual.join(thread, timeout) if threading.current_thread() is threading.main_thread()
+        else real_join(thread, timeout))
+    try:
+        import pygame
+        pygame.time.get_ticks = lambda: int(virtual.t * 1000)
+        pygame.time.wait = pygame.time.delay = lambda ms: virtual.sleep(ms / 1000.0) or ms
+    except ImportError:
+        pass
+    if headless:
+        # the lab scripts putenv() the piTFT framebuffer; keep SDL on the dummy driver
+        os.environ['SDL_VIDEODRIVER'] = 'dummy'
+        real_putenv = os.putenv
+        os.putenv = lambda key, value: None if key.startswith('SDL_') else real_putenv(key, value)
+
+
+def parse_press(spec):
+    """PIN@T[:DURATION] -> (pin, t, duration)"""
+    pin, _, when = spec.partition('@')
+    t, _, duration = when.partition(':')
+    return int(pin), float(t), float(duration) if duration else 0.1
+
+
+def run(script, argv=(), speed=0.0, until=None, presses=(), cwd=None):
+    """Run a script under virtual time; returns its exit code."""
+    virtual = VirtualClock(speed)
+    install_virtual_time(virtual)
+    for pin, t, duration in presses:
+        press(pin, t, duration)
+    if until is not None:
+        virtual.call_at(until, stop)
+    script = os.path.abspath(script)
+    sys.argv = [script] + list(argv)
+    sys.path.insert(0, os.path.dirname(script))
+    if cwd is not None:
+        os.chdir(cwd)
+    try:
+        runpy.run_path(script, run_name='__main__')
+    except SimulationEnd:
+        return 0
+    except SystemExit as ex:
+        return exit_code(ex.code)
+    return 0
+
+
+def stop():
+    raise SimulationEnd(0)
+
+
+def summary(rows):
+    """One line per (pin, kind): change count and last value."""
+    seen = {}
+    for t, pin, kind, value in (tuple(r) for r in rows):
+        count, _ = seen.get((pin, kind), (0, None))
+        seen[(pin, kind)] = (count + 1, value)
+    return [f"GPIO{pin:<3} {KIND_NAMES[kind]:<10} {count:>6} changes, last {value:g}"
+            for (pin, kind), (count, value) in sorted(seen.items())]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('script')
+    parser.add_argument('args', nargs=argparse.REMAINDER)
+    parser.add_argument('--speed', type=float, default=0.0, help='N x real time, 0 = as fast as possible')
+    parser.add_argument('--until', type=float, help='stop the script after this many simulated seconds')
+    parser.add_argument('--press', action='append', default=[], metavar='PIN@T[:DURATION]',
+                        help='press an active-low button at simulated time T')
+    parser.add_argument('--timeline', help='save the timeline to this .npz file')
+    args = parser.parse_args()
+    start = real_perf_counter()
+
+    def report():
+        rows = timeline.array()
+        print(f"simulated {clock.now():.3f} s in {real_perf_counter() - start:.3f} s, {len(rows)} timeline rows",
+              file=sys.stderr)
+        for line in summary(rows):
+            print(line, file=sys.stderr)
+        if args.timeline:
+            np.savez(args.timeline, timeline=rows)
+
+    exit_hooks.append(report)
+    code = run(args.script, args.args, args.speed, args.until, [parse_press(p) for p in args.press])
+    exit_hooks.remove(report)
+    report()
+    return code
+
+
+if __name__ == '__main__':
+    # run from the importable module, so the fake RPi.GPIO shares its clock and timeline
+    import gpio_sim
+    sys.exit(gpio_sim.main())
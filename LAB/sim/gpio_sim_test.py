@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+gpio_sim_test.py - Regression runs of the GPIO scripts on the simulated
+RPi.GPIO. Each script runs through gpio_sim.py under virtual time in its own
+process, and the recorded timeline is checked against what the script should
+have done. Simulated minutes take well under a second.
+"""
+import importlib.util
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+
+import numpy as np
+
+import gpio_sim
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+LAB = os.path.dirname(HERE)
+MOTOR_TEST = os.path.join(LAB, '..', 'PROJ', 'tests', 'unit_tests', 'motor_test.py')
+VIDEO_CB = os.path.join(LAB, 'lab2', 'week1', 'more_video_control_cb.py')
+RUN_TEST = os.path.join(LAB, 'lab3', 'week2', 'run_test.py')
+
+
+def simulate(script, *options, cwd=None, env=None):
+    """Run script under gpio_sim.py; returns (exit code, timeline array)."""
+    with tempfile.TemporaryDirectory() as tmp:
+        npz = os.path.join(tmp, 'timeline.npz')
+        proc = subprocess.run([sys.executable, os.path.join(HERE, 'gpio_sim.py'), '--timeline', npz]
+                              + list(options) + [os.path.abspath(script)],
+                              cwd=cwd, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+        if not os.path.exists(npz):
+            print(proc.stderr, file=sys.stderr)
+            return proc.returncode, None
+        return proc.returncode, np.load(npz)['timeline']
+
+
+def rows(timeline, pin, kind):
+    picked = timeline[(timeline['pin'] == pin) & (timeline['kind'] == kind)]
+    return [(round(float(t), 3), float(v)) for t, v in zip(picked['t'], picked['value'])]
+
+
+def check_motor_test():
+    code, first = simulate(MOTOR_TEST, '--until', '60')
+    _, second = simulate(MOTOR_TEST, '--until', '60')
+    # one 14 s test cycle starts 1 s in: left CW for 1 s, stop, CCW ...
+    ok = (code == 0 and first is not None and np.array_equal(first, second)
+          and rows(first, 17, gpio_sim.OUTPUT)[:3] == [(0.0, 0.0), (1.0, 1.0), (2.0, 0.0)]
+          and rows(first, 26, gpio_sim.DUTY)[:3] == [(0.0, 0.0), (1.0, 95.0), (2.0, 0.0)]
+          and rows(first, 26, gpio_sim.FREQUENCY) == [(0.0, 100.0)])
+    cycles = len([1 for t, v in rows(first, 17, gpio_sim.OUTPUT) if v == 1.0]) if first is not None else 0
+    return ok, f"{len(first) if first is not None else 0} timeline rows, identical on rerun, {cycles} CW pulses"
+
+
+def check_video_cb():
+    with tempfile.TemporaryDirectory() as tmp:
+        fifo = os.path.join(tmp, 'video_fifo')
+        os.mkfifo(fifo)
+        commands = []
+
+        def player():
+            # stands in for mplayer -slave -input file=video_fifo
+            while not commands or commands[-1] != 'quit':
+                with open(fifo) as f:
+                    commands.extend(line.strip() for line in f)
+
+        reader = threading.Thread(target=player, daemon=True)
+        reader.start()
+        code, timeline = simulate(VIDEO_CB, '--press', '22@1', '--press', '26@2', '--press', '12@3',
+                                  '--press', '27@4', '--until', '60', cwd=tmp)
+        reader.join(2.0)
+    expected = ['seek 10', 'seek 30', 'seek -30', 'quit']
+    ok = code == 0 and commands == expected and timeline is not None and timeline['t'].max() < 5
+    return ok, f"commands {commands}, exit code {code}"
+
+
+def check_run_test():
+    if importlib.util.find_spec('pygame') is None:
+        return None, "pygame not installed"
+    with tempfile.TemporaryDirectory() as tmp:
+        # a touchscreen nobody writes to: the reader sees end-of-file and stops
+        touchscreen = os.path.join(tmp, 'touchscreen')
+        os.mkfifo(touchscreen)
+        env = dict(os.environ, PIGAME_TS=touchscreen)
+        code, timeline = simulate(RUN_TEST, '--press', '24@1.5', '--until', '60',
+                                  cwd=os.path.dirname(RUN_TEST), env=env)
+    ok = (code == 0 and timeline is not None
+          and rows(timeline, 26, gpio_sim.FREQUENCY) == [(0.0, 50.0)]
+          and rows(timeline, 16, gpio_sim.FREQUENCY) == [(0.0, 50.0)]
+          and timeline['t'].max() < 2)
+    return ok, f"quit pin ended the run at {timeline['t'].max() if timeline is not None else '-'} s"
+
+
+def main():
+    failed = 0
+    for name, check in (('motor_test.py', check_motor_test), ('more_video_control_cb.py', check_video_cb),
+                        ('run_test.py', check_run_test)):
+        ok, detail = check()
+        print(f"{'SKIP' if ok is None else 'PASS' if ok else 'FAIL'} {name}: {detail}")
+        failed += ok is False
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())